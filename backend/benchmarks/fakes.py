@@ -0,0 +1,101 @@
+"""Stand-ins for Terraform and the LLM used by the benchmarks."""
+
+import itertools
+import os
+import sys
+import threading
+from typing import Any, Iterator, Optional
+
+# The fake terraform executable. It sleeps for the configured latency, then
+# prints output sized by the configured resource count: plan lines, a plan
+# or state document for ``show -json``, and a short line for the rest.
+FAKE_TERRAFORM = '''\
+import json, os, sys, time
+
+args = []
+for arg in sys.argv[1:]:
+    if arg.startswith("-chdir="):
+        os.chdir(arg.split("=", 1)[1])
+    else:
+        args.append(arg)
+command = args[0] if args else ""
+resources = int(os.environ.get("CLOUDPILOT_FAKE_TF_RESOURCES", "10"))
+time.sleep(float(os.environ.get("CLOUDPILOT_FAKE_TF_LATENCY", "0.1")))
+addresses = [f"aws_s3_bucket.load[{i}]" for i in range(resources)]
+
+if command == "plan":
+    for arg in args:
+        if arg.startswith("-out="):
+            with open(arg.split("=", 1)[1], "w") as f:
+                f.write("fake plan")
+    for address in addresses:
+        print(f"  # {address} will be created")
+    print(f"Plan: {resources} to add, 0 to change, 0 to destroy.")
+elif command == "show" and "-json" in args:
+    after = {"bucket": "cloudpilot-load", "tags": {"ManagedBy": "cloud-pilot"}}
+    if len(args) > 2:
+        print(json.dumps({"format_version": "1.2", "complete": True, "resource_changes": [
+            {"address": address, "type": "aws_s3_bucket", "change": {"actions": ["create"], "after": after}}
+            for address in addresses
+        ]}))
+    else:
+        print(json.dumps({"format_version": "1.0", "values": {"root_module": {"resources": [
+            {"address": address, "type": "aws_s3_bucket", "mode": "managed", "values": after}
+            for address in addresses
+        ]}}}))
+elif command == "apply":
+    for address in addresses:
+        print(f"{address}: Creation complete")
+    print(f"Apply complete! Resources: {resources} added, 0 changed, 0 destroyed.")
+else:
+    print(f"{command} ok")
+'''
+
+
+def write_fake_terraform(directory: str) -> str:
+    """
+    Write the fake terraform executable into a directory.
+
+    Its latency and resource count are read from
+    ``CLOUDPILOT_FAKE_TF_LATENCY`` and ``CLOUDPILOT_FAKE_TF_RESOURCES`` each
+    time it runs.
+
+    Args:
+        directory: Where to put the executable
+
+    Returns:
+        The executable's path, for ``TERRAFORM_BIN``
+    """
+    path = os.path.join(directory, "terraform")
+    with open(path, "w") as f:
+        f.write(f"#!{sys.executable}\n{FAKE_TERRAFORM}")
+    os.chmod(path, 0o755)
+    return path
+
+
+class RecordedLLM:
+    """Stand-in for the Anthropic client that replays recorded responses.
+
+    Every instance answers from the replies set with ``play``, in turn and
+    without delay, so a benchmark times the code around the LLM call.
+    """
+
+    _replies: Optional[Iterator[str]] = None
+    _lock = threading.Lock()
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        pass
+
+    @classmethod
+    def play(cls, *replies: str) -> None:
+        """Answer the following calls with ``replies``, repeating them in order."""
+        with cls._lock:
+            cls._replies = itertools.cycle(replies)
+
+    def complete(self, prompt: str, **kwargs: Any) -> Any:
+        from llama_index.core.base.llms.types import CompletionResponse
+
+        with RecordedLLM._lock:
+            text = next(RecordedLLM._replies) if RecordedLLM._replies else ""
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+        return CompletionResponse(text=text, raw={"usage": usage})
@@ -0,0 +1,81 @@
+"""Compare the size and encode/decode time of the WebSocket framings.
+
+Builds a plan-sized confirmation message and reports, for JSON text frames
+and each compressed subprotocol, the bytes on the wire and the time to
+encode and decode it.
+
+Usage (from the backend directory):
+    python -m benchmarks.framing [--resources N] [--rounds N]
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+from src.framing import FrameCodec, supported_subprotocols
+
+
+def plan_message(resources: int) -> Dict[str, Any]:
+    """Build a confirmation carrying a plan with ``resources`` changes."""
+    changes = []
+    for i in range(resources):
+        after = {
+            "bucket": f"cloudpilot-assets-{i}",
+            "tags": {"Name": f"assets-{i}", "Environment": "prod", "ManagedBy": "cloud-pilot"},
+            "versioning": [{"enabled": True, "mfa_delete": False}],
+            "policy": json.dumps({"Version": "2012-10-17", "Statement": [{"Effect": "Allow", "Resource": f"arn:aws:s3:::cloudpilot-assets-{i}/*"}]}),
+        }
+        changes.append({
+            "address": f"aws_s3_bucket.assets[{i}]",
+            "type": "aws_s3_bucket",
+            "name": "assets",
+            "change": {"actions": ["create"], "before": None, "after": after},
+        })
+    return {
+        "type": "confirmation",
+        "flow_id": "benchmark",
+        "status": "waiting_for_input",
+        "question": "Is this correct?",
+        "terraform_json": {"format_version": "1.2", "complete": True, "resource_changes": changes},
+    }
+
+
+def measure(encode: Callable[[], Any], decode: Callable[[Any], Any], rounds: int) -> Dict[str, float]:
+    """Return the payload size and mean encode and decode times in ms."""
+    payload = encode()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        encode()
+    encode_ms = (time.perf_counter() - started) / rounds * 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        decode(payload)
+    decode_ms = (time.perf_counter() - started) / rounds * 1000
+    size = len(payload.encode()) if isinstance(payload, str) else len(payload)
+    return {"bytes": size, "encode_ms": encode_ms, "decode_ms": decode_ms}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resources", type=int, default=5000, help="resource changes in the plan")
+    parser.add_argument("--rounds", type=int, default=10, help="timed rounds per framing")
+    args = parser.parse_args()
+
+    message = plan_message(args.resources)
+    results = {"json (current)": measure(lambda: json.dumps(message), json.loads, args.rounds)}
+    for subprotocol in supported_subprotocols():
+        codec = FrameCodec(subprotocol)
+        results[subprotocol] = measure(lambda: codec.encode(message), codec.decode, args.rounds)
+
+    baseline = results["json (current)"]["bytes"]
+    print(f"{'framing':<28}{'bytes':>12}{'ratio':>8}{'encode ms':>12}{'decode ms':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<28}{result['bytes']:>12}{result['bytes'] / baseline:>8.2f}"
+            f"{result['encode_ms']:>12.2f}{result['decode_ms']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Load-test the WebSocket API without Anthropic or AWS.
+
+Starts the API in a child process with a deterministic stub LLM and a fake
+``terraform`` executable, opens concurrent WebSocket clients that each run
+``new_task`` and ``confirmation`` cycles to the end of the flow, and
+reports throughput, end-to-end latency percentiles and the server's
+resident memory.
+
+Usage (from the backend directory):
+    python -m benchmarks.load [--clients N] [--cycles N] [--llm-latency S]
+        [--terraform-latency S] [--resources N] [--same-config] [--llm-cache]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fakes import write_fake_terraform
+
+# The last node of a flow (src.graph.NODE_TERRAFORM_SHOW); importing the
+# graph here would build it in the client process too
+FINAL_NODE = "node_terraform_show"
+
+class StubLLM:
+    """Stand-in for the Anthropic client that answers every prompt with Terraform.
+
+    Each call waits for the configured latency and returns a configuration
+    with the configured number of buckets. Unless ``same_config`` is set,
+    each call names its buckets after a call counter, so flows get distinct
+    configurations and the plan cache does not hide the cost of planning.
+    """
+
+    latency = 0.5
+    resources = 10
+    same_config = False
+    _calls = 0
+    _lock = threading.Lock()
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        pass
+
+    def complete(self, prompt: str, **kwargs: Any) -> Any:
+        from llama_index.core.base.llms.types import CompletionResponse
+
+        with StubLLM._lock:
+            StubLLM._calls += 1
+            call = 0 if self.same_config else StubLLM._calls
+        time.sleep(self.latency)
+        blocks = [
+            f'resource "aws_s3_bucket" "load_{i}" {{\n  bucket = "cloudpilot-load-{call}-{i}"\n}}\n'
+            for i in range(self.resources)
+        ]
+        text = 'terraform {\n  required_providers {\n    aws = {\n      source = "hashicorp/aws"\n    }\n  }\n}\n\n'
+        text += "\n".join(blocks)
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+        return CompletionResponse(text=text, raw={"usage": usage})
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the API with the stub LLM; the environment points it at the fake terraform."""
+    import llama_index.llms.anthropic
+    import uvicorn
+
+    StubLLM.latency = args.llm_latency
+    StubLLM.resources = args.resources
+    StubLLM.same_config = args.same_config
+    # Agents import the client class by name, so swap it before they load
+    llama_index.llms.anthropic.Anthropic = StubLLM
+
+    from src.api import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def free_port() -> int:
+    """Return a TCP port nothing is listening on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args: argparse.Namespace, root: str) -> subprocess.Popen:
+    """Start the API in a child process with its workspaces under ``root``."""
+    terraform = write_fake_terraform(root)
+    env = {
+        **os.environ,
+        "TERRAFORM_BIN": terraform,
+        "CLOUDPILOT_FAKE_TF_LATENCY": str(args.terraform_latency),
+        "CLOUDPILOT_FAKE_TF_RESOURCES": str(args.resources),
+        "CLOUDPILOT_WORKSPACE_ROOT": os.path.join(root, "workspaces"),
+        # Every flow sends the same prompts, so a response cache would
+        # answer all but the first from memory
+        **({} if args.llm_cache else {"CLOUDPILOT_LLM_CACHE_TTLS": ""}),
+        "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "offline"),
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "offline"),
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.load", "--serve", "--port", str(args.port),
+        "--llm-latency", str(args.llm_latency), "--resources", str(args.resources),
+    ]
+    if args.same_config:
+        command.append("--same-config")
+    log = open(os.path.join(root, "server.log"), "w")
+    server = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited, see {log.name}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{args.port}/flows/stats", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server did not start, see {log.name}")
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Return a process's resident set size, where /proc is available."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of ``values``."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+async def await_flow(websocket: Any, started: float, results: Dict[str, List[float]]) -> None:
+    """Approve the flow's plan when asked and return once the flow finishes."""
+    while True:
+        message = json.loads(await websocket.recv())
+        if message["type"] == "error":
+            raise RuntimeError(message.get("error"))
+        if message["type"] == "confirmation":
+            results["plan"].append(time.perf_counter() - started)
+            await websocket.send(json.dumps({
+                "type": "confirmation", "flow_id": message["flow_id"], "approved": True,
+            }))
+        elif message["type"] == "progress" and FINAL_NODE in message.get("data", {}):
+            return
+
+
+async def run_client(url: str, cycles: int, timeout: float, results: Dict[str, List[float]]) -> None:
+    """Run ``cycles`` flows one after the other over one connection."""
+    import websockets
+
+    async with websockets.connect(url, max_size=None) as websocket:
+        await websocket.recv()  # connection_status
+        for _ in range(cycles):
+            started = time.perf_counter()
+            await websocket.send(json.dumps({"type": "new_task", "message": "Create an S3 bucket"}))
+            try:
+                await asyncio.wait_for(await_flow(websocket, started, results), timeout)
+            except (RuntimeError, asyncio.TimeoutError) as e:
+                results["errors"].append(1)
+                print(f"Flow failed: {e!r}", file=sys.stderr)
+                continue
+            results["flow"].append(time.perf_counter() - started)
+
+
+async def sample_rss(pid: int, samples: List[int], stop: asyncio.Event) -> None:
+    """Sample the server's memory until ``stop`` is set."""
+    while not stop.is_set():
+        rss = rss_bytes(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_load(args: argparse.Namespace, pid: int) -> Dict[str, Any]:
+    """Drive the server with the configured clients and collect the results."""
+    url = f"ws://127.0.0.1:{args.port}/ws/ai-assist"
+    results: Dict[str, List[float]] = {"plan": [], "flow": [], "errors": []}
+    rss_samples: List[int] = []
+    idle_rss = rss_bytes(pid)
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(pid, rss_samples, stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(url, args.cycles, args.timeout, results) for _ in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    return {
+        **results, "elapsed": elapsed, "idle_rss": idle_rss,
+        "peak_rss": max(rss_samples, default=None), "end_rss": rss_bytes(pid),
+    }
+
+
+def report(args: argparse.Namespace, result: Dict[str, Any]) -> None:
+    """Print the throughput, latency percentiles and memory of a run."""
+    def mib(value: Optional[int]) -> str:
+        return "n/a" if value is None else f"{value / (1024 * 1024):.1f} MiB"
+
+    completed = len(result["flow"])
+    print(
+        f"clients={args.clients} cycles={args.cycles} llm_latency={args.llm_latency}s "
+        f"terraform_latency={args.terraform_latency}s resources={args.resources}"
+    )
+    print(f"flows completed   {completed} ({len(result['errors'])} failed) in {result['elapsed']:.2f}s")
+    print(f"throughput        {completed / result['elapsed']:.2f} flows/s")
+    print(f"{'latency (s)':<18}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for name in ("plan", "flow"):
+        values = result[name]
+        print(f"{name:<18}" + "".join(f"{percentile(values, pct):>8.2f}" for pct in (50, 95, 99)))
+    print(f"server rss        idle {mib(result['idle_rss'])}, peak {mib(result['peak_rss'])}, end {mib(result['end_rss'])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=10, help="concurrent WebSocket clients")
+    parser.add_argument("--cycles", type=int, default=3, help="flows each client runs in turn")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument("--terraform-latency", type=float, default=0.1, help="seconds per fake terraform command")
+    parser.add_argument("--resources", type=int, default=10, help="resources in generated code and plans")
+    parser.add_argument("--same-config", action="store_true", help="generate one configuration for every flow")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a flow counts as failed")
+    parser.add_argument("--port", type=int, default=0, help="port for the server, a free one by default")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    args.port = args.port or free_port()
+    with tempfile.TemporaryDirectory(prefix="cloudpilot-load-") as root:
+        server = start_server(args, root)
+        try:
+            result = asyncio.run(run_load(args, server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+    report(args, result)
+
+
+if __name__ == "__main__":
+    main()
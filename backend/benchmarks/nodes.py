@@ -0,0 +1,316 @@
+"""Time each graph node and agent method against recorded LLM responses.
+
+The LLM is replaced with the replies recorded in fixtures/llm_responses.json
+and terraform with the fake executable from benchmarks.fakes, so what is
+timed is Cloud Pilot's own work: prompt building, parsing, file handling,
+plan and state processing and the subprocess round trips. Every benchmark
+runs against a small and a large configuration and plan, and the fastest
+round of each is compared with a stored baseline so regressions show up
+before deploy; like timeit, the fastest round is the one least disturbed
+by the rest of the machine.
+
+Usage (from the backend directory):
+    python -m benchmarks.nodes [--sizes small,large] [--rounds N] [--filter TEXT]
+        [--baseline PATH] [--save-baseline] [--tolerance F]
+
+Exits with status 1 if any benchmark is slower than its baseline by more
+than the tolerance. Refresh the baseline with --save-baseline on the
+machine the comparisons run on.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import inspect
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.fakes import RecordedLLM, write_fake_terraform
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_PATH = os.path.join(BENCHMARK_DIR, "fixtures", "llm_responses.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# Resources in the generated configuration and the fake plan and state
+SIZES = {"small": 5, "large": 2000}
+
+# Slowdowns smaller than this are timer noise, not regressions
+MIN_REGRESSION_SECONDS = 0.002
+
+
+class Context:
+    """Inputs for one size: the recorded replies, generated code and fresh workspaces."""
+
+    def __init__(self, size: str, root: str, fixtures: Dict[str, str]):
+        self.size = size
+        self.resources = SIZES[size]
+        self.root = root
+        self.fixtures = fixtures
+        blocks = [fixtures["terraform_resource"].replace("{i}", str(i)) for i in range(self.resources)]
+        self.code = fixtures["terraform_header"] + "".join(blocks)
+        self._ids = itertools.count()
+
+    def workspace(self, planned: bool = False) -> str:
+        """Return a new directory holding the configuration, and a saved plan if ``planned``."""
+        from src.terraform.plan_files import PLAN_FILE, record_plan
+
+        path = os.path.join(self.root, "bench", f"{self.size}-{next(self._ids)}")
+        os.makedirs(path)
+        with open(os.path.join(path, "main.tf"), "w") as f:
+            f.write(self.code)
+        if planned:
+            with open(os.path.join(path, PLAN_FILE), "w") as f:
+                f.write("fake plan")
+            record_plan(path)
+        return path
+
+    def config(self) -> Dict[str, Any]:
+        """Return the run config of a new flow."""
+        flow_id = f"bench-{self.size}-{next(self._ids)}"
+        return {"configurable": {"flow_id": flow_id, "thread_id": flow_id}}
+
+    def state(self, **fields: Any) -> Dict[str, Any]:
+        """Return a graph state with ``fields`` set."""
+        from langchain_core.messages import HumanMessage
+
+        state = {
+            "messages": [HumanMessage(content="Create versioned S3 buckets for static assets")],
+            "task": "Create versioned S3 buckets for static assets",
+            "terraform_code": "",
+            "terraform_json": "",
+            "terraform_file_path": "",
+            "result": "",
+            "error": "",
+            "user_input": "",
+            "next_action": "",
+        }
+        state.update(fields)
+        return state
+
+    def clear_plan_cache(self) -> None:
+        """Empty the plan cache so the next plan runs terraform."""
+        from src.terraform.plan_cache import plan_cache
+
+        shutil.rmtree(plan_cache.root, ignore_errors=True)
+
+
+@dataclass
+class Benchmark:
+    """A timed call; ``setup`` prepares its inputs and returns the call."""
+
+    name: str
+    setup: Callable[[Context], Callable[[], Any]]
+
+
+def benchmarks() -> List[Benchmark]:
+    """Return the node and agent benchmarks; imported late so the fakes are in place."""
+    from src.agents.architecture_agent import ArchitectureAgent
+    from src.agents.file_system_agent import FileSystemAgent
+    from src.agents.interpreter_agent import InterpreterAgent
+    from src.agents.terraform_agent import TerraformAgent
+    from src.agents.tf_generator_agent import TerraformGeneratorAgent
+    from src.agents.tf_generator_agent_vars import TerraformGeneratorAgent as TerraformGeneratorAgentVars
+    from src.nodes.analyze_terraform import analyze_terraform
+    from src.nodes.execute_terraform import aexecute_terraform, execute_terraform
+    from src.nodes.file_system_operations import file_system_operations
+    from src.nodes.generate_terraform import agenerate_terraform, generate_terraform
+    from src.nodes.terraform_plan import aterraform_plan, terraform_plan
+    from src.nodes.terraform_show import aterraform_show, terraform_show
+
+    def generate(node):
+        def setup(ctx):
+            RecordedLLM.play(ctx.code)
+            ctx.clear_plan_cache()
+            state, config = ctx.state(), ctx.config()
+            return lambda: node(state, config)
+        return setup
+
+    def in_workspace(node, planned=False, takes_config=False):
+        def setup(ctx):
+            state = ctx.state(terraform_file_path=os.path.join(ctx.workspace(planned), "main.tf"))
+            return (lambda: node(state, None)) if takes_config else (lambda: node(state))
+        return setup
+
+    def analyze(ctx):
+        RecordedLLM.play(ctx.fixtures["terraform_review"])
+        state = ctx.state(terraform_code=ctx.code)
+        return lambda: analyze_terraform(state)
+
+    def file_operations(ctx):
+        RecordedLLM.play(ctx.fixtures["file_operation"].replace("{workdir}", ctx.workspace()))
+        state = ctx.state(user_input="List the files in the workspace")
+        return lambda: file_system_operations(state)
+
+    def agent_call(agent_class, reply_keys, call):
+        def setup(ctx):
+            RecordedLLM.play(*(ctx.code if key == "code" else ctx.fixtures[key] for key in reply_keys))
+            agent = agent_class()
+            return lambda: call(ctx, agent)
+        return setup
+
+    return [
+        Benchmark("node generate_terraform", generate(generate_terraform)),
+        Benchmark("node agenerate_terraform", generate(agenerate_terraform)),
+        Benchmark("node terraform_plan", in_workspace(terraform_plan)),
+        Benchmark("node aterraform_plan", in_workspace(aterraform_plan, takes_config=True)),
+        Benchmark("node execute_terraform", in_workspace(execute_terraform, planned=True)),
+        Benchmark("node aexecute_terraform", in_workspace(aexecute_terraform, planned=True, takes_config=True)),
+        Benchmark("node terraform_show", in_workspace(terraform_show, takes_config=True)),
+        Benchmark("node aterraform_show", in_workspace(aterraform_show, takes_config=True)),
+        Benchmark("node analyze_terraform", analyze),
+        Benchmark("node file_system_operations", file_operations),
+        Benchmark("agent InterpreterAgent.interpret_request", agent_call(
+            InterpreterAgent, ["interpreter"],
+            lambda ctx, agent: agent.interpret_request("I want to store files"))),
+        Benchmark("agent TerraformGeneratorAgent.generate_code", agent_call(
+            TerraformGeneratorAgent, ["code"],
+            lambda ctx, agent: agent.generate_code("S3 buckets", working_dir=ctx.workspace()))),
+        Benchmark("agent TerraformGeneratorAgent.validate_code", agent_call(
+            TerraformGeneratorAgent, [],
+            lambda ctx, agent: agent.validate_code(ctx.code))),
+        Benchmark("agent TerraformGeneratorAgent (vars).generate_terraform", agent_call(
+            TerraformGeneratorAgentVars, ["tfvars", "code"],
+            lambda ctx, agent: agent.generate_terraform("S3 buckets", output_dir=ctx.workspace()))),
+        Benchmark("agent TerraformAgent.analyze_terraform", agent_call(
+            TerraformAgent, ["terraform_analysis"],
+            lambda ctx, agent: agent.analyze_terraform(ctx.code))),
+        Benchmark("agent TerraformAgent.generate_terraform", agent_call(
+            TerraformAgent, ["code"],
+            lambda ctx, agent: agent.generate_terraform("Enable versioning", existing_code=ctx.code))),
+        Benchmark("agent ArchitectureAgent.process_message", agent_call(
+            ArchitectureAgent, ["architecture"],
+            lambda ctx, agent: agent.process_message("Host a static website", mode="architect"))),
+        Benchmark("agent FileSystemAgent.parse_file_operation", agent_call(
+            FileSystemAgent, ["file_operation"],
+            lambda ctx, agent: agent.parse_file_operation("List the files in the workspace"))),
+    ]
+
+
+def failure(result: Any) -> Optional[str]:
+    """Return the error a node or agent reported instead of raising, if any."""
+    if isinstance(result, dict) and result.get("error"):
+        return str(result["error"])
+    if isinstance(result, tuple) and result and not result[0]:
+        return str(result[-1])
+    return None
+
+
+def run_benchmark(benchmark: Benchmark, ctx: Context, rounds: int,
+                  loop: asyncio.AbstractEventLoop) -> List[float]:
+    """Return the duration of each round after an untimed warm-up round."""
+    timings = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for round_number in range(rounds + 1):
+            call = benchmark.setup(ctx)
+            started = time.perf_counter()
+            result = call()
+            if inspect.isawaitable(result):
+                result = loop.run_until_complete(result)
+            elapsed = time.perf_counter() - started
+            error = failure(result)
+            if error:
+                raise RuntimeError(error)
+            if round_number:
+                timings.append(elapsed)
+    return timings
+
+
+def compare(results: Dict[str, Dict[str, float]], medians: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Print the fastest rounds next to the baseline and return the regressions."""
+    regressions = []
+    print(f"{'benchmark':<56}{'size':>7}{'best ms':>10}{'median ms':>12}{'baseline ms':>13}{'change':>9}")
+    for name, sizes in results.items():
+        for size, best in sizes.items():
+            before = baseline.get(name, {}).get(size)
+            line = f"{name:<56}{size:>7}{best * 1000:>10.2f}{medians[name][size] * 1000:>12.2f}"
+            if before is None:
+                print(line + f"{'-':>13}{'-':>9}")
+                continue
+            change = best / before - 1 if before else 0.0
+            regressed = change > tolerance and best - before > MIN_REGRESSION_SECONDS
+            print(line + f"{before * 1000:>13.2f}{change:>+9.0%}" + ("  REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append(f"{name} [{size}]")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma separated sizes to run")
+    parser.add_argument("--rounds", type=int, default=10, help="timed rounds per benchmark")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="slowdown allowed over the baseline")
+    args = parser.parse_args()
+
+    with open(FIXTURES_PATH) as f:
+        fixtures = json.load(f)
+
+    root = tempfile.mkdtemp(prefix="cloudpilot-bench-")
+    os.environ.update({
+        "TERRAFORM_BIN": write_fake_terraform(root),
+        "CLOUDPILOT_FAKE_TF_LATENCY": "0",
+        "CLOUDPILOT_WORKSPACE_ROOT": os.path.join(root, "workspaces"),
+        # Time the calls themselves, not answers from the response cache
+        "CLOUDPILOT_LLM_CACHE_TTLS": "",
+    })
+    os.environ.setdefault("ANTHROPIC_API_KEY", "offline")
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+    import llama_index.llms.anthropic
+
+    # Agents and nodes import the client class by name, so swap it before they load
+    llama_index.llms.anthropic.Anthropic = RecordedLLM
+
+    results: Dict[str, Dict[str, float]] = {}
+    medians: Dict[str, Dict[str, float]] = {}
+    failed = []
+    loop = asyncio.new_event_loop()
+    try:
+        selected = [benchmark for benchmark in benchmarks() if args.filter in benchmark.name]
+        for size in args.sizes.split(","):
+            os.environ["CLOUDPILOT_FAKE_TF_RESOURCES"] = str(SIZES[size])
+            ctx = Context(size, root, fixtures)
+            for benchmark in selected:
+                try:
+                    timings = run_benchmark(benchmark, ctx, args.rounds, loop)
+                except Exception as e:
+                    failed.append(f"{benchmark.name} [{size}]: {e}")
+                    continue
+                results.setdefault(benchmark.name, {})[size] = min(timings)
+                medians.setdefault(benchmark.name, {})[size] = statistics.median(timings)
+    finally:
+        loop.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, medians, baseline, args.tolerance)
+    for message in failed:
+        print(f"FAILED {message}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
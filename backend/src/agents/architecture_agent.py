@@ -4,9 +4,11 @@ This agent provides architecture recommendations and cost estimates.
 """
 
 import os
-from typing import Dict, List, Optional, Any
-from llama_index.llms.anthropic import Anthropic
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+from llama_index.core.llms import ChatMessage, MessageRole
+from src.llm_clients import llm_clients
 from src.constants import ANTHROPIC_MODEL
+from src.llm_cache import cached_completion, cached_stream_chat
 
 # Architecture mode prompt templates
 ARCHITECT_MODE_SYSTEM_PROMPT = """You are Cloud Pilot's Architecture Expert. Your role is to provide detailed architecture recommendations based on user requirements.
@@ -49,7 +51,21 @@ class ArchitectureAgent:
         Args:
             model_name: The name of the Anthropic model to use
         """
-        self.llm = Anthropic(model=model_name)
+        self.llm = llm_clients.get(model_name)
+
+    def _build_prompts(self, message: str, mode: str) -> Tuple[str, str]:
+        """Return the system prompt and prompt for a message in the specified mode."""
+        # Select the appropriate system prompt based on mode
+        system_prompt = ARCHITECT_MODE_SYSTEM_PROMPT if mode == "architect" else DEPLOY_MODE_SYSTEM_PROMPT
+
+        # Create a prompt that includes context about what the user is asking for
+        prompt = f"""
+            User request: {message}
+            
+            Please provide a detailed response with architecture recommendations or deployment instructions based on the user's request.
+            Include specific AWS services, cost estimates, and diagrams where appropriate.
+            """
+        return system_prompt, prompt
 
     def process_message(self, message: str, mode: str = "architect") -> Dict[str, Any]:
         """Process a message in the specified mode using Anthropic.
@@ -62,19 +78,11 @@ class ArchitectureAgent:
             A dictionary with the response
         """
         try:
-            # Select the appropriate system prompt based on mode
-            system_prompt = ARCHITECT_MODE_SYSTEM_PROMPT if mode == "architect" else DEPLOY_MODE_SYSTEM_PROMPT
-            
-            # Create a prompt that includes context about what the user is asking for
-            prompt = f"""
-            User request: {message}
-            
-            Please provide a detailed response with architecture recommendations or deployment instructions based on the user's request.
-            Include specific AWS services, cost estimates, and diagrams where appropriate.
-            """
+            system_prompt, prompt = self._build_prompts(message, mode)
             
             # Call Anthropic with the system prompt and user message
-            response = self.llm.complete(
+            response = cached_completion(
+                "architecture", self.llm,
                 prompt=prompt,
                 system_prompt=system_prompt,
                 max_tokens=4000,
@@ -88,6 +96,36 @@ class ArchitectureAgent:
         except Exception as e:
             # Fall back to static responses if there's an error
             return self._get_fallback_response(message, mode, str(e))
+
+    async def astream_message(self, message: str, mode: str = "architect") -> AsyncIterator[str]:
+        """Stream the response to a message in the specified mode as it is generated.
+        
+        Args:
+            message: The user message to process
+            mode: The mode to use (architect or deploy)
+            
+        Yields:
+            Each new piece of the response text; the fallback response
+            as one piece if the LLM call fails before sending any text
+        """
+        system_prompt, prompt = self._build_prompts(message, mode)
+        messages = [
+            ChatMessage(role=MessageRole.SYSTEM, content=system_prompt),
+            ChatMessage(role=MessageRole.USER, content=prompt),
+        ]
+        started = False
+        try:
+            async for text in cached_stream_chat(
+                "architecture", self.llm, messages, max_tokens=4000, temperature=0.7
+            ):
+                started = True
+                yield text
+        except Exception as e:
+            # Text already shown can't be taken back, so only fall back
+            # when nothing was sent
+            if started:
+                raise
+            yield self._get_fallback_response(message, mode, str(e))["message"]
     
     def _get_fallback_response(self, message: str, mode: str, error: str) -> Dict[str, Any]:
         """Provide fallback responses if the LLM call fails.
@@ -3,8 +3,9 @@
 import os
 import subprocess
 from typing import Dict, List, Optional, Tuple
-from llama_index.llms.anthropic import Anthropic
+from src.llm_clients import llm_clients
 from src.constants import ANTHROPIC_MODEL
+from src.metrics import timed_completion
 
 class CDKGeneratorAgent:
     """Agent for generating and managing AWS CDK configurations."""
@@ -13,7 +14,7 @@ class CDKGeneratorAgent:
         """Initialize the CDK generator agent."""
         self.cdk_dir = "./cdk"
         self.existing_files = {}
-        self.llm = Anthropic(model=model_name)
+        self.llm = llm_clients.get(model_name)
 
     def initialize_workspace(self) -> None:
         """
@@ -144,7 +145,7 @@ Generate ONLY complete, valid Python code following this exact format. Make sure
 """
 
         # Generate the CDK code
-        response = self.llm.complete(prompt)
+        response = timed_completion("cdk_generator", self.llm, prompt)
         print(f"\n=== Attempt {retry_count + 1} ===")
         print(response.text)
         cdk_code = response.text.strip()
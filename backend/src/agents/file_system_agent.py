@@ -5,10 +5,11 @@ import shutil
 import glob
 from typing import Dict, List, Optional
 
-from llama_index.llms.anthropic import Anthropic
+from src.llm_clients import llm_clients
 from llama_index.core import Settings
 from llama_index.core.tools import BaseTool, FunctionTool
 from src.constants import ANTHROPIC_MODEL
+from src.metrics import timed_completion
 
 class FileSystemAgent:
     """Agent for performing file system operations."""
@@ -20,7 +21,7 @@ class FileSystemAgent:
         Args:
             model_name: The name of the Anthropic model to use
         """
-        self.llm = Anthropic(model=model_name)
+        self.llm = llm_clients.get(model_name)
         self.tools = self._create_tools()
 
     def _create_tools(self) -> List[BaseTool]:
@@ -230,7 +231,7 @@ class FileSystemAgent:
         Only include relevant fields. Return only the JSON, no explanations.
         """
 
-        response = self.llm.complete(prompt)
+        response = timed_completion("file_system", self.llm, prompt)
 
         # Parse the response to get the operation details
         import json
@@ -1,15 +1,16 @@
 """Interpreter agent for converting user requests into AWS service specifications."""
 
 from typing import Dict, Optional
-from llama_index.llms.anthropic import Anthropic
+from src.llm_clients import llm_clients
 from src.constants import ANTHROPIC_MODEL
+from src.llm_cache import cached_completion
 
 class InterpreterAgent:
     """Agent for interpreting user requests into AWS service specifications."""
 
     def __init__(self, model_name: str = ANTHROPIC_MODEL):
         """Initialize the interpreter agent."""
-        self.llm = Anthropic(model=model_name)
+        self.llm = llm_clients.get(model_name)
 
     def interpret_request(self, user_request: str) -> str:
         """
@@ -41,5 +42,5 @@ class InterpreterAgent:
         Return only the technical specification, no explanations.
         """
 
-        response = self.llm.complete(prompt)
+        response = cached_completion("interpreter", self.llm, prompt)
         return response.text.strip()
\ No newline at end of file
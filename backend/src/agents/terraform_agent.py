@@ -3,11 +3,14 @@
 import os
 from typing import Dict, List, Optional
 
-from llama_index.llms.anthropic import Anthropic
+from src.llm_clients import llm_clients
 from llama_index.core import Settings
 from llama_index.core.tools import BaseTool, FunctionTool
 import subprocess
-from src.constants import ANTHROPIC_MODEL
+from src.constants import ANTHROPIC_MODEL, TERRAFORM_BINARY
+from src.llm_cache import cached_completion
+from src.metrics import timed_completion
+from src.terraform.init_cache import ensure_init
 
 class TerraformAgent:
     """Agent for working with Terraform code."""
@@ -19,7 +22,7 @@ class TerraformAgent:
         Args:
             model_name: The name of the Anthropic model to use
         """
-        self.llm = Anthropic(model=model_name)
+        self.llm = llm_clients.get(model_name)
         self.tools = self._create_tools()
 
     def _create_tools(self) -> List[BaseTool]:
@@ -107,19 +110,9 @@ class TerraformAgent:
             The output of the terraform init command
         """
         try:
-            # Change to the specified directory
-            original_dir = os.getcwd()
-            os.chdir(directory)
-
-            # Run terraform init
-            result = subprocess.run(
-                ["terraform", "init"],
-                capture_output=True,
-                text=True
-            )
-
-            # Change back to the original directory
-            os.chdir(original_dir)
+            # Run terraform init in the specified directory, unless its
+            # providers and lock file are unchanged since the last init
+            result = ensure_init(directory)
 
             if result.returncode == 0:
                 return result.stdout
@@ -139,31 +132,20 @@ class TerraformAgent:
             The output of the terraform plan command
         """
         try:
-            # Change to the specified directory
-            original_dir = os.getcwd()
-            os.chdir(directory)
-
-            # First run terraform init
-            init_result = subprocess.run(
-                ["terraform", "init"],
-                capture_output=True,
-                text=True
-            )
+            # First run terraform init if needed
+            init_result = ensure_init(directory)
 
             if init_result.returncode != 0:
-                os.chdir(original_dir)
                 return f"Error initializing Terraform: {init_result.stderr}"
 
             # Run terraform plan
             plan_result = subprocess.run(
-                ["terraform", "plan", "-no-color"],
+                [TERRAFORM_BINARY, "plan", "-no-color"],
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=directory
             )
 
-            # Change back to the original directory
-            os.chdir(original_dir)
-
             if plan_result.returncode == 0:
                 return plan_result.stdout
             else:
@@ -183,25 +165,19 @@ class TerraformAgent:
             The output of the terraform apply command
         """
         try:
-            # Change to the specified directory
-            original_dir = os.getcwd()
-            os.chdir(directory)
-
             # Prepare the command
-            cmd = ["terraform", "apply","-auto-approve"]
+            cmd = [TERRAFORM_BINARY, "apply","-auto-approve"]
             if auto_approve:
                 cmd.append("-auto-approve")
 
-            # Run terraform apply
+            # Run terraform apply in the specified directory
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=directory
             )
 
-            # Change back to the original directory
-            os.chdir(original_dir)
-
             if result.returncode == 0:
                 return result.stdout
             else:
@@ -221,25 +197,19 @@ class TerraformAgent:
             The output of the terraform destroy command
         """
         try:
-            # Change to the specified directory
-            original_dir = os.getcwd()
-            os.chdir(directory)
-
             # Prepare the command
-            cmd = ["terraform", "destroy", "-no-color"]
+            cmd = [TERRAFORM_BINARY, "destroy", "-no-color"]
             if auto_approve:
                 cmd.append("-auto-approve")
 
-            # Run terraform destroy
+            # Run terraform destroy in the specified directory
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=directory
             )
 
-            # Change back to the original directory
-            os.chdir(original_dir)
-
             if result.returncode == 0:
                 return result.stdout
             else:
@@ -283,7 +253,7 @@ class TerraformAgent:
         Return only the JSON, no explanations.
         """
 
-        response = self.llm.complete(prompt)
+        response = cached_completion("terraform", self.llm, prompt)
 
         # Parse the response to get the analysis
         import json
@@ -325,7 +295,7 @@ class TerraformAgent:
             Return only the Terraform code, no explanations.
             """
 
-        response = self.llm.complete(prompt)
+        response = timed_completion("terraform", self.llm, prompt)
 
         # Extract the code from the response
         terraform_code = response.text
@@ -2,9 +2,12 @@
 
 import os
 import subprocess
-from typing import Tuple
-from llama_index.llms.anthropic import Anthropic
-from src.constants import ANTHROPIC_MODEL
+from typing import Optional, Tuple
+from src.llm_clients import llm_clients
+from src.constants import ANTHROPIC_MODEL, TERRAFORM_BINARY
+from src.llm_cache import cached_completion
+from src.terraform.init_cache import ensure_init
+from src.terraform.repair import CodeRepairer, syntax_problems
 
 class TerraformGeneratorAgent:
     """Agent for generating and managing Terraform configurations."""
@@ -13,9 +16,9 @@ class TerraformGeneratorAgent:
         """Initialize the Terraform generator agent."""
         self.terraform_dir = "./terraform"
         self.existing_files = {}
-        # Configure Anthropic with max tokens and a higher temperature for more complete responses
-        self.llm = Anthropic(
-            model=model_name,
+        # Shared client with max tokens and a higher temperature for more complete responses
+        self.llm = llm_clients.get(
+            model_name,
             max_tokens=4096,  # Ensure we get complete responses
             temperature=0.7   # Slightly higher temperature for more complete generations
         )
@@ -38,36 +41,45 @@ class TerraformGeneratorAgent:
                     self.existing_files[file] = f.read()
 
     def validate_code(self, code: str) -> bool:
-        """Validate the generated Terraform code for common syntax errors."""
-        # Check for incomplete statements
-        if code.count('{') != code.count('}'):
-            return False
-        if code.count('[') != code.count(']'):
-            return False
-        if code.count('(') != code.count(')'):
-            return False
-
-        # Check for incomplete blocks
-        if code.endswith('resource') or code.endswith('variable') or code.endswith('provider'):
-            return False
-
-        # Check for incomplete resource blocks
-        if 'resource "' in code and not code.strip().endswith('}'):
-            return False
-
-        return True
-
-    def generate_code(self, aws_specification: str, retry_count: int = 0) -> str:
-        """Generate Terraform configuration based on AWS specification."""
+        """Validate the generated Terraform code for common syntax errors.
+
+        Blocks must be complete and closed, brackets balanced outside strings
+        and heredocs, and there must be no text besides Terraform blocks.
+        """
+        return not syntax_problems(code)
+
+    def generate_code(self, aws_specification: str, retry_count: int = 0,
+                      working_dir: Optional[str] = None, flow_id: Optional[str] = None,
+                      regenerate: bool = False) -> str:
+        """Generate Terraform configuration based on AWS specification.
+
+        Code that fails validation is repaired block by block; the whole
+        file is only regenerated when that does not work, and only while
+        the flow has token budget left.
+
+        Args:
+            aws_specification: The infrastructure to generate code for
+            retry_count: Number of attempts made so far
+            working_dir: Workspace whose current state the code should build on
+            flow_id: Flow whose token budget the LLM calls are charged to
+            regenerate: Ask the LLM again instead of answering from the
+                response cache, e.g. after the user rejected the plan
+        """
         if retry_count >= 4:
             return ""
 
+        repairer = CodeRepairer("tf_generator", self.llm, flow_id)
+        if retry_count > 0 and repairer.remaining() <= 0:
+            print(f"\nToken budget spent, not regenerating after attempt {retry_count}")
+            return ""
+
         try:
             # Get current infrastructure state
             show_result = subprocess.run(
-                ["terraform", "show"],
+                [TERRAFORM_BINARY, "show"],
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=working_dir
             )
             current_state = show_result.stdout if show_result.returncode == 0 else "No existing infrastructure"
 
@@ -153,8 +165,11 @@ GENERAL REQUIREMENTS:
 Generate ONLY the Terraform configuration, starting with the terraform block:
 """
 
-            # Generate the Terraform code
-            response = self.llm.complete(prompt)
+            # Generate the Terraform code; a retry or a rejected plan asks the
+            # LLM again instead of getting the rejected response from the cache
+            response = cached_completion("tf_generator", self.llm, prompt,
+                                         refresh=regenerate or retry_count > 0)
+            repairer.charge(prompt, response)
             print(f"\n=== Attempt {retry_count + 1} ===")
 
             # Get and validate the response text
@@ -171,15 +186,20 @@ Generate ONLY the Terraform configuration, starting with the terraform block:
                 print(f"\nResponse too short on attempt {retry_count + 1}, retrying...")
                 return self.generate_code(
                     aws_specification=aws_specification,
-                    retry_count=retry_count + 1
+                    retry_count=retry_count + 1,
+                    working_dir=working_dir,
+                    flow_id=flow_id
                 )
 
-            # Validate the generated code
-            if not self.validate_code(tf_code):
+            # Patch the blocks the validator finds fault with
+            tf_code, problems = repairer.fix(tf_code, syntax_problems)
+            if problems:
                 print(f"\nCode validation failed on attempt {retry_count + 1}, retrying...")
                 return self.generate_code(
                     aws_specification=aws_specification,
-                    retry_count=retry_count + 1
+                    retry_count=retry_count + 1,
+                    working_dir=working_dir,
+                    flow_id=flow_id
                 )
 
             return tf_code
@@ -188,7 +208,9 @@ Generate ONLY the Terraform configuration, starting with the terraform block:
             print(f"\nError during attempt {retry_count + 1}: {str(e)}")
             return self.generate_code(
                 aws_specification=aws_specification,
-                retry_count=retry_count + 1
+                retry_count=retry_count + 1,
+                working_dir=working_dir,
+                flow_id=flow_id
             )
 
     def validate_terraform(self, terraform_dir: str) -> str:
@@ -202,36 +224,23 @@ Generate ONLY the Terraform configuration, starting with the terraform block:
             Validation result message
         """
         try:
-            # Change to the terraform directory
-            original_dir = os.getcwd()
-            os.chdir(terraform_dir)
-
-            # Run terraform init if .terraform directory doesn't exist
-            if not os.path.exists(".terraform"):
-                init_result = subprocess.run(
-                    ["terraform", "init"],
-                    capture_output=True,
-                    text=True
-                )
-                if init_result.returncode != 0:
-                    return f"Terraform init failed: {init_result.stderr}"
+            # Run terraform init unless the workspace is already initialized
+            init_result = ensure_init(terraform_dir)
+            if init_result.returncode != 0:
+                return f"Terraform init failed: {init_result.stderr}"
 
             # Run terraform validate
             validate_result = subprocess.run(
-                ["terraform", "validate"],
+                [TERRAFORM_BINARY, "validate"],
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=terraform_dir
             )
 
-            # Change back to original directory
-            os.chdir(original_dir)
-
             if validate_result.returncode == 0:
                 return "Terraform configuration is valid"
             else:
                 return f"Terraform validation failed: {validate_result.stderr}"
 
         except Exception as e:
-            # Make sure we return to the original directory
-            os.chdir(original_dir)
             return f"Error validating Terraform: {str(e)}"
\ No newline at end of file
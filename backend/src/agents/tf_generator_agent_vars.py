@@ -3,9 +3,23 @@
 import os
 import subprocess
 import json
-from typing import Tuple, Dict, Any
-from llama_index.llms.anthropic import Anthropic
-from src.constants import ANTHROPIC_MODEL
+from typing import Any, Dict, List, Optional, Tuple
+from src.llm_clients import llm_clients
+from src.constants import ANTHROPIC_MODEL, TERRAFORM_BINARY
+from src.llm_cache import cached_completion
+from src.metrics import timed_completion
+from src.terraform.init_cache import ensure_init
+from src.terraform.repair import CodeRepairer, output_problems, syntax_problems
+
+
+def _is_json(text: str) -> bool:
+    """Return whether the text parses as JSON."""
+    try:
+        json.loads(text.strip())
+    except json.JSONDecodeError:
+        return False
+    return True
+
 
 class TerraformGeneratorAgent:
     """Agent for generating and managing Terraform configurations."""
@@ -14,9 +28,9 @@ class TerraformGeneratorAgent:
         """Initialize the Terraform generator agent."""
         self.terraform_dir = "./terraform"
         self.existing_files = {}
-        # Configure Anthropic with max tokens and a higher temperature for more complete responses
-        self.llm = Anthropic(
-            model=model_name,
+        # Shared client with max tokens and a higher temperature for more complete responses
+        self.llm = llm_clients.get(
+            model_name,
             max_tokens=4096,  # Ensure we get complete responses
             temperature=0.7   # Slightly higher temperature for more complete generations
         )
@@ -39,24 +53,12 @@ class TerraformGeneratorAgent:
                     self.existing_files[file] = f.read()
 
     def validate_code(self, code: str) -> bool:
-        """Validate the generated Terraform code for common syntax errors."""
-        # Check for incomplete statements
-        if code.count('{') != code.count('}'):
-            return False
-        if code.count('[') != code.count(']'):
-            return False
-        if code.count('(') != code.count(')'):
-            return False
+        """Validate the generated Terraform code for common syntax errors.
 
-        # Check for incomplete blocks
-        if code.endswith('resource') or code.endswith('variable') or code.endswith('provider'):
-            return False
-
-        # Check for incomplete resource blocks
-        if 'resource "' in code and not code.strip().endswith('}'):
-            return False
-
-        return True
+        Blocks must be complete and closed, brackets balanced outside strings
+        and heredocs, and there must be no text besides Terraform blocks.
+        """
+        return not syntax_problems(code)
 
     def read_tfvars(self, output_dir: str) -> Dict[str, Any]:
         """Read existing tfvars file if it exists."""
@@ -120,7 +122,8 @@ Example format:
 
 Return ONLY the JSON dictionary, no other text.
 """
-        response = self.llm.complete(prompt)
+        # Only cache answers that parse, so a bad one is not served for the whole TTL
+        response = cached_completion("tf_generator_vars", self.llm, prompt, accept=_is_json)
         try:
             return json.loads(response.text.strip())
         except json.JSONDecodeError:
@@ -177,11 +180,30 @@ Return ONLY the JSON dictionary, no other text.
         with open(tfvars_path, 'w') as f:
             f.write('\n'.join(tfvars_content))
 
-    def generate_terraform(self, aws_specification: str, output_dir: str = "terraform_prod", retry_count: int = 0) -> Tuple[str, str]:
-        """Generate Terraform configuration based on AWS specification."""
+    def generate_terraform(self, aws_specification: str, output_dir: str = "terraform_prod", retry_count: int = 0,
+                           flow_id: Optional[str] = None) -> Tuple[str, str]:
+        """Generate Terraform configuration based on AWS specification.
+
+        Code that fails validation or planning is repaired by sending the
+        failing blocks and the error back to the LLM; the whole file is only
+        regenerated when that does not work, and only while the flow has
+        token budget left.
+        """
         if retry_count >= 4:
             return "", "Max retries reached - unable to generate valid Terraform configuration"
 
+        repairer = CodeRepairer("tf_generator_vars", self.llm, flow_id)
+        if retry_count > 0 and repairer.remaining() <= 0:
+            return "", "Token budget spent - unable to generate valid Terraform configuration"
+
+        def retry() -> Tuple[str, str]:
+            return self.generate_terraform(
+                aws_specification=aws_specification,
+                output_dir=output_dir,
+                retry_count=retry_count + 1,
+                flow_id=flow_id
+            )
+
         # Generate or update tfvars
         existing_vars = self.read_tfvars(output_dir)
         new_vars = self.generate_tfvars(aws_specification, output_dir)
@@ -214,7 +236,8 @@ IMPORTANT: Only generate resources that are enabled in the tfvars file.
 """
 
         # Generate the Terraform code
-        response = self.llm.complete(prompt)
+        response = timed_completion("tf_generator_vars", self.llm, prompt)
+        repairer.charge(prompt, response)
         print(f"\n=== Attempt {retry_count + 1} ===")
 
         # Get and validate the response text
@@ -224,78 +247,63 @@ IMPORTANT: Only generate resources that are enabled in the tfvars file.
         # Additional validation for response completeness
         if not tf_code or len(tf_code) < 50:  # Basic length check
             print(f"\nResponse too short on attempt {retry_count + 1}, retrying...")
-            return self.generate_terraform(
-                aws_specification=aws_specification,
-                output_dir=output_dir,
-                retry_count=retry_count + 1
-            )
+            return retry()
 
-        # Validate the generated code
-        if not self.validate_code(tf_code):
+        # Patch the blocks the validator finds fault with
+        tf_code, problems = repairer.fix(tf_code, syntax_problems)
+        if problems:
             print(f"\nCode validation failed on attempt {retry_count + 1}, retrying...")
-            return self.generate_terraform(
-                aws_specification=aws_specification,
-                output_dir=output_dir,
-                retry_count=retry_count + 1
-            )
+            return retry()
 
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
-        # Write the generated code to main.tf with explicit file handling
-        output_file = os.path.join(output_dir, "main.tf")
-        try:
-            with open(output_file, "w") as f:
-                f.write(tf_code)
+        results = {}
+
+        def plan_problems(code: str) -> List[Tuple[int, str]]:
+            """Write the code and plan it, returning the errors the plan points at."""
+            # Write the generated code to main.tf with explicit file handling
+            with open(os.path.join(output_dir, "main.tf"), "w") as f:
+                f.write(code)
                 f.flush()  # Explicitly flush the file
                 os.fsync(f.fileno())  # Ensure it's written to disk
-        except Exception as e:
-            print(f"\nError writing file on attempt {retry_count + 1}: {str(e)}")
-            return self.generate_terraform(
-                aws_specification=aws_specification,
-                output_dir=output_dir,
-                retry_count=retry_count + 1
-            )
-
-        # Store current directory
-        original_dir = os.getcwd()
-        deployment_output = ""
 
-        try:
-            # Change to the Terraform directory
-            os.chdir(output_dir)
-
-            # Run terraform init and plan
+            # Run terraform init and plan in the output directory
             print("\n=== Running Terraform Init & Plan ===")
-            init_result = subprocess.run(
-                ["terraform", "init"],
-                capture_output=True,
-                text=True
-            )
+            init_result = ensure_init(output_dir)
             print(init_result.stdout)
             if init_result.stderr:
                 print("Init Errors:", init_result.stderr)
 
             plan_result = subprocess.run(
-                ["terraform", "plan"],
+                [TERRAFORM_BINARY, "plan"],
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=output_dir
             )
             print(plan_result.stdout)
             if plan_result.stderr:
                 print("Plan Errors:", plan_result.stderr)
 
-            # If plan failed, retry with a new generation
-            if plan_result.returncode != 0:
-                print(f"\nPlan failed on attempt {retry_count + 1}, retrying...")
-                os.chdir(original_dir)
-                return self.generate_terraform(
-                    aws_specification=aws_specification,
-                    output_dir=output_dir,
-                    retry_count=retry_count + 1
-                )
-
-            deployment_output = f"""
+            results["init"], results["plan"] = init_result, plan_result
+            if plan_result.returncode == 0:
+                return []
+            return output_problems(init_result.stderr + "\n" + plan_result.stderr)
+
+        try:
+            # Patch the blocks a failed plan points at, and plan again
+            tf_code, problems = repairer.fix(tf_code, plan_problems)
+        except Exception as e:
+            print(f"\nError during attempt {retry_count + 1}: {str(e)}")
+            return retry()
+
+        # If the plan still fails, retry with a new generation
+        if problems:
+            print(f"\nPlan failed on attempt {retry_count + 1}, retrying...")
+            return retry()
+
+        init_result, plan_result = results["init"], results["plan"]
+        deployment_output = f"""
 Init Output:
 {init_result.stdout}
 {init_result.stderr if init_result.stderr else ''}
@@ -304,17 +312,6 @@ Plan Output:
 {plan_result.stdout}
 {plan_result.stderr if plan_result.stderr else ''}
 """
-        except Exception as e:
-            print(f"\nError during attempt {retry_count + 1}: {str(e)}")
-            os.chdir(original_dir)
-            return self.generate_terraform(
-                aws_specification=aws_specification,
-                output_dir=output_dir,
-                retry_count=retry_count + 1
-            )
-        finally:
-            # Return to original directory
-            os.chdir(original_dir)
 
         return tf_code, deployment_output
 
@@ -329,36 +326,23 @@ Plan Output:
             Validation result message
         """
         try:
-            # Change to the terraform directory
-            original_dir = os.getcwd()
-            os.chdir(terraform_dir)
-
-            # Run terraform init if .terraform directory doesn't exist
-            if not os.path.exists(".terraform"):
-                init_result = subprocess.run(
-                    ["terraform", "init"],
-                    capture_output=True,
-                    text=True
-                )
-                if init_result.returncode != 0:
-                    return f"Terraform init failed: {init_result.stderr}"
+            # Run terraform init unless the workspace is already initialized
+            init_result = ensure_init(terraform_dir)
+            if init_result.returncode != 0:
+                return f"Terraform init failed: {init_result.stderr}"
 
             # Run terraform validate
             validate_result = subprocess.run(
-                ["terraform", "validate"],
+                [TERRAFORM_BINARY, "validate"],
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=terraform_dir
             )
 
-            # Change back to original directory
-            os.chdir(original_dir)
-
             if validate_result.returncode == 0:
                 return "Terraform configuration is valid"
             else:
                 return f"Terraform validation failed: {validate_result.stderr}"
 
         except Exception as e:
-            # Make sure we return to the original directory
-            os.chdir(original_dir)
             return f"Error validating Terraform: {str(e)}"
\ No newline at end of file
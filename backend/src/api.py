@@ -1,16 +1,39 @@
 """FastAPI implementation for Cloud Pilot."""
 
-from typing import Dict, Optional, Any, Set
+from typing import Any, Coroutine, Dict, Optional, Set
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse
 from pydantic import BaseModel
 import asyncio
 import logging
+import os
 from uuid import uuid4
 
-from src.graph import build_example_graph
+from src.graph_registry import graph_registry
+from src.graph import checkpointer
+from src.flow_registry import FLOW_DONE, FLOW_RUNNING, FLOW_WAITING, FlowRegistry
 from src.state import CloudPilotState
-from src.constants import ACTION_GENERATE, ACTION_APPROVE_PLAN
+from src.constants import (
+    ACTION_GENERATE, ACTION_APPROVE_PLAN, GRAPH_MODE_ASYNC, MAX_FLOWS_PER_CONNECTION,
+    STREAM_FLUSH_INTERVAL_SECONDS, WORKSPACE_GC_INTERVAL_SECONDS
+)
+from src.terraform.workspace import workspace_manager
+from src.terraform.plan_files import PLAN_JSON_FILE
+from src.terraform.repair import token_budget
+from src.artifacts import artifact_store
+from src.progress_delta import ProgressEncoder
+from src.section_stream import SectionStream
+from src.framing import COMPRESSED_TYPES, FrameCodec, negotiate
+from src.scheduler import POOL_LLM, scheduler
+from src.flow_executor import FlowChannel, FlowExecutor, flow_executor
+from src.tracing import tracer
+from src.llm_clients import llm_clients
+from src.llm_cache import response_cache
+from src.metrics import (
+    CONNECTIONS, FLOWS, PROMETHEUS_CONTENT_TYPE, SCHEDULER_QUEUED, SCHEDULER_RUNNING,
+    registry as metrics_registry
+)
 from src.agents.architecture_agent import ArchitectureAgent
 from langgraph.types import Command
 
@@ -31,10 +54,22 @@ app.add_middleware(
 
 active_connections: Set[WebSocket] = set()
 
-# Store for pending interactions
-pending_interactions: Dict[str, asyncio.Future] = {}
-# Store for flow states
-flow_states: Dict[str, CloudPilotState] = {}
+# Long-running housekeeping tasks started at startup
+background_tasks: Set[asyncio.Task] = set()
+
+
+def release_flow(flow_id: str, reason: str) -> None:
+    """Free the workspace and checkpoints of a flow the registry dropped."""
+    logger.info(f"Releasing flow {flow_id} ({reason})")
+    workspace_manager.release(flow_id)
+    checkpointer.delete_thread(flow_id)
+    flow_executor.discard(flow_id)
+    tracer.discard(flow_id)
+    token_budget.discard(flow_id)
+
+
+# Flows waiting between messages, bounded by size and idle time
+flow_registry = FlowRegistry(on_remove=release_flow)
 # Initialize the architecture agent
 architecture_agent = ArchitectureAgent()
 
@@ -54,36 +89,503 @@ class FlowResponse(BaseModel):
 
 def handle_interrupt(interrupt_data: Dict[str, Any], state: CloudPilotState, flow_id: str) -> bool:
     """Handle interrupts from the langgraph flow by storing state and creating a future."""
-    # Store the state
-    flow_states[flow_id] = state
-    # Create a future for the response
-    future = asyncio.Future()
-    pending_interactions[flow_id] = future
+    # Store the state and a future for the response
+    flow_registry.register(flow_id, FLOW_WAITING, state=state, future=asyncio.Future())
     # Return a placeholder - the actual response will come later
     return False
 
+async def stream_flow(websocket: WebSocket, graph: Any, graph_input: Any, flow_id: str,
+                      encoder: Optional[ProgressEncoder] = None, client_id: Optional[str] = None) -> None:
+    """
+    Drive a flow with astream and forward its updates to the client.
+
+    Used both to start a flow and to resume it after an approval. Each node
+    update is sent as a ``progress`` event as soon as the node finishes, and
+    Terraform output is sent as ``log`` events while commands run. An
+    interrupt is sent as a ``confirmation`` and ends the stream until the
+    client answers it.
+
+    Progress events are delta encoded: they carry only the state keys that
+    changed since the client last heard about the flow, with ``delta`` set
+    so the client merges them into its copy.
+
+    Args:
+        websocket: The client connection
+        graph: The compiled async graph
+        graph_input: Initial state, or a ``Command`` to resume with
+        flow_id: The flow (and checkpoint thread) id
+        encoder: What the client was already sent about the flow, kept by
+            its channel; a fresh one when omitted
+        client_id: The connection the flow runs for, which the scheduler
+            shares its slots fairly among; the flow itself when omitted
+    """
+    encoder = encoder or ProgressEncoder()
+    config = {"configurable": {"flow_id": flow_id, "thread_id": flow_id, "client_id": client_id or flow_id}}
+    # Keep the flow and its workspace from being collected while it runs
+    flow_registry.register(flow_id, FLOW_RUNNING)
+    workspace_manager.touch(flow_id)
+    # The user answered, if the flow was waiting
+    tracer.end(flow_id, "approval_wait")
+    try:
+        with tracer.flow(flow_id), tracer.span("stream", "flow"):
+            await _forward_events(websocket, graph, graph_input, config, flow_id, encoder)
+    finally:
+        record = flow_registry.get(flow_id)
+        if record is not None and record.status == FLOW_RUNNING:
+            flow_registry.register(flow_id, FLOW_DONE)
+
+
+async def _forward_events(websocket: WebSocket, graph: Any, graph_input: Any,
+                          config: Dict[str, Any], flow_id: str, encoder: ProgressEncoder) -> None:
+    """Send a flow's astream events to the client until it ends or interrupts."""
+    async for mode, event in graph.astream(graph_input, config, stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            # A line of Terraform output, tagged with the flow it belongs to
+            await websocket.send_json({**event, "flow_id": flow_id})
+            continue
+
+        if "__interrupt__" in event:
+            # The flow is waiting for the user, send them the question
+            interrupt_data = event["__interrupt__"][0].value
+            flow_registry.register(flow_id, FLOW_WAITING)
+            tracer.begin(flow_id, "approval_wait")
+            await websocket.send_json({
+                "type": "confirmation",
+                "flow_id": flow_id,
+                "status": "waiting_for_input",
+                "question": interrupt_data.get("question"),
+                "plan_output": interrupt_data.get("plan_output"),
+                "terraform_json": interrupt_data.get("terraform_json"),
+            })
+            return
+
+        data, blobs = encoder.encode(flow_id, event)
+        message = {
+            "type": "progress",
+            "flow_id": flow_id,
+            "delta": True,
+            "data": data
+        }
+        if blobs:
+            message["blobs"] = blobs
+        await websocket.send_json(message)
+
+
+async def release_idle_flows() -> None:
+    """Drop idle flows and release their workspaces and checkpoints once."""
+    expired = flow_registry.collect_expired()
+    if expired:
+        logger.info(f"Expired {len(expired)} idle flows: {expired}")
+    # Workspaces of flows the registry does not know, e.g. from before a
+    # restart. Flows it tracks, such as ones waiting for an approval, are
+    # left to its own TTL.
+    released = await asyncio.to_thread(
+        workspace_manager.collect_garbage, keep=lambda flow_id: flow_id in flow_registry
+    )
+    for flow_id in released:
+        flow_executor.discard(flow_id)
+        tracer.discard(flow_id)
+        token_budget.discard(flow_id)
+        await asyncio.to_thread(checkpointer.delete_thread, flow_id)
+    if released:
+        logger.info(f"Released {len(released)} idle workspaces: {released}")
+
+
+async def collect_idle_flows() -> None:
+    """Periodically drop idle flows and release their workspaces and checkpoints."""
+    while True:
+        await asyncio.sleep(WORKSPACE_GC_INTERVAL_SECONDS)
+        try:
+            await release_idle_flows()
+        except Exception as e:
+            logger.error(f"Error collecting idle flows: {str(e)}", exc_info=True)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Log startup information."""
     logger.info("Starting Cloud Pilot API")
+    # Compile the workflow graphs once so no session pays for it
+    for mode, seconds in graph_registry.warm_up().items():
+        logger.info(f"Compiled graph mode={mode} in {seconds * 1000:.1f}ms")
+    background_tasks.add(asyncio.create_task(collect_idle_flows()))
     logger.info("WebSocket endpoint available at: /ws/ai-assist")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop running flows and persist queued checkpoints before the process exits."""
+    await flow_executor.shutdown()
+    checkpointer.close()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     logger.info("Health check request received")
     return {"status": "ok", "websocket_endpoint": "/ws/ai-assist"}
 
+@app.get("/flows/stats")
+async def flow_stats():
+    """Return the number of live flows and of expired and evicted ones."""
+    return {
+        **flow_registry.metrics(),
+        "workspaces": workspace_manager.stats(),
+        "scheduler": scheduler.stats(),
+        "llm_clients": llm_clients.stats(),
+        "llm_cache": response_cache.stats(),
+        "token_budget": token_budget.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Return node, Terraform, LLM, scheduler and flow metrics for Prometheus."""
+    for pool, stats in scheduler.stats().items():
+        SCHEDULER_RUNNING.set(stats["running"], pool=pool)
+        SCHEDULER_QUEUED.set(stats["queued"], pool=pool)
+    for status, count in flow_registry.status_counts().items():
+        FLOWS.set(count, status=status)
+    CONNECTIONS.set(len(active_connections))
+    return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/flows/{flow_id}/plan")
+async def get_flow_plan(flow_id: str):
+    """Return the full plan JSON of a flow; progress events only carry a summary."""
+    workspace = workspace_manager.path_for(flow_id)
+    plan_json_path = os.path.join(workspace, PLAN_JSON_FILE) if workspace else None
+    if not plan_json_path or not os.path.exists(plan_json_path):
+        raise HTTPException(status_code=404, detail="No plan found for this flow")
+    return FileResponse(plan_json_path, media_type="application/json")
+
+@app.get("/flows/{flow_id}/trace")
+async def get_flow_trace(flow_id: str):
+    """Return a flow's spans in the Chrome trace-event format."""
+    trace = tracer.export(flow_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="No trace for this flow")
+    return trace
+
+@app.get("/artifacts/{ref}")
+async def get_artifact(ref: str):
+    """Return a plan, show or state document referenced from a flow's state."""
+    try:
+        path = artifact_store.path_for(ref)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return FileResponse(path, media_type="application/json")
+
+class ConnectionSession:
+    """A client connection and the flows it follows.
+
+    Flows run in the shared flow executor, each as its own task, so the
+    reader loop is never blocked by a flow and a flow keeps running when the
+    client disconnects. The session subscribes to the channels of the flows
+    it starts or attaches to. A semaphore caps how many flows one
+    connection runs at once; further flows wait for a slot. Sends are
+    serialized so messages from concurrent flows never interleave.
+    """
+
+    def __init__(self, websocket: WebSocket, max_flows: int = MAX_FLOWS_PER_CONNECTION,
+                 codec: Optional[FrameCodec] = None, executor: Optional[FlowExecutor] = None):
+        """
+        Initialize the session.
+
+        Args:
+            websocket: The client connection
+            max_flows: Number of flows that may run at once
+            codec: Binary framing negotiated with the client, if any
+            executor: Where flows run, defaults to the shared executor
+        """
+        self.websocket = websocket
+        self.codec = codec
+        self.executor = executor or flow_executor
+        self.client_id = str(uuid4())
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_flows)
+
+    async def send_json(self, message: Dict[str, Any]) -> None:
+        """Send a message to the client, one at a time."""
+        async with self._send_lock:
+            if self.codec is not None and message.get("type") in COMPRESSED_TYPES:
+                # Compressing a large plan is kept off the event loop
+                payload = await asyncio.to_thread(self.codec.encode, message)
+                await self.websocket.send_bytes(payload)
+            else:
+                await self.websocket.send_json(message)
+
+    def start(self, flow_id: str, coro: Coroutine[Any, Any, None]) -> bool:
+        """
+        Run a flow's handler in the background and follow its events.
+
+        Args:
+            flow_id: The flow the handler works on
+            coro: The handler
+
+        Returns:
+            False if the flow is already running
+        """
+        task = self.executor.start(flow_id, self._run(flow_id, coro))
+        if task is None:
+            coro.close()
+            return False
+        self.executor.channel(flow_id).subscribe(self)
+        self.tasks[flow_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(flow_id, None))
+        return True
+
+    async def attach(self, flow_id: str, last_seq: int = 0) -> bool:
+        """
+        Follow a flow again after a reconnect, replaying what was missed.
+
+        Args:
+            flow_id: The flow to follow
+            last_seq: The last event of the flow the client received
+
+        Returns:
+            False if the flow is unknown
+        """
+        channel = self.executor.get(flow_id)
+        if channel is None:
+            return False
+        await channel.attach(self, last_seq)
+        return True
+
+    async def _run(self, flow_id: str, coro: Coroutine[Any, Any, None]) -> None:
+        """Run a handler once a slot is free and report its errors to the client."""
+        try:
+            async with self._slots:
+                await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in flow {flow_id}: {str(e)}", exc_info=True)
+            await self.executor.channel(flow_id).send_json({"type": "error", "flow_id": flow_id, "error": str(e)})
+        finally:
+            # Never awaited if the task was cancelled while waiting for a slot
+            coro.close()
+
+    def close(self) -> None:
+        """Stop following flows when the client goes away; they keep running."""
+        self.executor.detach_all(self)
+
+
+async def run_architecture_task(channel: FlowChannel, client_id: str, task: str, mode: str) -> None:
+    """Answer an architect or deploy mode request with the architecture agent.
+
+    The answer is streamed as it is generated: each ``progress`` event
+    carries a ``stream`` with the new text and the changes it makes to the
+    document's sections (see SectionStream). The finished document is then
+    sent as ``results``, like the answers of other modes.
+    """
+    logger.info(f"Processing architecture mode request: mode={mode}, task={task}")
+    flow_id = channel.flow_id
+    title = f"Architecture Recommendation ({mode.capitalize()} Mode)"
+    sections = SectionStream([{"type": "heading", "content": title, "metadata": {"level": 1}}])
+    # The title section is sent with the first text
+    changes = [{"index": 0, **sections.sections[0]}]
+    pending = []
+    message = []
+
+    async def flush(final: bool = False) -> None:
+        text = "".join(pending)
+        pending.clear()
+        changes.extend(sections.feed(text))
+        if final:
+            changes.extend(sections.finish())
+        if text or changes:
+            await channel.send_json({
+                "type": "progress",
+                "flow_id": flow_id,
+                "data": {"stream": {"title": title, "text": text, "sections": list(changes)}}
+            })
+        changes.clear()
+
+    # Wait for room in the LLM pool, telling the client while it is queued
+    def notify(event: Dict[str, Any]) -> None:
+        send = asyncio.create_task(channel.send_json({**event, "flow_id": flow_id}))
+        background_tasks.add(send)
+        send.add_done_callback(background_tasks.discard)
+
+    # Tracked like other flows so its answer can be replayed until it expires
+    flow_registry.register(flow_id, FLOW_RUNNING)
+    try:
+        with tracer.flow(flow_id):
+            async with scheduler.slot(POOL_LLM, client_id, notify):
+                loop = asyncio.get_running_loop()
+                flushed = None
+                async for chunk in architecture_agent.astream_message(task, mode):
+                    pending.append(chunk)
+                    message.append(chunk)
+                    # Send the first text at once, then batch what arrives
+                    # within the flush interval into one event
+                    if flushed is None or loop.time() - flushed >= STREAM_FLUSH_INTERVAL_SECONDS:
+                        await flush()
+                        flushed = loop.time()
+                await flush(final=True)
+    finally:
+        flow_registry.register(flow_id, FLOW_DONE)
+
+    # Send the whole response back to the client
+    await channel.send_json({
+        "type": "progress",
+        "flow_id": flow_id,
+        "data": {
+            "results": {
+                "message": "".join(message),
+                "structuredContent": {
+                    "title": title,
+                    "sections": sections.document()
+                }
+            }
+        }
+    })
+    logger.info(f"Sent architecture response for mode={mode}")
+
+
+async def handle_user_response(channel: FlowChannel, graph: Any, flow_id: str, approved: Any) -> None:
+    """Continue a flow paused by the legacy interrupt callback."""
+    record = flow_registry.get(flow_id)
+    if record is None or record.future is None:
+        await channel.send_json({
+            "type": "error",
+            "error": "No pending interaction found for this flow ID"
+        })
+        return
+
+    # Get the stored state and future
+    state = record.state
+    future = record.future
+
+    # Complete the future with the user's response
+    future.set_result(approved)
+
+    # Clean up
+    flow_registry.register(flow_id, FLOW_DONE, state=None, future=None)
+
+    # Continue the flow
+    async for event in graph.astream(
+        state,
+        {"configurable": {
+            "flow_id": flow_id,
+            "interrupt": lambda data, state: handle_interrupt(data, state, flow_id),
+            "thread_id": flow_id,
+        }}
+    ):
+        record = flow_registry.get(flow_id)
+        if record is not None and record.future is not None:
+            # We hit another interrupt
+            interrupt_data = event.get("interrupt_data", {})
+            await channel.send_json({
+                "type": "interrupt",
+                "flow_id": flow_id,
+                "status": "waiting_for_input",
+                "question": interrupt_data.get("question"),
+                "plan_output": interrupt_data.get("plan_output"),
+                "terraform_code": interrupt_data.get("terraform_code")
+            })
+            break
+        else:
+            # Send progress event to the client
+            await channel.send_json({
+                "type": "progress",
+                "flow_id": flow_id,
+                "data": event
+            })
+
+
+async def dispatch_message(session: ConnectionSession, graph: Any, message: Dict[str, Any]) -> None:
+    """Start the flow task that handles a client message."""
+    flow_id = str(uuid4())
+
+    if message.get("type") == "new_task":
+        # Check if this is an architecture mode request
+        mode = message.get("mode", "normal")
+        task = message.get("message", "")
+
+        logger.info(f"Processing task: mode={mode}, task={task}")
+
+        channel = session.executor.channel(flow_id)
+        if mode in ["architect", "deploy"]:
+            session.start(flow_id, run_architecture_task(channel, session.client_id, task, mode))
+        else:
+            # Start a new flow for normal mode
+            logger.info(f"Starting new flow: flow_id={flow_id}, task={task}")
+            initial_state = {
+                "task": task,
+                "terraform_code": "",
+                "terraform_file_path": "",
+                "result": "",
+                "error": "",
+                "next_action": ACTION_APPROVE_PLAN,
+            }
+            session.start(flow_id, stream_flow(
+                channel, graph, initial_state, flow_id, channel.encoder, session.client_id
+            ))
+
+    elif message.get("type") in ("confirmation", "user_response"):
+        flow_id = message.get("flow_id")
+        approved = message.get("approved")
+        if not flow_id:
+            await session.send_json({"type": "error", "error": "Missing flow_id"})
+            return
+
+        channel = session.executor.channel(flow_id)
+        if message["type"] == "confirmation":
+            logger.info(f"Resuming flow: flow_id={flow_id}, approved={approved}")
+            handler = stream_flow(
+                channel, graph, Command(resume={"approved": approved}), flow_id,
+                channel.encoder, session.client_id
+            )
+        else:
+            handler = handle_user_response(channel, graph, flow_id, approved)
+
+        if not session.start(flow_id, handler):
+            await session.send_json({
+                "type": "error",
+                "flow_id": flow_id,
+                "error": "This flow is already running"
+            })
+
+    elif message.get("type") == "attach":
+        # A reconnecting client picks up a flow where it left off; the flow
+        # itself is not touched, so nothing is re-planned
+        flow_id = message.get("flow_id")
+        last_seq = int(message.get("last_seq") or 0)
+        task = asyncio.create_task(attach_flow(session, flow_id, last_seq))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+
+async def attach_flow(session: ConnectionSession, flow_id: str, last_seq: int) -> None:
+    """Replay a flow's missed events to a client and tell it where the flow stands."""
+    if not flow_id or not await session.attach(flow_id, last_seq):
+        await session.send_json({"type": "error", "flow_id": flow_id, "error": "Unknown flow"})
+        return
+    record = flow_registry.get(flow_id)
+    await session.send_json({
+        "type": "attached",
+        "flow_id": flow_id,
+        "seq": session.executor.channel(flow_id).seq,
+        "status": record.status if record is not None else FLOW_DONE,
+        "running": session.executor.is_running(flow_id),
+    })
+
+
 @app.websocket("/ws/ai-assist")
 async def websocket_endpoint(websocket: WebSocket):
     logger.info(f"WebSocket connection request received from {websocket.client}")
+    # Clients that offer a compressed subprotocol get binary frames for
+    # large messages, others plain JSON
+    codec = negotiate(websocket.scope.get("subprotocols") or [])
+    session = ConnectionSession(websocket, codec=codec)
     try:
-        await websocket.accept()
+        await websocket.accept(subprotocol=codec.subprotocol if codec else None)
         logger.info(f"WebSocket connection accepted for {websocket.client}")
         active_connections.add(websocket)
         
         # Send an initial connection confirmation message
-        await websocket.send_json({
+        await session.send_json({
             "type": "connection_status",
             "status": "connected",
             "message": "WebSocket connection established successfully"
@@ -91,186 +593,18 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.info(f"Sent connection confirmation to {websocket.client}")
 
         try:
-            graph = build_example_graph()
+            # Async nodes keep Terraform off the event loop under astream
+            graph = graph_registry.get(GRAPH_MODE_ASYNC)
             while True:
-                # Wait for messages from the client
+                # Wait for messages from the client; flows run as their own
+                # tasks, so this loop only reads and dispatches
+                message = await websocket.receive_json()
+                logger.info(f'WebSocket message received from {websocket.client}: {message}')
                 try:
-                    message = await websocket.receive_json()
-                    logger.info(f'WebSocket message received from {websocket.client}: {message}')
-                    
-                    # Initialize the graph and state
-                    flow_id = str(uuid4())
-
-                    if message.get("type") == "new_task":
-                        # Check if this is an architecture mode request
-                        mode = message.get("mode", "normal")
-                        task = message.get("message", "")
-                        
-                        logger.info(f"Processing task: mode={mode}, task={task}")
-                        
-                        if mode in ["architect", "deploy"]:
-                            # Handle architecture mode request
-                            logger.info(f"Processing architecture mode request: mode={mode}, task={task}")
-                            
-                            # Process the message with the architecture agent
-                            response = architecture_agent.process_message(task, mode)
-                            
-                            # Send the response back to the client
-                            await websocket.send_json({
-                                "type": "progress",
-                                "flow_id": flow_id,
-                                "data": {
-                                    "results": {
-                                        "message": response["message"],
-                                        "structuredContent": {
-                                            "title": f"Architecture Recommendation ({mode.capitalize()} Mode)",
-                                            "sections": [
-                                                {
-                                                    "type": "heading",
-                                                    "content": f"Architecture Recommendation ({mode.capitalize()} Mode)",
-                                                    "metadata": {"level": 1}
-                                                },
-                                                {
-                                                    "type": "text",
-                                                    "content": response["message"]
-                                                }
-                                            ]
-                                        }
-                                    }
-                                }
-                            })
-                            logger.info(f"Sent architecture response for mode={mode}")
-                        else:
-                            # Start a new flow for normal mode
-                            flow_id = str(uuid4())
-                            task = message.get("message", "")
-                            logger.info(f"Starting new flow: flow_id={flow_id}, task={task}")
-                            initial_state = {
-                                "task": task,
-                                "terraform_code": "",
-                                "terraform_file_path": "",
-                                "result": "",
-                                "error": "",
-                                "next_action": ACTION_APPROVE_PLAN,
-                            }
-
-                            try:
-
-                                async for event in graph.astream(
-                                    initial_state,
-                                    {"configurable": {
-                                        "flow_id": flow_id,
-                                        "thread_id": flow_id,
-                                    }}
-                                ):
-                                    print('graph event: ', event)
-                                    print('is interrupt?', '__interrupt__' in event)
-
-                                    if '__interrupt__' in event:
-                                        # If this is a user interrupt, send the question to the client
-                                        interrupt_data = event['__interrupt__'][0].value
-                                        await websocket.send_json({
-                                            "type": "confirmation",
-                                            "flow_id": flow_id,
-                                            "status": "waiting_for_input",
-                                            "question": interrupt_data.get("question"),
-                                            "plan_output": interrupt_data.get("plan_output"),
-                                            "terraform_json": interrupt_data.get("terraform_json"),
-                                        })
-                                        break
-
-                                    else:
-                                        # Send progress event to the client
-                                        await websocket.send_json({
-                                            "type": "progress",
-                                            "flow_id": flow_id,
-                                            "data": event
-                                        })
-
-                            except Exception as e:
-                                print(f"error: {e}")
-                                await websocket.send_json({
-                                    "type": "error",
-                                    "flow_id": flow_id,
-                                    "error": str(e)
-                                })
-
-                    elif message.get("type") == "user_response":
-                        # Handle user response to an interrupt
-                        flow_id = message.get("flow_id")
-                        approved = message.get("approved")
-
-                        if flow_id not in pending_interactions:
-                            await websocket.send_json({
-                                "type": "error",
-                                "error": "No pending interaction found for this flow ID"
-                            })
-                            continue
-
-                        try:
-                            # Get the stored state and future
-                            state = flow_states[flow_id]
-                            future = pending_interactions[flow_id]
-
-                            # Complete the future with the user's response
-                            future.set_result(approved)
-
-                            # Clean up
-                            del pending_interactions[flow_id]
-                            del flow_states[flow_id]
-
-                            # Continue the flow
-                            graph = build_example_graph()
-                            async for event in graph.astream(
-                                state,
-                                {"configurable": {
-                                    "flow_id": flow_id,
-                                    "interrupt": lambda data, state: handle_interrupt(data, state, flow_id),
-                                    "thread_id": flow_id,
-                                }}
-                            ):
-                                if flow_id in pending_interactions:
-                                    # We hit another interrupt
-                                    interrupt_data = event.get("interrupt_data", {})
-                                    await websocket.send_json({
-                                        "type": "interrupt",
-                                        "flow_id": flow_id,
-                                        "status": "waiting_for_input",
-                                        "question": interrupt_data.get("question"),
-                                        "plan_output": interrupt_data.get("plan_output"),
-                                        "terraform_code": interrupt_data.get("terraform_code")
-                                    })
-                                    break
-                                else:
-                                    # Send progress event to the client
-                                    await websocket.send_json({
-                                        "type": "progress",
-                                        "flow_id": flow_id,
-                                        "data": event
-                                    })
-
-                        except Exception as e:
-                            print(f"error: {e}")
-                            await websocket.send_json({
-                                "type": "error",
-                                "flow_id": flow_id,
-                                "error": str(e)
-                            })
-
-                    elif message.get("type") == "confirmation":
-                        flow_id = message.get("flow_id")
-                        print(f"confirmation: flow_id={flow_id}")
-                        approved = message.get("approved")
-
-                        for chunk in graph.stream(Command(resume={"approved": approved}), config={"configurable": {"thread_id": flow_id}}):
-                            await websocket.send_json({
-                                "type": "progress",
-                                "flow_id": flow_id,
-                                "data": chunk
-                            })
+                    await dispatch_message(session, graph, message)
                 except Exception as e:
                     logger.error(f"Error processing message: {str(e)}", exc_info=True)
-                    await websocket.send_json({
+                    await session.send_json({
                         "type": "error",
                         "error": f"Error processing message: {str(e)}"
                     })
@@ -279,7 +613,7 @@ async def websocket_endpoint(websocket: WebSocket):
         except Exception as e:
             logger.error(f"Unexpected error in WebSocket connection: {str(e)}", exc_info=True)
             try:
-                await websocket.send_json({
+                await session.send_json({
                     "type": "error",
                     "error": f"Server error: {str(e)}"
                 })
@@ -288,6 +622,7 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"Error accepting WebSocket connection: {str(e)}", exc_info=True)
     finally:
+        session.close()
         if websocket in active_connections:
             active_connections.remove(websocket)
         logger.info(f"WebSocket connection closed for {websocket.client if hasattr(websocket, 'client') else 'unknown client'}")
@@ -0,0 +1,202 @@
+"""Content-addressed store for large Terraform artifacts."""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Union
+
+from src.constants import ARTIFACT_MAX_BYTES, ARTIFACT_MEMORY_BYTES, ARTIFACT_ROOT
+
+# References handed out by the store, e.g. "sha256:3b4c..."
+_REF_PATTERN = re.compile(r"^sha256:([0-9a-f]{64})$")
+
+
+class ArtifactStore:
+    """Hold plan, show and state documents outside the graph state.
+
+    Blobs are written once to disk under their SHA-256 and referenced by
+    ``sha256:<hex>`` strings, which is all the graph state, checkpoints and
+    progress events need to carry. Recently used blobs are also kept in a
+    size-bounded in-memory LRU. The least recently used blobs on disk are
+    removed once they grow past their size limit; a reference to a removed
+    blob is then missing, like one that was never stored.
+    """
+
+    def __init__(self, root: str = ARTIFACT_ROOT, memory_bytes: int = ARTIFACT_MEMORY_BYTES,
+                 max_bytes: int = ARTIFACT_MAX_BYTES):
+        """
+        Initialize the store.
+
+        Args:
+            root: Directory holding the blobs
+            memory_bytes: Total size of blobs kept in memory
+            max_bytes: Total size the blobs on disk may take up
+        """
+        self.root = root
+        self.memory_bytes = memory_bytes
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def put(self, data: Union[bytes, str]) -> str:
+        """
+        Store a blob.
+
+        Args:
+            data: The blob; text is stored UTF-8 encoded
+
+        Returns:
+            The blob's reference
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        ref = "sha256:" + hashlib.sha256(data).hexdigest()
+        path = self.path_for(ref)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write under a temporary name so readers never see a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            with self._lock:
+                self._evict(keep=path)
+        else:
+            self._touch(path)
+        self._remember(ref, data)
+        return ref
+
+    def put_json(self, document: Any) -> str:
+        """Store a JSON document and return its reference."""
+        return self.put(json.dumps(document, separators=(",", ":")))
+
+    def get(self, ref: str) -> bytes:
+        """
+        Load a blob.
+
+        Args:
+            ref: A reference returned by put
+
+        Returns:
+            The blob
+
+        Raises:
+            ValueError: If the reference is malformed
+            KeyError: If there is no such blob
+        """
+        with self._lock:
+            data = self._memory.get(ref)
+            if data is not None:
+                self._memory.move_to_end(ref)
+                return data
+        path = self.path_for(ref)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise KeyError(ref)
+        self._touch(path)
+        self._remember(ref, data)
+        return data
+
+    def get_json(self, ref: str) -> Any:
+        """Load a JSON document stored with put or put_json."""
+        return json.loads(self.get(ref))
+
+    def path_for(self, ref: str) -> str:
+        """
+        Return where a blob lives on disk.
+
+        Raises:
+            ValueError: If the reference is malformed
+        """
+        match = _REF_PATTERN.match(ref)
+        if not match:
+            raise ValueError(f"Invalid artifact reference: {ref}")
+        digest = match.group(1)
+        return os.path.join(self.root, digest[:2], digest)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number and size of blobs held in memory and on disk."""
+        with self._lock:
+            return {
+                "memory_items": len(self._memory), "memory_bytes": self._memory_size,
+                "disk_bytes": sum(self._blobs().values()),
+            }
+
+    def _touch(self, path: str) -> None:
+        """Mark a blob on disk as recently used."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _blobs(self) -> Dict[str, int]:
+        """Return the size of each complete blob on disk."""
+        if not os.path.isdir(self.root):
+            return {}
+        sizes = {}
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                # Temporary files of writes in progress have other names
+                if len(name) != 64:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    sizes[path] = os.path.getsize(path)
+                except OSError:
+                    pass
+        return sizes
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used blobs until the disk fits its limit."""
+        sizes = self._blobs()
+        total = sum(sizes.values())
+        for path in sorted(sizes, key=os.path.getmtime):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= sizes[path]
+            self._forget("sha256:" + os.path.basename(path))
+
+    def _forget(self, ref: str) -> None:
+        """Drop a blob removed from disk from the in-memory LRU."""
+        data = self._memory.pop(ref, None)
+        if data is not None:
+            self._memory_size -= len(data)
+
+    def _remember(self, ref: str, data: bytes) -> None:
+        """Keep a blob in the in-memory LRU, evicting the oldest ones."""
+        if len(data) > self.memory_bytes:
+            return
+        with self._lock:
+            if ref in self._memory:
+                self._memory.move_to_end(ref)
+                return
+            self._memory[ref] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+
+# Shared store so every flow deduplicates against the same blobs
+artifact_store = ArtifactStore()
@@ -0,0 +1,455 @@
+"""Durable SQLite checkpointer for the workflow graphs."""
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.types import TASKS, ChannelProtocol
+
+from src.constants import (
+    CHECKPOINT_BATCH_SIZE, CHECKPOINT_DB_PATH, CHECKPOINT_FLUSH_INTERVAL_SECONDS,
+    CHECKPOINT_RETENTION
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# Inserts queued by put and put_writes until the next flush
+_INSERT_CHECKPOINT = "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_WRITE = "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+# Special writes (errors, interrupts) overwrite earlier ones, as in MemorySaver
+_REPLACE_WRITE = "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpoint saver backed by a SQLite database.
+
+    Checkpoints survive restarts, so a flow waiting for plan approval can be
+    resumed by a new process, and the WAL-mode database can be shared by
+    several workers on one host.
+
+    Writes are batched: ``put`` and ``put_writes`` only queue their rows,
+    which are committed in one transaction once ``batch_size`` rows are
+    queued or ``flush_interval`` seconds have passed. Reads flush first, so
+    they always see every earlier write. Each flush also compacts the
+    threads it touched down to their last ``retention`` checkpoints.
+    """
+
+    def __init__(
+        self,
+        path: str = CHECKPOINT_DB_PATH,
+        *,
+        retention: int = CHECKPOINT_RETENTION,
+        batch_size: int = CHECKPOINT_BATCH_SIZE,
+        flush_interval: float = CHECKPOINT_FLUSH_INTERVAL_SECONDS,
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        """
+        Initialize the saver. The database is opened on first use.
+
+        Args:
+            path: The SQLite database file
+            retention: Checkpoints kept per thread and namespace, at least 2
+                so the latest checkpoint's parent is always kept
+            batch_size: Queued rows that trigger an immediate flush
+            flush_interval: Longest time a queued row waits for a flush
+            serde: The serializer for checkpoints and writes
+        """
+        super().__init__(serde=serde)
+        self.path = path
+        self.retention = max(retention, 2)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[str, tuple]] = []
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._timer: Optional[threading.Timer] = None
+
+    # Storage
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database and create the schema on first use."""
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _enqueue(self, rows: List[Tuple[str, tuple]], thread: Tuple[str, str]) -> None:
+        """Queue rows for the next flush, flushing now if the batch is full."""
+        with self._lock:
+            self._pending.extend(rows)
+            self._dirty.add(thread)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Commit all queued rows in one transaction and compact their threads."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            dirty, self._dirty = self._dirty, set()
+            conn = self._connection()
+            with conn:
+                for statement, params in pending:
+                    conn.execute(statement, params)
+                for thread_id, checkpoint_ns in dirty:
+                    self._prune(conn, thread_id, checkpoint_ns)
+
+    def _prune(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str) -> None:
+        """Delete all but the newest checkpoints of a thread, and their writes."""
+        stale = [
+            row[0] for row in conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+                (thread_id, checkpoint_ns, self.retention),
+            )
+        ]
+        for checkpoint_id in stale:
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", key
+            )
+            conn.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", key
+            )
+
+    def compact(self) -> None:
+        """Apply the retention policy to every thread and shrink the WAL file."""
+        with self._lock:
+            self.flush()
+            conn = self._connection()
+            with conn:
+                threads = conn.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints").fetchall()
+                for thread_id, checkpoint_ns in threads:
+                    self._prune(conn, thread_id, checkpoint_ns)
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Remove every checkpoint and write of a thread."""
+        with self._lock:
+            self.flush()
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def close(self) -> None:
+        """Flush queued rows and close the database."""
+        with self._lock:
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Reads
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        """Flush queued rows, then run a query."""
+        with self._lock:
+            self.flush()
+            return self._connection().execute(sql, params).fetchall()
+
+    def _load_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        """Build a checkpoint tuple from a checkpoints row."""
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._query(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        sends = []
+        if parent_checkpoint_id:
+            sends = self._query(
+                "SELECT type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ? "
+                "ORDER BY task_path, task_id, idx",
+                (thread_id, checkpoint_ns, parent_checkpoint_id, TASKS),
+            )
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **self.serde.loads_typed((type_, checkpoint)),
+                "pending_sends": [self.serde.loads_typed(send) for send in sends],
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Get a checkpoint tuple from the database.
+
+        Args:
+            config: The config naming the thread and, optionally, the checkpoint
+
+        Returns:
+            The requested or latest checkpoint of the thread, or None
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        if checkpoint_id := get_checkpoint_id(config):
+            rows = self._query(
+                f"SELECT {columns} FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            rows = self._query(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+        if not rows:
+            return None
+        return self._load_tuple(thread_id, checkpoint_ns, rows[0])
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        List checkpoints from the database, newest first.
+
+        Args:
+            config: Restricts the listing to a thread, namespace or checkpoint
+            filter: Metadata values the checkpoints must have
+            before: Only list checkpoints older than this one
+            limit: Maximum number of checkpoints to return
+
+        Yields:
+            The matching checkpoint tuples
+        """
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            f"metadata_type, metadata FROM checkpoints {where} ORDER BY checkpoint_id DESC",
+            tuple(params),
+        )
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._load_tuple(thread_id, checkpoint_ns, tuple(row))
+
+    # Writes
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Queue a checkpoint for saving.
+
+        Args:
+            config: The config of the checkpoint's parent
+            checkpoint: The checkpoint to save
+            metadata: Metadata to save with the checkpoint
+            new_versions: New channel versions as of this write
+
+        Returns:
+            The config of the saved checkpoint
+        """
+        c = checkpoint.copy()
+        c.pop("pending_sends")  # type: ignore[misc]
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        self._enqueue(
+            [(_INSERT_CHECKPOINT, (
+                thread_id, checkpoint_ns, checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),
+                type_, serialized, metadata_type, serialized_metadata,
+            ))],
+            (thread_id, checkpoint_ns),
+        )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Queue a task's intermediate writes for saving.
+
+        Args:
+            config: The config of the checkpoint the writes belong to
+            writes: The writes, each as a (channel, value) pair
+            task_id: Identifier for the task creating the writes
+            task_path: Path of the task creating the writes
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for index, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, index)
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append((
+                _INSERT_WRITE if idx >= 0 else _REPLACE_WRITE,
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type_, serialized, task_path),
+            ))
+        self._enqueue(rows, (thread_id, checkpoint_ns))
+
+    # Async versions. Reads commit the queued rows before querying and a
+    # put commits them once the batch is full, so each call runs in a worker
+    # thread instead of blocking the event loop on SQLite.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async version of get_tuple."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of list."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of put."""
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of put_writes."""
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    def get_next_version(self, current: Optional[str], channel: ChannelProtocol) -> str:
+        """Return the next channel version, in the same format as MemorySaver."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
@@ -1,5 +1,7 @@
 """Constants used throughout the Cloud Pilot application."""
 
+import os
+
 # Node/Edge names
 NODE_ANALYZE_TERRAFORM = "analyze_terraform"
 NODE_GENERATE_TERRAFORM = "generate_terraform"
@@ -19,4 +21,99 @@ ACTION_APPROVE_PLAN = "approve_plan"
 ACTION_USER_INTERACTION = "user_interaction"
 ACTION_END = "end"
 
-ANTHROPIC_MODEL = "claude-3-5-sonnet-20240620"
\ No newline at end of file
+ANTHROPIC_MODEL = "claude-3-5-sonnet-20240620"
+
+# Graph variants (keyed by the websocket "mode" field)
+GRAPH_MODE_NORMAL = "normal"
+GRAPH_MODE_ASYNC = "async"
+
+# Custom stream event carrying a line of Terraform output
+EVENT_LOG = "log"
+# Custom stream event telling a client its job waits for a free slot
+EVENT_QUEUED = "queued"
+
+# Terraform subprocess settings
+TERRAFORM_BINARY = os.environ.get("TERRAFORM_BIN", "terraform")
+TERRAFORM_MAX_CONCURRENCY = int(os.environ.get("TERRAFORM_MAX_CONCURRENCY", "8"))
+TERRAFORM_TIMEOUT_SECONDS = float(os.environ.get("TERRAFORM_TIMEOUT_SECONDS", "1800"))
+# Lines of streamed plan/apply output kept per stream once a command ends
+TERRAFORM_LOG_TAIL_LINES = int(os.environ.get("TERRAFORM_LOG_TAIL_LINES", "200"))
+
+# Per-flow Terraform workspaces
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKSPACE_ROOT = os.environ.get(
+    "CLOUDPILOT_WORKSPACE_ROOT", os.path.join(PROJECT_ROOT, "terraform_workspaces")
+)
+WORKSPACE_POOL_SIZE = int(os.environ.get("CLOUDPILOT_WORKSPACE_POOL_SIZE", "4"))
+WORKSPACE_IDLE_TTL_SECONDS = float(os.environ.get("CLOUDPILOT_WORKSPACE_IDLE_TTL_SECONDS", "3600"))
+WORKSPACE_GC_INTERVAL_SECONDS = float(os.environ.get("CLOUDPILOT_WORKSPACE_GC_INTERVAL_SECONDS", "300"))
+
+# Provider plugins downloaded once and shared by every workspace
+TERRAFORM_PLUGIN_CACHE_DIR = os.environ.get(
+    "TF_PLUGIN_CACHE_DIR", os.path.join(WORKSPACE_ROOT, "plugin-cache")
+)
+
+# Saved plans reused for byte-identical configurations
+PLAN_CACHE_DIR = os.environ.get(
+    "CLOUDPILOT_PLAN_CACHE_DIR", os.path.join(WORKSPACE_ROOT, "plan-cache")
+)
+PLAN_CACHE_MAX_BYTES = int(os.environ.get("CLOUDPILOT_PLAN_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Plan, show and state documents kept out of the graph state
+ARTIFACT_ROOT = os.environ.get(
+    "CLOUDPILOT_ARTIFACT_ROOT", os.path.join(WORKSPACE_ROOT, "artifacts")
+)
+ARTIFACT_MEMORY_BYTES = int(os.environ.get("CLOUDPILOT_ARTIFACT_MEMORY_BYTES", str(64 * 1024 * 1024)))
+ARTIFACT_MAX_BYTES = int(os.environ.get("CLOUDPILOT_ARTIFACT_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Durable graph checkpoints
+CHECKPOINT_DB_PATH = os.environ.get(
+    "CLOUDPILOT_CHECKPOINT_DB", os.path.join(WORKSPACE_ROOT, "checkpoints.sqlite")
+)
+# Checkpoints kept per flow; older ones are compacted away
+CHECKPOINT_RETENTION = int(os.environ.get("CLOUDPILOT_CHECKPOINT_RETENTION", "10"))
+CHECKPOINT_BATCH_SIZE = int(os.environ.get("CLOUDPILOT_CHECKPOINT_BATCH_SIZE", "64"))
+CHECKPOINT_FLUSH_INTERVAL_SECONDS = float(os.environ.get("CLOUDPILOT_CHECKPOINT_FLUSH_INTERVAL_SECONDS", "0.05"))
+
+# Flows tracked by the API between messages
+FLOW_REGISTRY_MAX_FLOWS = int(os.environ.get("CLOUDPILOT_MAX_FLOWS", "1000"))
+FLOW_IDLE_TTL_SECONDS = float(os.environ.get("CLOUDPILOT_FLOW_IDLE_TTL_SECONDS", "3600"))
+# Flows one WebSocket connection may run at once; more wait for a slot
+MAX_FLOWS_PER_CONNECTION = int(os.environ.get("CLOUDPILOT_MAX_FLOWS_PER_CONNECTION", "4"))
+# Events kept per flow for clients that reattach after a disconnect
+FLOW_EVENT_BUFFER_SIZE = int(os.environ.get("CLOUDPILOT_FLOW_EVENT_BUFFER_SIZE", "1024"))
+
+# Progress values at least this large are sent once per connection and
+# referenced by digest afterwards
+PROGRESS_BLOB_MIN_BYTES = int(os.environ.get("CLOUDPILOT_PROGRESS_BLOB_MIN_BYTES", "1024"))
+# Streamed LLM text arriving within this many seconds is sent as one event
+STREAM_FLUSH_INTERVAL_SECONDS = float(os.environ.get("CLOUDPILOT_STREAM_FLUSH_INTERVAL_SECONDS", "0.05"))
+
+# Jobs admitted at once across all flows, per kind of work; more are queued
+LLM_MAX_CONCURRENCY = int(os.environ.get("CLOUDPILOT_LLM_MAX_CONCURRENCY", "8"))
+PLAN_MAX_CONCURRENCY = int(os.environ.get("CLOUDPILOT_PLAN_MAX_CONCURRENCY", "4"))
+APPLY_MAX_CONCURRENCY = int(os.environ.get("CLOUDPILOT_APPLY_MAX_CONCURRENCY", "2"))
+# Jobs waiting per pool before new ones are turned away
+SCHEDULER_MAX_QUEUED = int(os.environ.get("CLOUDPILOT_SCHEDULER_MAX_QUEUED", "256"))
+
+# Trace spans kept per flow for /flows/{id}/trace
+TRACE_MAX_EVENTS = int(os.environ.get("CLOUDPILOT_TRACE_MAX_EVENTS", "4096"))
+
+# Tokens a flow may spend generating and repairing Terraform; once spent,
+# failing code is no longer repaired or regenerated
+GENERATION_TOKEN_BUDGET = int(os.environ.get("CLOUDPILOT_GENERATION_TOKEN_BUDGET", "40000"))
+# Error-guided repairs tried on generated code before it is regenerated
+REPAIR_MAX_ATTEMPTS = int(os.environ.get("CLOUDPILOT_REPAIR_MAX_ATTEMPTS", "3"))
+
+# Cached LLM responses, keyed by model, parameters and prompt
+LLM_CACHE_DIR = os.environ.get(
+    "CLOUDPILOT_LLM_CACHE_DIR", os.path.join(WORKSPACE_ROOT, "llm-cache")
+)
+LLM_CACHE_MEMORY_BYTES = int(os.environ.get("CLOUDPILOT_LLM_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("CLOUDPILOT_LLM_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# Seconds a cached response stays valid, per agent, as "agent=seconds,...";
+# responses of agents not listed are not cached
+LLM_CACHE_TTLS = os.environ.get(
+    "CLOUDPILOT_LLM_CACHE_TTLS",
+    "architecture=86400,interpreter=86400,terraform=3600,tf_generator=3600,tf_generator_vars=3600",
+)
@@ -0,0 +1,169 @@
+"""Background execution of flows, independent of client connections."""
+
+import asyncio
+from collections import deque
+from typing import Any, Coroutine, Deque, Dict, Optional, Protocol, Set, Tuple
+
+from src.constants import FLOW_EVENT_BUFFER_SIZE
+from src.progress_delta import ProgressEncoder
+
+
+class Subscriber(Protocol):
+    """A client connection receiving a flow's events."""
+
+    async def send_json(self, message: Dict[str, Any]) -> None:
+        ...
+
+
+class FlowChannel:
+    """The numbered event stream of one flow.
+
+    Every event a flow sends gets the next ``seq`` and is kept in a bounded
+    ring buffer before it is fanned out to the attached connections. A
+    client that reconnects attaches with the last ``seq`` it saw and is
+    sent what it missed. If the missed events are no longer buffered it
+    gets a ``snapshot`` of the flow state instead, followed by what is.
+
+    The channel also owns the flow's progress encoder, so progress deltas
+    are relative to the flow's own event stream and replay correctly on any
+    connection.
+    """
+
+    def __init__(self, flow_id: str, buffer_size: int = FLOW_EVENT_BUFFER_SIZE):
+        """
+        Initialize the channel.
+
+        Args:
+            flow_id: The flow the events belong to
+            buffer_size: Number of events kept for replay
+        """
+        self.flow_id = flow_id
+        self.seq = 0
+        self.encoder = ProgressEncoder()
+        self._buffer: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = asyncio.Lock()
+
+    async def send_json(self, message: Dict[str, Any]) -> None:
+        """Number an event, buffer it and send it to the attached clients."""
+        async with self._lock:
+            self.seq += 1
+            message = {**message, "seq": self.seq}
+            self._buffer.append((self.seq, message))
+            for subscriber in list(self._subscribers):
+                await self._deliver(subscriber, message)
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """Send a client the events from now on."""
+        self._subscribers.add(subscriber)
+
+    async def attach(self, subscriber: Subscriber, last_seq: int = 0) -> None:
+        """
+        Replay the events a client missed and send it the ones that follow.
+
+        Args:
+            subscriber: The client connection
+            last_seq: The last event the client received, 0 for none
+        """
+        async with self._lock:
+            oldest = self._buffer[0][0] if self._buffer else self.seq + 1
+            if last_seq + 1 < oldest:
+                # The client missed events that are gone, start it over
+                await self._deliver(subscriber, {
+                    "type": "snapshot",
+                    "flow_id": self.flow_id,
+                    "seq": oldest - 1,
+                    "data": self.encoder.snapshot(self.flow_id),
+                })
+            for seq, message in self._buffer:
+                if seq > last_seq:
+                    await self._deliver(subscriber, message)
+            self._subscribers.add(subscriber)
+
+    def detach(self, subscriber: Subscriber) -> None:
+        """Stop sending a client events."""
+        self._subscribers.discard(subscriber)
+
+    async def _deliver(self, subscriber: Subscriber, message: Dict[str, Any]) -> None:
+        """Send an event to a client, dropping the client if it is gone."""
+        try:
+            await subscriber.send_json(message)
+        except Exception:
+            self._subscribers.discard(subscriber)
+
+
+class FlowExecutor:
+    """Run flows as tasks that outlive the connection that started them.
+
+    A flow keeps running when its client disconnects, so a plan or apply in
+    progress is not lost; its events are buffered in the flow's channel
+    until a client attaches again. Channels live until the flow registry
+    lets go of the flow.
+    """
+
+    def __init__(self, buffer_size: int = FLOW_EVENT_BUFFER_SIZE):
+        """
+        Initialize the executor.
+
+        Args:
+            buffer_size: Number of events kept per flow for replay
+        """
+        self.buffer_size = buffer_size
+        self._channels: Dict[str, FlowChannel] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def channel(self, flow_id: str) -> FlowChannel:
+        """Return a flow's channel, creating it for a new flow."""
+        channel = self._channels.get(flow_id)
+        if channel is None:
+            channel = self._channels[flow_id] = FlowChannel(flow_id, self.buffer_size)
+        return channel
+
+    def get(self, flow_id: str) -> Optional[FlowChannel]:
+        """Return a flow's channel, or None if the flow is unknown."""
+        return self._channels.get(flow_id)
+
+    def is_running(self, flow_id: str) -> bool:
+        """Return whether a flow has a task running."""
+        return flow_id in self._tasks
+
+    def start(self, flow_id: str, coro: Coroutine[Any, Any, None]) -> Optional[asyncio.Task]:
+        """
+        Run a flow's handler in the background.
+
+        Args:
+            flow_id: The flow the handler works on
+            coro: The handler
+
+        Returns:
+            The task, or None if the flow is already running, in which case
+            the handler is closed without running
+        """
+        if flow_id in self._tasks:
+            coro.close()
+            return None
+        task = asyncio.create_task(coro)
+        self._tasks[flow_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(flow_id, None))
+        return task
+
+    def discard(self, flow_id: str) -> None:
+        """Drop the channel of a flow that is no longer tracked."""
+        if flow_id not in self._tasks:
+            self._channels.pop(flow_id, None)
+
+    def detach_all(self, subscriber: Subscriber) -> None:
+        """Stop sending a client the events of any flow."""
+        for channel in self._channels.values():
+            channel.detach(subscriber)
+
+    async def shutdown(self) -> None:
+        """Cancel the flows still running when the server stops."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Shared executor so any connection can attach to any flow
+flow_executor = FlowExecutor()
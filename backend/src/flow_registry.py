@@ -0,0 +1,175 @@
+"""Bounded registry of the flows the API is tracking."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from src.constants import FLOW_IDLE_TTL_SECONDS, FLOW_REGISTRY_MAX_FLOWS
+from src.metrics import FLOWS_REMOVED
+
+# Flow statuses
+FLOW_RUNNING = "running"
+FLOW_WAITING = "waiting_for_input"
+FLOW_DONE = "done"
+
+# Why a flow left the registry, passed to the cleanup callback
+REASON_EXPIRED = "expired"
+REASON_EVICTED = "evicted"
+
+
+@dataclass
+class FlowRecord:
+    """What the API keeps about a flow between messages."""
+
+    flow_id: str
+    status: str = FLOW_RUNNING
+    last_active: float = field(default_factory=time.time)
+    # Graph state and response future of the legacy user_response protocol
+    state: Optional[Dict[str, Any]] = None
+    future: Optional[asyncio.Future] = None
+
+
+class FlowRegistry:
+    """Track flows with a size cap, an idle TTL and LRU eviction.
+
+    Flows idle for longer than ``idle_ttl`` expire, and once more than
+    ``max_flows`` are tracked the least recently used idle ones are
+    evicted. Running flows are never evicted. Whenever a flow expires or is
+    evicted, its pending future is cancelled and ``on_remove`` is called
+    with the flow id and the reason, so its workspace and checkpoints can
+    be cleaned up.
+    """
+
+    def __init__(
+        self,
+        max_flows: int = FLOW_REGISTRY_MAX_FLOWS,
+        idle_ttl: float = FLOW_IDLE_TTL_SECONDS,
+        on_remove: Optional[Callable[[str, str], None]] = None,
+    ):
+        """
+        Initialize the registry.
+
+        Args:
+            max_flows: Number of flows tracked before idle ones are evicted
+            idle_ttl: Seconds of inactivity after which a flow expires
+            on_remove: Called with the flow id and reason for each expired
+                or evicted flow
+        """
+        self.max_flows = max_flows
+        self.idle_ttl = idle_ttl
+        self.on_remove = on_remove
+        self._flows: "OrderedDict[str, FlowRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._expired = 0
+        self._evicted = 0
+
+    def register(self, flow_id: str, status: str = FLOW_RUNNING, **fields: Any) -> FlowRecord:
+        """
+        Start tracking a flow, or update and touch a tracked one.
+
+        Args:
+            flow_id: The flow id
+            status: The flow's status
+            fields: Other FlowRecord fields to set
+
+        Returns:
+            The flow's record
+        """
+        with self._lock:
+            record = self._flows.get(flow_id)
+            if record is None:
+                record = FlowRecord(flow_id=flow_id)
+                self._flows[flow_id] = record
+            record.status = status
+            for name, value in fields.items():
+                setattr(record, name, value)
+            record.last_active = time.time()
+            self._flows.move_to_end(flow_id)
+            evicted = self._evict_over_capacity()
+        self._remove_all(evicted, REASON_EVICTED)
+        return record
+
+    def get(self, flow_id: str) -> Optional[FlowRecord]:
+        """Return a tracked flow and mark it as recently used."""
+        with self._lock:
+            record = self._flows.get(flow_id)
+            if record is not None:
+                record.last_active = time.time()
+                self._flows.move_to_end(flow_id)
+            return record
+
+    def discard(self, flow_id: str) -> Optional[FlowRecord]:
+        """Stop tracking a flow without cleaning it up."""
+        with self._lock:
+            return self._flows.pop(flow_id, None)
+
+    def collect_expired(self, now: Optional[float] = None) -> List[str]:
+        """
+        Remove and clean up every flow idle for longer than the TTL.
+
+        Args:
+            now: Current time, defaults to time.time()
+
+        Returns:
+            The expired flow ids
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                record for record in self._flows.values()
+                if record.status != FLOW_RUNNING and now - record.last_active > self.idle_ttl
+            ]
+            for record in expired:
+                del self._flows[record.flow_id]
+        self._remove_all(expired, REASON_EXPIRED)
+        return [record.flow_id for record in expired]
+
+    def metrics(self) -> Dict[str, int]:
+        """Return the number of live flows and of expired and evicted ones so far."""
+        with self._lock:
+            return {"live": len(self._flows), "expired": self._expired, "evicted": self._evicted}
+
+    def status_counts(self) -> Dict[str, int]:
+        """Return the number of tracked flows in each status."""
+        counts = {FLOW_RUNNING: 0, FLOW_WAITING: 0, FLOW_DONE: 0}
+        with self._lock:
+            for record in self._flows.values():
+                counts[record.status] = counts.get(record.status, 0) + 1
+        return counts
+
+    def __contains__(self, flow_id: str) -> bool:
+        with self._lock:
+            return flow_id in self._flows
+
+    def _evict_over_capacity(self) -> List[FlowRecord]:
+        """Pop least recently used idle flows until the cap is met; needs the lock."""
+        evicted = []
+        excess = len(self._flows) - self.max_flows
+        if excess <= 0:
+            return evicted
+        for record in list(self._flows.values()):
+            if len(evicted) == excess:
+                break
+            if record.status != FLOW_RUNNING:
+                evicted.append(self._flows.pop(record.flow_id))
+        return evicted
+
+    def _remove_all(self, records: List[FlowRecord], reason: str) -> None:
+        """Cancel pending futures and run the cleanup callback."""
+        for record in records:
+            with self._lock:
+                if reason == REASON_EXPIRED:
+                    self._expired += 1
+                else:
+                    self._evicted += 1
+            FLOWS_REMOVED.inc(reason=reason)
+            if record.future is not None and not record.future.done():
+                record.future.cancel()
+            if self.on_remove is not None:
+                try:
+                    self.on_remove(record.flow_id, reason)
+                except Exception as e:
+                    print(f"Error cleaning up flow {record.flow_id}: {str(e)}")
@@ -0,0 +1,75 @@
+"""Compressed binary framing for large WebSocket messages."""
+
+import json
+import zlib
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+    import zstandard
+except ImportError:  # pragma: no cover - both ship with the langgraph stack
+    msgpack = None
+    zstandard = None
+
+# WebSocket subprotocols a client may offer, best first
+SUBPROTOCOL_MSGPACK_ZSTD = "cloudpilot.msgpack+zstd"
+SUBPROTOCOL_JSON_DEFLATE = "cloudpilot.json+deflate"
+
+# Message types that carry plan and state documents and go out compressed;
+# everything else stays a JSON text frame
+COMPRESSED_TYPES = ("progress", "confirmation")
+
+ZSTD_LEVEL = 3
+DEFLATE_LEVEL = 6
+
+
+class FrameCodec:
+    """Encode messages for a negotiated subprotocol as binary frames."""
+
+    def __init__(self, subprotocol: str):
+        """
+        Initialize the codec.
+
+        Args:
+            subprotocol: One of the supported subprotocols
+        """
+        self.subprotocol = subprotocol
+        if subprotocol == SUBPROTOCOL_MSGPACK_ZSTD:
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        """Encode a message as the payload of a binary frame."""
+        if self.subprotocol == SUBPROTOCOL_MSGPACK_ZSTD:
+            return self._compressor.compress(msgpack.packb(message, default=str))
+        return zlib.compress(json.dumps(message, default=str).encode(), DEFLATE_LEVEL)
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        """Decode a binary frame payload back into a message."""
+        if self.subprotocol == SUBPROTOCOL_MSGPACK_ZSTD:
+            return msgpack.unpackb(self._decompressor.decompress(payload))
+        return json.loads(zlib.decompress(payload))
+
+
+def supported_subprotocols() -> List[str]:
+    """Return the subprotocols this server can speak, best first."""
+    if msgpack is not None and zstandard is not None:
+        return [SUBPROTOCOL_MSGPACK_ZSTD, SUBPROTOCOL_JSON_DEFLATE]
+    return [SUBPROTOCOL_JSON_DEFLATE]
+
+
+def negotiate(offered: List[str]) -> Optional[FrameCodec]:
+    """
+    Pick the framing for a connection from the subprotocols a client offers.
+
+    Args:
+        offered: The client's Sec-WebSocket-Protocol values
+
+    Returns:
+        The codec of the best subprotocol both sides speak, or None for
+        clients that offer none, which keep getting JSON text frames
+    """
+    for subprotocol in supported_subprotocols():
+        if subprotocol in offered:
+            return FrameCodec(subprotocol)
+    return None
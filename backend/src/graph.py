@@ -7,18 +7,19 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.messages import HumanMessage, AIMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.types import interrupt, Command
 
-from src.nodes.generate_terraform import generate_terraform
-from src.nodes.terraform_plan import terraform_plan
+from src.checkpointer import SQLiteCheckpointSaver
+from src.metrics import timed_node
+from src.nodes.generate_terraform import generate_terraform, agenerate_terraform
+from src.nodes.terraform_plan import terraform_plan, aterraform_plan
 from src.nodes.plan_approval import plan_approval, handle_plan_feedback
-from src.nodes.execute_terraform import execute_terraform
-from src.nodes.terraform_show import terraform_show
+from src.nodes.execute_terraform import execute_terraform, aexecute_terraform
+from src.nodes.terraform_show import terraform_show, aterraform_show
 
 from src.constants import (
     NODE_GENERATE_TERRAFORM, NODE_TERRAFORM_PLAN, NODE_PLAN_APPROVAL,
-    NODE_EXECUTE_TERRAFORM, ACTION_EXECUTE, ACTION_GENERATE, ACTION_USER_INTERACTION
+    NODE_EXECUTE_TERRAFORM, ACTION_APPROVE_PLAN, ACTION_EXECUTE, ACTION_GENERATE, ACTION_USER_INTERACTION
 )
 
 # Add constant for show node
@@ -37,23 +38,36 @@ class State(TypedDict):
     user_input: str
     next_action: str
 
-checkpointer = MemorySaver()
+# Durable, shared by every compiled graph so a flow can be resumed by any
+# of them, and after a restart
+checkpointer = SQLiteCheckpointSaver()
 
-def build_example_graph() -> StateGraph:
-    """Build the Terraform generation workflow graph."""
+def _after_execute(state: State) -> str:
+    """Route to plan approval when the apply needs a new plan approved."""
+    if state.get("next_action") == ACTION_APPROVE_PLAN:
+        return NODE_PLAN_APPROVAL
+    return NODE_TERRAFORM_SHOW
+
+def _build_graph(generate, plan, execute, show) -> StateGraph:
+    """Wire the Terraform workflow from the given node implementations."""
     graph = StateGraph(State)
 
     # Add nodes
-    graph.add_node(NODE_GENERATE_TERRAFORM, generate_terraform)
-    graph.add_node(NODE_TERRAFORM_PLAN, terraform_plan)
-    graph.add_node(NODE_PLAN_APPROVAL, plan_approval)
-    graph.add_node(NODE_EXECUTE_TERRAFORM, execute_terraform)
-    graph.add_node(NODE_TERRAFORM_SHOW, terraform_show)  # Use the constant instead
+    graph.add_node(NODE_GENERATE_TERRAFORM, timed_node(NODE_GENERATE_TERRAFORM, generate))
+    graph.add_node(NODE_TERRAFORM_PLAN, timed_node(NODE_TERRAFORM_PLAN, plan))
+    graph.add_node(NODE_PLAN_APPROVAL, timed_node(NODE_PLAN_APPROVAL, plan_approval))
+    graph.add_node(NODE_EXECUTE_TERRAFORM, timed_node(NODE_EXECUTE_TERRAFORM, execute))
+    graph.add_node(NODE_TERRAFORM_SHOW, timed_node(NODE_TERRAFORM_SHOW, show))  # Use the constant instead
 
     # Add edges with explicit state passing
     graph.add_edge(NODE_GENERATE_TERRAFORM, NODE_TERRAFORM_PLAN)
     graph.add_edge(NODE_TERRAFORM_PLAN, NODE_PLAN_APPROVAL)
-    graph.add_edge(NODE_EXECUTE_TERRAFORM, NODE_TERRAFORM_SHOW)  # Use the constant
+    # A re-plan whose changes differ from the approved plan is approved again
+    graph.add_conditional_edges(
+        NODE_EXECUTE_TERRAFORM,
+        _after_execute,
+        [NODE_PLAN_APPROVAL, NODE_TERRAFORM_SHOW],
+    )
     graph.add_edge(NODE_TERRAFORM_SHOW, END)  # Use the constant
 
     # Set entry point
@@ -62,6 +76,21 @@ def build_example_graph() -> StateGraph:
     return graph.compile(checkpointer=checkpointer)
 
 
+def build_example_graph() -> StateGraph:
+    """Build the Terraform generation workflow graph."""
+    return _build_graph(generate_terraform, terraform_plan, execute_terraform, terraform_show)
+
+
+def build_async_graph() -> StateGraph:
+    """
+    Build the workflow graph with async Terraform nodes.
+
+    Shares node names and the checkpointer with build_example_graph, so a
+    flow can be resumed on either variant.
+    """
+    return _build_graph(agenerate_terraform, aterraform_plan, aexecute_terraform, aterraform_show)
+
+
 # Build graph at module level for streaming
 graph = build_example_graph()
 
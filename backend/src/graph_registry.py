@@ -0,0 +1,91 @@
+"""Process-wide registry of compiled LangGraph workflows."""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from src.constants import GRAPH_MODE_NORMAL, GRAPH_MODE_ASYNC
+from src.graph import build_example_graph, build_async_graph
+
+logger = logging.getLogger(__name__)
+
+GraphBuilder = Callable[[], Any]
+
+
+class GraphRegistry:
+    """Compile each graph variant once and share it across all sessions.
+
+    A compiled graph holds no per-run data: every flow's state lives in the
+    checkpointer under its ``thread_id``. One compiled instance can therefore
+    serve any number of concurrent flows, and compiling it per connection only
+    adds latency.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, GraphBuilder] = {}
+        self._graphs: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.warmup_timings: Dict[str, float] = {}
+
+    def register(self, mode: str, builder: GraphBuilder) -> None:
+        """
+        Register a builder for a graph variant.
+
+        Args:
+            mode: The key the variant is looked up by
+            builder: Callable returning a compiled graph
+        """
+        with self._lock:
+            self._builders[mode] = builder
+            # Drop any graph compiled by a previous builder for this mode
+            self._graphs.pop(mode, None)
+
+    def modes(self) -> List[str]:
+        """Return the registered graph modes."""
+        return list(self._builders)
+
+    def get(self, mode: str = GRAPH_MODE_NORMAL) -> Any:
+        """
+        Return the compiled graph for a mode, compiling it on first use.
+
+        Args:
+            mode: The graph variant to return
+
+        Returns:
+            The shared compiled graph
+
+        Raises:
+            KeyError: If no builder is registered for the mode
+        """
+        compiled = self._graphs.get(mode)
+        if compiled is not None:
+            return compiled
+
+        with self._lock:
+            # Another thread may have compiled it while we waited
+            compiled = self._graphs.get(mode)
+            if compiled is None:
+                if mode not in self._builders:
+                    raise KeyError(f"No graph registered for mode: {mode}")
+                started = time.perf_counter()
+                compiled = self._builders[mode]()
+                self.warmup_timings[mode] = time.perf_counter() - started
+                self._graphs[mode] = compiled
+            return compiled
+
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Compile every registered graph variant.
+
+        Returns:
+            Compile time in seconds for each mode
+        """
+        for mode in self.modes():
+            self.get(mode)
+        return dict(self.warmup_timings)
+
+
+graph_registry = GraphRegistry()
+graph_registry.register(GRAPH_MODE_NORMAL, build_example_graph)
+graph_registry.register(GRAPH_MODE_ASYNC, build_async_graph)
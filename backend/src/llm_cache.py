@@ -0,0 +1,312 @@
+"""Content-addressed cache of LLM responses."""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from src.constants import LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_MEMORY_BYTES, LLM_CACHE_TTLS
+from src.metrics import LLM_CACHE_LOOKUPS, timed_completion, timed_stream
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """Parse ``agent=seconds`` pairs separated by commas."""
+    ttls = {}
+    for item in spec.split(","):
+        agent, _, seconds = item.partition("=")
+        if agent.strip() and seconds.strip():
+            ttls[agent.strip()] = float(seconds)
+    return ttls
+
+
+class ResponseCache:
+    """Answer repeated prompts without calling the LLM.
+
+    Responses are keyed by a hash of the model, its sampling parameters and
+    the prompt and call options, so a response is only reused for a request
+    that would have been sent identically. Entries are written to disk
+    under their key and the most recently used ones are also kept in a
+    size-bounded in-memory LRU. How long a response stays valid is set per
+    agent; agents without a TTL are not cached. An entry past every agent's
+    TTL is deleted when it is next read, and the least recently used entries
+    on disk are evicted once they grow past their size limit.
+    """
+
+    def __init__(self, root: str = LLM_CACHE_DIR, memory_bytes: int = LLM_CACHE_MEMORY_BYTES,
+                 ttls: Optional[Dict[str, float]] = None, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            root: Directory holding the entries
+            memory_bytes: Total size of responses kept in memory
+            ttls: Seconds a response stays valid, per agent; parsed from
+                LLM_CACHE_TTLS when omitted
+            max_bytes: Total size the entries on disk may take up
+        """
+        self.root = root
+        self.memory_bytes = memory_bytes
+        self.max_bytes = max_bytes
+        self.ttls = parse_ttls(LLM_CACHE_TTLS) if ttls is None else ttls
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, llm: Any, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+        """
+        Return the cache key of a completion request.
+
+        Args:
+            llm: The LLM client, whose model and sampling parameters are part of the key
+            args: Positional arguments to ``complete``
+            kwargs: Keyword arguments to ``complete``
+
+        Returns:
+            A hex digest of the request
+        """
+        request = {
+            "model": getattr(llm, "model", None),
+            "temperature": getattr(llm, "temperature", None),
+            "max_tokens": getattr(llm, "max_tokens", None),
+            "args": args,
+            "kwargs": kwargs,
+        }
+        encoded = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def get(self, agent: str, key: str) -> Optional[str]:
+        """
+        Return a cached response that is still valid for an agent.
+
+        Args:
+            agent: The agent asking, whose TTL applies
+            key: A key from key_for
+
+        Returns:
+            The response text, or None on a miss
+        """
+        ttl = self.ttls.get(agent, 0)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        from_disk = entry is None
+        if from_disk:
+            try:
+                with open(self.path_for(key), "r") as f:
+                    stored = json.load(f)
+                entry = (stored["created"], stored["text"])
+            except (OSError, ValueError, KeyError):
+                entry = None
+        age = time.time() - entry[0] if entry is not None else None
+        if age is not None and age > max(self.ttls.values(), default=0):
+            # No agent may use the entry any more
+            self._drop(key)
+            entry = None
+        hit = entry is not None and age <= ttl
+        if hit and from_disk:
+            self._touch(self.path_for(key))
+            self._remember(key, entry)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        LLM_CACHE_LOOKUPS.inc(agent=agent, result="hit" if hit else "miss")
+        return entry[1] if hit else None
+
+    def put(self, key: str, text: str) -> None:
+        """
+        Store a response.
+
+        Args:
+            key: A key from key_for
+            text: The response text
+        """
+        entry = (time.time(), text)
+        path = self.path_for(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write under a temporary name so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"created": entry[0], "text": text}, f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            with self._lock:
+                self._evict(keep=path)
+        except OSError as e:
+            print(f"Error caching LLM response: {str(e)}")
+        self._remember(key, entry)
+
+    def path_for(self, key: str) -> str:
+        """Return where an entry lives on disk."""
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit and miss counts and what the memory and disk tiers hold."""
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses,
+                "memory_items": len(self._memory), "memory_bytes": self._memory_size,
+                "disk_bytes": sum(self._entries().values()),
+            }
+
+    def _touch(self, path: str) -> None:
+        """Mark an entry on disk as recently used."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _drop(self, key: str) -> None:
+        """Delete an expired entry from memory and disk."""
+        with self._lock:
+            self._forget(key)
+        try:
+            os.remove(self.path_for(key))
+        except OSError:
+            pass
+
+    def _entries(self) -> Dict[str, int]:
+        """Return the size of each complete entry on disk."""
+        if not os.path.isdir(self.root):
+            return {}
+        sizes = {}
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                # Temporary files of writes in progress have other names
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    sizes[path] = os.path.getsize(path)
+                except OSError:
+                    pass
+        return sizes
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries until the disk fits its limit; needs the lock."""
+        sizes = self._entries()
+        total = sum(sizes.values())
+        for path in sorted(sizes, key=os.path.getmtime):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= sizes[path]
+            self._forget(os.path.basename(path)[:-len(".json")])
+
+    def _forget(self, key: str) -> None:
+        """Drop a response from the in-memory LRU; needs the lock."""
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_size -= len(entry[1])
+
+    def _remember(self, key: str, entry: Tuple[float, str]) -> None:
+        """Keep a response in the in-memory LRU, evicting the oldest ones."""
+        size = len(entry[1])
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_size -= len(previous[1])
+            self._memory[key] = entry
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted[1])
+
+
+def cached_completion(agent: str, llm: Any, *args: Any, refresh: bool = False,
+                      accept: Optional[Callable[[str], bool]] = None, **kwargs: Any) -> Any:
+    """
+    Answer a completion from the response cache, or call the LLM and cache it.
+
+    Args:
+        agent: The agent making the call, which selects the TTL and labels
+            the metrics
+        llm: The LLM client
+        args: Passed to ``complete``
+        refresh: Skip the lookup and replace the cached response, e.g. when
+            the caller rejected the cached one and retries
+        accept: Check a response must pass to be cached, so an unusable
+            answer is not served again for the whole TTL
+        kwargs: Passed to ``complete``
+
+    Returns:
+        The completion response
+    """
+    if not response_cache.ttls.get(agent):
+        return timed_completion(agent, llm, *args, **kwargs)
+
+    from llama_index.core.base.llms.types import CompletionResponse
+
+    key = response_cache.key_for(llm, args, kwargs)
+    text = None if refresh else response_cache.get(agent, key)
+    if text is not None:
+        return CompletionResponse(text=text, raw={"cached": True})
+
+    response = timed_completion(agent, llm, *args, **kwargs)
+    if isinstance(response.text, str) and response.text and (accept is None or accept(response.text)):
+        response_cache.put(key, response.text)
+    return response
+
+
+async def cached_stream_chat(agent: str, llm: Any, messages: List[Any], **kwargs: Any) -> AsyncIterator[str]:
+    """
+    Stream the text of a chat completion, or answer it from the response cache.
+
+    A cached response is yielded whole. A streamed one is cached once it
+    has finished, so an abandoned stream stores nothing.
+
+    Args:
+        agent: The agent making the call, which selects the TTL and labels
+            the metrics
+        llm: The LLM client
+        messages: The chat messages, passed to ``astream_chat``
+        kwargs: Passed to ``astream_chat``
+
+    Yields:
+        Each new piece of text
+    """
+    cacheable = bool(response_cache.ttls.get(agent))
+    if cacheable:
+        request = [{"role": getattr(message.role, "value", message.role), "content": message.content}
+                   for message in messages]
+        key = response_cache.key_for(llm, (request,), kwargs)
+        # Lookups may read from disk, so keep them off the event loop
+        text = await asyncio.to_thread(response_cache.get, agent, key)
+        if text is not None:
+            yield text
+            return
+
+    parts = []
+    async for delta in timed_stream(agent, llm, messages, **kwargs):
+        parts.append(delta)
+        yield delta
+    if cacheable and parts:
+        await asyncio.to_thread(response_cache.put, key, "".join(parts))
+
+
+# Shared cache so every flow and agent reuses the same responses
+response_cache = ResponseCache()
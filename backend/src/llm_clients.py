@@ -0,0 +1,57 @@
+"""Process-wide registry of LLM clients shared by the agents and nodes."""
+
+import threading
+from typing import Any, Dict, Tuple
+
+from llama_index.llms.anthropic import Anthropic
+
+from src.constants import ANTHROPIC_MODEL
+
+
+class LLMClientRegistry:
+    """Hand out one client per model and settings for the whole process.
+
+    Building an Anthropic client sets up a new HTTP client, so an agent
+    made per node call paid for new connections and TLS handshakes on every
+    request. Each client here keeps its HTTP connection pool, with
+    keep-alive, for the life of the process, and agents asking for the same
+    model and settings share it. The clients are safe to use from several
+    threads at once; per-call options such as a system prompt are passed
+    to ``complete`` instead of stored on the client.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str = ANTHROPIC_MODEL, **settings: Any) -> Any:
+        """
+        Return the shared client for a model and settings.
+
+        Args:
+            model: The Anthropic model name
+            settings: Other client settings, e.g. max_tokens or temperature
+
+        Returns:
+            The client, created on first use
+        """
+        key = (model, tuple(sorted(settings.items())))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = Anthropic(model=model, **settings)
+            return client
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of clients created so far."""
+        with self._lock:
+            return {"clients": len(self._clients)}
+
+    def clear(self) -> None:
+        """Drop every client, so the next ``get`` builds a new one."""
+        with self._lock:
+            self._clients.clear()
+
+
+# Shared registry so every agent reuses the same connections
+llm_clients = LLMClientRegistry()
@@ -0,0 +1,370 @@
+"""Process metrics exposed in the Prometheus text format."""
+
+import abc
+import asyncio
+import inspect
+import threading
+import time
+import typing
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langgraph.errors import GraphBubbleUp
+
+from src.tracing import tracer
+
+# Bucket bounds in seconds for graph nodes and Terraform commands
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+# Bucket bounds in seconds for LLM completions
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+# Content type of the text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a label set, e.g. ``{node="terraform_plan",le="1"}``."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    """A named metric with optional labels."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        """Return the exposition lines of the metric."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self) -> Iterable[str]:
+        """Return the sample lines of the metric."""
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """A value that is set to the current reading."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: count per bucket, sum, count
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[1][1]) if series else 0
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._series.items())
+        for key, (counts, totals) in items:
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(self.labels, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(totals[0])}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {int(totals[1])}"
+
+
+class MetricsRegistry:
+    """The metrics rendered by the ``/metrics`` endpoint."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+NODE_DURATION = registry.register(Histogram(
+    "cloudpilot_node_duration_seconds", "Time spent in each graph node.", ["node"]
+))
+NODE_ERRORS = registry.register(Counter(
+    "cloudpilot_node_errors_total", "Graph node runs that raised.", ["node"]
+))
+TERRAFORM_COMMAND_DURATION = registry.register(Histogram(
+    "cloudpilot_terraform_command_duration_seconds", "Wall time of Terraform subcommands.",
+    ["command", "status"]
+))
+LLM_DURATION = registry.register(Histogram(
+    "cloudpilot_llm_request_duration_seconds", "Latency of LLM completions.", ["agent"], LLM_BUCKETS
+))
+LLM_FIRST_TOKEN = registry.register(Histogram(
+    "cloudpilot_llm_first_token_seconds", "Time to the first text of streamed LLM completions.",
+    ["agent"], LLM_BUCKETS
+))
+LLM_TOKENS = registry.register(Counter(
+    "cloudpilot_llm_tokens_total", "Tokens sent to and received from the LLM.", ["agent", "direction"]
+))
+LLM_ERRORS = registry.register(Counter(
+    "cloudpilot_llm_errors_total", "LLM completions that failed.", ["agent"]
+))
+TERRAFORM_REPAIRS = registry.register(Counter(
+    "cloudpilot_terraform_repairs_total", "Error-guided repairs of generated Terraform, by result.",
+    ["agent", "result"]
+))
+LLM_CACHE_LOOKUPS = registry.register(Counter(
+    "cloudpilot_llm_cache_lookups_total", "LLM response cache lookups, by result.", ["agent", "result"]
+))
+SCHEDULER_RUNNING = registry.register(Gauge(
+    "cloudpilot_scheduler_running_jobs", "Jobs holding a scheduler slot.", ["pool"]
+))
+SCHEDULER_QUEUED = registry.register(Gauge(
+    "cloudpilot_scheduler_queued_jobs", "Jobs waiting for a scheduler slot.", ["pool"]
+))
+FLOWS = registry.register(Gauge(
+    "cloudpilot_flows", "Flows tracked by the API, by status.", ["status"]
+))
+FLOWS_REMOVED = registry.register(Counter(
+    "cloudpilot_flows_removed_total", "Flows dropped from the registry, by reason.", ["reason"]
+))
+CONNECTIONS = registry.register(Gauge(
+    "cloudpilot_websocket_connections", "Open WebSocket connections."
+))
+
+
+def timed_node(name: str, node: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap a graph node so its run time is recorded under its name.
+
+    Each run is also traced as a span of the config's flow, which the
+    Terraform and LLM spans inside it nest under. The wrapper takes the
+    run config and passes it on only to nodes that accept it. Runs that
+    stop at an interrupt or hand over with a command are not recorded; an
+    interrupted node runs again when the flow resumes.
+
+    Args:
+        name: The node name used in the graph
+        node: The sync or async node function
+
+    Returns:
+        A node function of the same kind
+    """
+    takes_config = "config" in inspect.signature(node).parameters
+    # LangGraph reads the state hint for the node's input schema and
+    # Command[...] return hints for where it goes, so the wrapper keeps both
+    try:
+        hints = typing.get_type_hints(node)
+    except Exception:
+        hints = {}
+    first = next(iter(inspect.signature(node).parameters), None)
+    annotations = {}
+    if first in hints:
+        annotations["state"] = hints[first]
+    if "return" in hints:
+        annotations["return"] = hints["return"]
+
+    def call(state: Any, config: Any) -> Any:
+        return node(state, config) if takes_config else node(state)
+
+    def flow_of(config: Any) -> Optional[str]:
+        return ((config or {}).get("configurable") or {}).get("flow_id") or tracer.current_flow()
+
+    if asyncio.iscoroutinefunction(node):
+        async def run_async(state: Any, config: Optional[Any] = None) -> Any:
+            started = time.perf_counter()
+            try:
+                with tracer.flow(flow_of(config)), tracer.span(name, "node"):
+                    result = await call(state, config)
+            except GraphBubbleUp:
+                raise
+            except Exception:
+                NODE_ERRORS.inc(node=name)
+                raise
+            NODE_DURATION.observe(time.perf_counter() - started, node=name)
+            return result
+        run_async.__annotations__.update(annotations)
+        return run_async
+
+    def run(state: Any, config: Optional[Any] = None) -> Any:
+        started = time.perf_counter()
+        try:
+            with tracer.flow(flow_of(config)), tracer.span(name, "node"):
+                result = call(state, config)
+        except GraphBubbleUp:
+            raise
+        except Exception:
+            NODE_ERRORS.inc(node=name)
+            raise
+        NODE_DURATION.observe(time.perf_counter() - started, node=name)
+        return result
+    run.__annotations__.update(annotations)
+    return run
+
+
+def token_usage(response: Any) -> Tuple[int, int]:
+    """Return the prompt and completion tokens reported with an LLM response."""
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return 0, 0
+
+    def read(*names: str) -> int:
+        for field in names:
+            value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+            if isinstance(value, int):
+                return value
+        return 0
+
+    # Anthropic reports input/output tokens, OpenAI prompt/completion tokens
+    return read("input_tokens", "prompt_tokens"), read("output_tokens", "completion_tokens")
+
+
+def timed_completion(agent: str, llm: Any, *args: Any, **kwargs: Any) -> Any:
+    """
+    Call ``llm.complete`` and record its latency and token counts, and
+    trace it as a span of the current flow.
+
+    Args:
+        agent: The agent making the call, used as the metric label
+        llm: The LLM client
+        args: Passed to ``complete``
+        kwargs: Passed to ``complete``
+
+    Returns:
+        The completion response
+    """
+    started = time.perf_counter()
+    try:
+        with tracer.span(f"llm {agent}", "llm"):
+            response = llm.complete(*args, **kwargs)
+    except Exception:
+        LLM_ERRORS.inc(agent=agent)
+        raise
+    LLM_DURATION.observe(time.perf_counter() - started, agent=agent)
+    prompt_tokens, completion_tokens = token_usage(response)
+    LLM_TOKENS.inc(prompt_tokens, agent=agent, direction="input")
+    LLM_TOKENS.inc(completion_tokens, agent=agent, direction="output")
+    return response
+
+
+async def timed_stream(agent: str, llm: Any, *args: Any, **kwargs: Any) -> AsyncIterator[str]:
+    """
+    Call ``llm.astream_chat`` and yield the text as it arrives, recording
+    its latency, time to first text and token counts, and tracing it as a
+    span of the current flow.
+
+    Args:
+        agent: The agent making the call, used as the metric label
+        llm: The LLM client
+        args: Passed to ``astream_chat``
+        kwargs: Passed to ``astream_chat``
+
+    Yields:
+        Each new piece of text
+    """
+    flow_id = tracer.current_flow()
+    started = time.perf_counter()
+    first_text = None
+    prompt_tokens = completion_tokens = 0
+    try:
+        async for response in await llm.astream_chat(*args, **kwargs):
+            # Anthropic reports input tokens when the message starts and
+            # output tokens when it ends
+            usage = token_usage(response)
+            prompt_tokens = max(prompt_tokens, usage[0])
+            completion_tokens = max(completion_tokens, usage[1])
+            delta = getattr(response, "delta", None)
+            if delta:
+                if first_text is None:
+                    first_text = time.perf_counter()
+                    LLM_FIRST_TOKEN.observe(first_text - started, agent=agent)
+                yield delta
+    except Exception as e:
+        LLM_ERRORS.inc(agent=agent)
+        if flow_id is not None:
+            tracer.record(flow_id, f"llm {agent}", "llm", started, time.perf_counter(),
+                          streamed=True, error=type(e).__name__)
+        raise
+    ended = time.perf_counter()
+    LLM_DURATION.observe(ended - started, agent=agent)
+    LLM_TOKENS.inc(prompt_tokens, agent=agent, direction="input")
+    LLM_TOKENS.inc(completion_tokens, agent=agent, direction="output")
+    if flow_id is not None:
+        tracer.record(flow_id, f"llm {agent}", "llm", started, ended, streamed=True)
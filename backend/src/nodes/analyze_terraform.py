@@ -3,7 +3,7 @@
 import os
 from typing import Dict
 
-from llama_index.llms.anthropic import Anthropic
+from src.llm_clients import llm_clients
 from llama_index.core import Settings
 
 # Import the CloudPilotState type
@@ -38,8 +38,8 @@ def analyze_terraform(state: CloudPilotState) -> CloudPilotState:
             new_state["error"] = "No Terraform code to analyze"
             return new_state
 
-        # Initialize the LLM
-        llm = Anthropic(model=ANTHROPIC_MODEL)
+        # Use the shared LLM client
+        llm = llm_clients.get(ANTHROPIC_MODEL)
 
         # Analyze the Terraform code
         prompt = f"""
@@ -1,18 +1,129 @@
 """Node for executing Terraform commands."""
 
 import os
+import json
+import asyncio
 import subprocess
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
 
 # Import the CloudPilotState type
 from src.state import CloudPilotState
-from src.constants import ACTION_USER_INTERACTION
+from src.constants import ACTION_APPROVE_PLAN, ACTION_USER_INTERACTION, TERRAFORM_BINARY
+from src.terraform.runner import terraform_runner
+from src.terraform.log_stream import terraform_log_writer
+from src.terraform.plan_files import (
+    PLAN_FILE, PLAN_JSON_FILE, STALE_PLAN_MARKER, discard_plan, is_plan_stale, record_plan,
+)
+from src.terraform.plan_summary import format_plan_summary, summarize_plan
+from src.scheduler import POOL_APPLY, scheduler
+
+
+def _apply_output(stdout: str, replanned: bool) -> str:
+    """Return the apply output, noting if the approved plan had to be redone."""
+    if not replanned:
+        return stdout
+    return "Saved plan was stale; Terraform re-planned before applying.\n" + stdout
+
+
+def _approved_summary(state: CloudPilotState, terraform_dir: str) -> Optional[Dict[str, Any]]:
+    """Return the summary of the plan the user approved, if it is known."""
+    if state.get("terraform_json"):
+        return state["terraform_json"]
+    try:
+        with open(os.path.join(terraform_dir, PLAN_JSON_FILE), "r") as f:
+            return summarize_plan(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def _plan_changes(summary: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Return the address and action of each resource a plan changes."""
+    records = (summary or {}).get("resource_changes") or []
+    return sorted((record.get("address") or "", record.get("action") or "") for record in records)
+
+
+def _plan_changed(approved: Optional[Dict[str, Any]], summary: Dict[str, Any]) -> bool:
+    """Return whether a new plan makes other changes than the approved one."""
+    return approved is None or _plan_changes(approved) != _plan_changes(summary)
+
+
+def _save_plan_json(terraform_dir: str, plan_json: str) -> Dict[str, Any]:
+    """Write a fresh plan's JSON next to it and return its summary."""
+    plan_json_path = os.path.join(terraform_dir, PLAN_JSON_FILE)
+    with open(plan_json_path, "w") as f:
+        f.write(plan_json)
+    return summarize_plan(json.loads(plan_json), plan_json_path)
+
+
+def _ask_approval(new_state: CloudPilotState, summary: Dict[str, Any]) -> CloudPilotState:
+    """Send a re-plan that differs from the approved plan back for approval."""
+    print("Re-planned changes differ from the approved plan, asking for approval")
+    new_state["terraform_json"] = summary
+    new_state["result"] = format_plan_summary(summary)
+    new_state["error"] = "The plan changed since it was approved; review the new plan before applying it."
+    new_state["next_action"] = ACTION_APPROVE_PLAN
+    return new_state
+
+
+def _replan(terraform_dir: str) -> Dict[str, Any]:
+    """Write a fresh saved plan when the approved one is stale and return its summary."""
+    print("Saved plan is stale, re-planning")
+    subprocess.run(
+        [TERRAFORM_BINARY, "plan", "-input=false", "-out=" + PLAN_FILE],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=terraform_dir or None
+    )
+    show_result = subprocess.run(
+        [TERRAFORM_BINARY, "show", "-json", PLAN_FILE],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=terraform_dir or None
+    )
+    record_plan(terraform_dir)
+    return _save_plan_json(terraform_dir, show_result.stdout)
+
+
+def _apply_saved_plan(terraform_dir: str) -> subprocess.CompletedProcess:
+    """Apply the saved plan; applying a plan file never prompts."""
+    return subprocess.run(
+        [TERRAFORM_BINARY, "apply", "-input=false", PLAN_FILE],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=terraform_dir or None
+    )
+
+
+async def _areplan(terraform_dir: str, config: Optional[RunnableConfig]):
+    """Async version of _replan, returning the failed result or the summary."""
+    print("Saved plan is stale, re-planning")
+    plan_result = await terraform_runner.stream(
+        "plan", "-input=false", "-no-color", "-out=" + PLAN_FILE, cwd=terraform_dir or None,
+        on_line=terraform_log_writer(config, "plan")
+    )
+    if plan_result.returncode != 0:
+        return plan_result, None
+    show_result = await terraform_runner.run("show", "-json", PLAN_FILE, cwd=terraform_dir or None)
+    if show_result.returncode != 0:
+        return show_result, None
+    await asyncio.to_thread(record_plan, terraform_dir)
+    return plan_result, await asyncio.to_thread(_save_plan_json, terraform_dir, show_result.stdout)
 
 
 def execute_terraform(state: CloudPilotState) -> CloudPilotState:
     """
     Execute Terraform commands on the generated code.
 
+    Applies the saved plan the user approved. Terraform only re-plans if
+    the configuration, lock file or state changed since that plan was made,
+    and a re-plan is only applied if it makes the same changes; otherwise
+    the new plan goes back to plan approval.
+
     Args:
         state: The current state of the graph
 
@@ -47,22 +158,41 @@ def execute_terraform(state: CloudPilotState) -> CloudPilotState:
             #     check=True
             # )
 
-            # Run Terraform apply
+            # Apply the saved plan the user approved, replanning only if
+            # the workspace changed since it was made. A re-plan that would
+            # make other changes goes back to the user instead.
+            approved = _approved_summary(state, terraform_dir)
+            replanned = False
+            if is_plan_stale(terraform_dir):
+                summary = _replan(terraform_dir)
+                if _plan_changed(approved, summary):
+                    return _ask_approval(new_state, summary)
+                replanned = True
+
             print("Running Terraform apply")
-            apply_result = subprocess.run(
-                ["terraform", "apply", "-auto-approve",],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            try:
+                apply_result = _apply_saved_plan(terraform_dir)
+            except subprocess.CalledProcessError as e:
+                # Terraform detected a state change we could not see
+                if replanned or STALE_PLAN_MARKER not in (e.stderr or ""):
+                    raise
+                summary = _replan(terraform_dir)
+                if _plan_changed(approved, summary):
+                    return _ask_approval(new_state, summary)
+                replanned = True
+                apply_result = _apply_saved_plan(terraform_dir)
             print("Terraform apply completed")
+            discard_plan(terraform_dir)
+
             # Update the state with the execution results
-            new_state["result"] = apply_result.stdout
+            new_state["result"] = _apply_output(apply_result.stdout, replanned)
             new_state["error"] = ""
 
         except subprocess.CalledProcessError as e:
             if "init" in str(e.cmd):
                 new_state["error"] = f"Terraform initialization failed: {e.stderr}"
+            elif "plan" in e.cmd:
+                new_state["error"] = f"Terraform plan failed: {e.stderr}"
             else:
                 new_state["error"] = f"Terraform apply failed: {e.stderr}"
         #finally:
@@ -74,4 +204,86 @@ def execute_terraform(state: CloudPilotState) -> CloudPilotState:
 
     # Always set next_action to user_interaction when done
     new_state["next_action"] = ACTION_USER_INTERACTION
-    return new_state
\ No newline at end of file
+    return new_state
+
+async def aexecute_terraform(state: CloudPilotState, config: Optional[RunnableConfig] = None) -> CloudPilotState:
+    """
+    Async version of execute_terraform.
+
+    Applies the saved plan in the Terraform file's directory through the
+    shared async runner, so a long apply does not block other flows, once
+    the scheduler's apply pool has a free slot. A re-plan of a stale plan
+    runs in the same slot and, like in execute_terraform, goes back to plan
+    approval when its changes differ from the approved plan. The output is
+    streamed to the client while it runs and only its tail is kept in the
+    state.
+
+    Args:
+        state: The current state of the graph
+        config: The run config, which carries the stream writer
+
+    Returns:
+        Updated state with execution results
+    """
+    # Create a copy of the state to modify
+    new_state = state.copy()
+
+    try:
+        # Check if we have a terraform file path
+        if not state["terraform_file_path"]:
+            new_state["error"] = "No Terraform file path specified"
+            new_state["next_action"] = ACTION_USER_INTERACTION
+            return new_state
+
+        terraform_dir = os.path.dirname(state["terraform_file_path"])
+        print(f"Terraform directory: {terraform_dir}")
+
+        async with scheduler.job_slot(POOL_APPLY, config):
+            # Both read the workspace's plan files, so keep them off the event loop
+            approved = await asyncio.to_thread(_approved_summary, state, terraform_dir)
+            replanned = False
+            if await asyncio.to_thread(is_plan_stale, terraform_dir):
+                plan_result, summary = await _areplan(terraform_dir, config)
+                if summary is None:
+                    new_state["error"] = f"Terraform plan failed: {plan_result.stderr}"
+                    new_state["next_action"] = ACTION_USER_INTERACTION
+                    return new_state
+                if _plan_changed(approved, summary):
+                    return _ask_approval(new_state, summary)
+                replanned = True
+
+            print("Running Terraform apply")
+            apply_result = await terraform_runner.stream(
+                "apply", "-input=false", "-no-color", PLAN_FILE, cwd=terraform_dir or None,
+                on_line=terraform_log_writer(config, "apply")
+            )
+            if (apply_result.returncode != 0 and not replanned
+                    and STALE_PLAN_MARKER in apply_result.stderr):
+                # Terraform detected a state change we could not see
+                plan_result, summary = await _areplan(terraform_dir, config)
+                if summary is None:
+                    new_state["error"] = f"Terraform plan failed: {plan_result.stderr}"
+                    new_state["next_action"] = ACTION_USER_INTERACTION
+                    return new_state
+                if _plan_changed(approved, summary):
+                    return _ask_approval(new_state, summary)
+                replanned = True
+                apply_result = await terraform_runner.stream(
+                    "apply", "-input=false", "-no-color", PLAN_FILE, cwd=terraform_dir or None,
+                    on_line=terraform_log_writer(config, "apply")
+                )
+            print("Terraform apply completed")
+
+        if apply_result.returncode == 0:
+            discard_plan(terraform_dir)
+            new_state["result"] = _apply_output(apply_result.stdout, replanned)
+            new_state["error"] = ""
+        else:
+            new_state["error"] = f"Terraform apply failed: {apply_result.stderr}"
+
+    except Exception as e:
+        new_state["error"] = f"Error executing Terraform: {str(e)}"
+
+    # Always set next_action to user_interaction when done
+    new_state["next_action"] = ACTION_USER_INTERACTION
+    return new_state
@@ -5,7 +5,7 @@ import shutil
 import glob
 from typing import Dict
 
-from llama_index.llms.anthropic import Anthropic
+from src.llm_clients import llm_clients
 
 # Import the CloudPilotState type
 from src.state import CloudPilotState
@@ -30,8 +30,8 @@ def file_system_operations(state: CloudPilotState) -> CloudPilotState:
             new_state["error"] = "No file system operation specified"
             return new_state
 
-        # Initialize the LLM to interpret the user's request
-        llm = Anthropic(model=ANTHROPIC_MODEL)
+        # Use the shared LLM client to interpret the user's request
+        llm = llm_clients.get(ANTHROPIC_MODEL)
 
         # Parse the user's request to determine the file operation
         prompt = f"""
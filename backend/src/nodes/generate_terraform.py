@@ -2,25 +2,119 @@
 
 import os
 import json
+import asyncio
 import subprocess
-from typing import Dict
+from typing import Dict, Optional
 
+from langchain_core.runnables import RunnableConfig
 from llama_index.llms.openai import OpenAI
 from llama_index.core import Settings
 
 # Import the CloudPilotState type and agents
 from src.state import CloudPilotState
+from src.constants import TERRAFORM_BINARY
 from src.agents.interpreter_agent import InterpreterAgent
 from src.agents.tf_generator_agent import TerraformGeneratorAgent
+from src.terraform.runner import terraform_runner
+from src.terraform.log_stream import terraform_log_writer
+from src.terraform.init_cache import ensure_init, aensure_init
+from src.terraform.plan_files import PLAN_FILE, PLAN_JSON_FILE, record_plan
+from src.terraform.plan_cache import plan_cache
+from src.terraform.plan_summary import format_plan_summary, summarize_plan
+from src.artifacts import artifact_store
+from src.terraform.workspace import resolve_workspace
+from src.scheduler import POOL_LLM, POOL_PLAN, scheduler
+
+
+def _write_main_tf(output_dir: str, tf_code: str) -> None:
+    """Write the generated code to main.tf."""
+    with open(os.path.join(output_dir, "main.tf"), "w") as f:
+        f.write(tf_code)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _store_plan_results(new_state: CloudPilotState, tf_code: str, output_dir: str,
+                        init_result, plan_result, show_result) -> None:
+    """
+    Save the plan JSON and record the generation results in the state.
+
+    The results may be ``subprocess.CompletedProcess`` or ``TerraformResult``
+    objects; only ``returncode``, ``stdout`` and ``stderr`` are used.
+    """
+    print(init_result.stdout)
+    if init_result.stderr:
+        print("Init Errors:", init_result.stderr)
+    print(plan_result.stdout)
+    if plan_result.stderr:
+        print("Plan Errors:", plan_result.stderr)
+
+    # Save JSON plan to file
+    plan_json_path = os.path.join(output_dir, PLAN_JSON_FILE)
+    try:
+        with open(plan_json_path, "w") as f:
+            f.write(show_result.stdout)
+    except Exception as e:
+        print(f"Error saving plan JSON: {str(e)}")
+
+    # Parse the plan JSON; the state only carries a compact summary of it
+    # and a reference to the full document in the artifact store
+    plan_summary = None
+    try:
+        plan_summary = summarize_plan(json.loads(show_result.stdout), plan_json_path)
+        plan_summary["artifact"] = artifact_store.put(show_result.stdout)
+    except Exception as e:
+        print(f"Error loading plan JSON: {str(e)}")
+
+    # Update the state with the results using absolute paths
+    new_state["terraform_code"] = tf_code
+    new_state["terraform_file_path"] = os.path.join(output_dir, "main.tf")
+    new_state["terraform_json"] = plan_summary
 
+    # Add sentinel to indicate Terraform was built
+    new_state["terraform_built"] = True
+
+    # Store results with validation output
+    validation_output = f"""
+        Init Output:
+        {init_result.stdout}
+        {init_result.stderr if init_result.stderr else ''}
+
+        Plan Output:
+        {plan_result.stdout}
+        {plan_result.stderr if plan_result.stderr else ''}
+        """
 
-def generate_terraform(state: CloudPilotState) -> CloudPilotState:
+    new_state["result"] = f"""
+        Terraform Output: {validation_output}
+
+        Generated files:
+        - Terraform: {new_state["terraform_file_path"]}
+        - Plan JSON: {plan_json_path if plan_summary else "Not available"}
+
+        Plan Summary:
+        {format_plan_summary(plan_summary) if plan_summary else "No plan data available"}
+        """
+
+    # Set error if validation failed
+    if plan_result.returncode != 0:
+        new_state["error"] = "Plan failed. Check result for details."
+        new_state["terraform_built"] = False
+    else:
+        # Remember what the saved plan was made from, so the approved
+        # plan can be applied as-is later
+        record_plan(output_dir)
+        new_state["error"] = ""
+
+
+def generate_terraform(state: CloudPilotState, config: Optional[RunnableConfig] = None) -> CloudPilotState:
     """
     Generate infrastructure code based on the task description.
     Uses Terraform for infrastructure as code.
 
     Args:
         state: The current state of the graph
+        config: The run config, whose flow id selects the workspace
 
     Returns:
         Updated state with generated infrastructure code
@@ -28,13 +122,9 @@ def generate_terraform(state: CloudPilotState) -> CloudPilotState:
     # Create a copy of the state to modify
     new_state = state.copy()
 
-    # Get absolute paths
-    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    output_dir = os.path.join(project_root, "terraform_prod")
-
     try:
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
+        # Each flow writes to its own workspace
+        output_dir = resolve_workspace(config)
 
         # Initialize agents
         interpreter = InterpreterAgent()
@@ -45,98 +135,112 @@ def generate_terraform(state: CloudPilotState) -> CloudPilotState:
         # Get AWS specification from messages
         aws_specification = " ".join([message.content for message in state["messages"]])
 
-        # Generate Terraform code
-        tf_code = tf_generator.generate_code(aws_specification)
+        # Generate Terraform code, charging repairs to the flow's token budget;
+        # after a rejected plan the LLM is asked again
+        flow_id = ((config or {}).get("configurable") or {}).get("flow_id")
+        tf_code = tf_generator.generate_code(aws_specification, working_dir=output_dir, flow_id=flow_id,
+                                             regenerate=state.get("plan_rejected", False))
+        new_state["plan_rejected"] = False
 
         # Write the generated code to main.tf
-        with open(os.path.join(output_dir, "main.tf"), "w") as f:
-            f.write(tf_code)
-            f.flush()
-            os.fsync(f.fileno())
-
-        # Run terraform init with -chdir
-        init_result = subprocess.run(
-            ["terraform", "-chdir=" + output_dir, "init"],
-            capture_output=True,
-            text=True
-        )
-        print(init_result.stdout)
-        if init_result.stderr:
-            print("Init Errors:", init_result.stderr)
-
-        # Run terraform plan with -chdir and save to file
-        plan_result = subprocess.run(
-            ["terraform", "-chdir=" + output_dir, "plan", "-out=tfplan"],
-            capture_output=True,
-            text=True
-        )
-        print(plan_result.stdout)
-        if plan_result.stderr:
-            print("Plan Errors:", plan_result.stderr)
-
-        # Convert plan to JSON using -chdir
-        show_result = subprocess.run(
-            ["terraform", "-chdir=" + output_dir, "show", "-json", "tfplan"],
-            capture_output=True,
-            text=True
-        )
+        _write_main_tf(output_dir, tf_code)
 
-        # Save JSON plan to file
-        plan_json_path = os.path.join(output_dir, "plan.json")
-        try:
-            with open(plan_json_path, "w") as f:
-                f.write(show_result.stdout)
-        except Exception as e:
-            print(f"Error saving plan JSON: {str(e)}")
-
-        # Load the plan JSON if it exists
-        plan_data = None
-        if os.path.exists(plan_json_path):
-            try:
-                with open(plan_json_path, 'r') as f:
-                    plan_data = json.load(f)
-            except Exception as e:
-                print(f"Error loading plan JSON: {str(e)}")
-
-        # Update the state with the results using absolute paths
-        new_state["terraform_code"] = tf_code
-        new_state["terraform_file_path"] = os.path.join(output_dir, "main.tf")
-        new_state["terraform_json"] = plan_data
-
-        # Add sentinel to indicate Terraform was built
-        new_state["terraform_built"] = True
-
-        # Store results with validation output
-        validation_output = f"""
-        Init Output:
-        {init_result.stdout}
-        {init_result.stderr if init_result.stderr else ''}
+        # Run terraform init, unless providers and lock file are unchanged
+        init_result = ensure_init(output_dir)
 
-        Plan Output:
-        {plan_result.stdout}
-        {plan_result.stderr if plan_result.stderr else ''}
-        """
+        # Reuse the saved plan of an identical configuration if there is one
+        cached = plan_cache.lookup(output_dir) if init_result.returncode == 0 else None
+        if cached:
+            plan_result, show_result = cached.results()
+        else:
+            # Run terraform plan with -chdir and save to file
+            plan_result = subprocess.run(
+                [TERRAFORM_BINARY, "-chdir=" + output_dir, "plan", "-input=false", "-out=" + PLAN_FILE],
+                capture_output=True,
+                text=True
+            )
+
+            # Convert plan to JSON using -chdir
+            show_result = subprocess.run(
+                [TERRAFORM_BINARY, "-chdir=" + output_dir, "show", "-json", PLAN_FILE],
+                capture_output=True,
+                text=True
+            )
+
+        _store_plan_results(new_state, tf_code, output_dir, init_result, plan_result, show_result)
+        if not cached and new_state["terraform_built"] and show_result.returncode == 0:
+            plan_cache.store(output_dir, plan_result.stdout)
 
-        new_state["result"] = f"""
-        Terraform Output: {validation_output}
+    except Exception as e:
+        new_state["error"] = f"Error in generate_terraform: {str(e)}"
+        new_state["terraform_built"] = False
 
-        Generated files:
-        - Terraform: {new_state["terraform_file_path"]}
-        - Plan JSON: {plan_json_path if plan_data else "Not available"}
+    return new_state
 
-        Plan Summary:
-        {json.dumps(plan_data["planned_values"], indent=2) if plan_data else "No plan data available"}
-        """
 
-        # Set error if validation failed
-        if plan_result.returncode != 0:
-            new_state["error"] = "Plan failed. Check result for details."
-            new_state["terraform_built"] = False
-        else:
-            new_state["error"] = ""
+async def agenerate_terraform(state: CloudPilotState, config: Optional[RunnableConfig] = None) -> CloudPilotState:
+    """
+    Async version of generate_terraform.
+
+    The LLM call runs in a worker thread and the Terraform commands run
+    through the shared async runner, so the event loop stays free. Both
+    wait for a slot of their scheduler pool.
+
+    Args:
+        state: The current state of the graph
+        config: The run config, whose flow id selects the workspace
+
+    Returns:
+        Updated state with generated infrastructure code
+    """
+    # Create a copy of the state to modify
+    new_state = state.copy()
+
+    try:
+        output_dir = resolve_workspace(config)
+
+        tf_generator = TerraformGeneratorAgent()
+
+        # Get AWS specification from messages
+        aws_specification = " ".join([message.content for message in state["messages"]])
+
+        # Generate Terraform code off the event loop, charging repairs to
+        # the flow's token budget; after a rejected plan the LLM is asked again
+        flow_id = ((config or {}).get("configurable") or {}).get("flow_id")
+        async with scheduler.job_slot(POOL_LLM, config):
+            tf_code = await asyncio.to_thread(
+                tf_generator.generate_code, aws_specification, working_dir=output_dir, flow_id=flow_id,
+                regenerate=state.get("plan_rejected", False)
+            )
+        new_state["plan_rejected"] = False
+
+        await asyncio.to_thread(_write_main_tf, output_dir, tf_code)
+
+        async with scheduler.job_slot(POOL_PLAN, config):
+            init_result = await aensure_init(output_dir)
+            cached = None
+            if init_result.returncode == 0:
+                # Looking up the plan hashes the workspace files
+                cached = await asyncio.to_thread(plan_cache.lookup, output_dir)
+            if cached:
+                plan_result, show_result = cached.results()
+            else:
+                plan_result = await terraform_runner.stream(
+                    "plan", "-input=false", "-no-color", "-out=" + PLAN_FILE, cwd=output_dir,
+                    on_line=terraform_log_writer(config, "plan")
+                )
+                show_result = await terraform_runner.run("show", "-json", PLAN_FILE, cwd=output_dir)
+
+        # Saving the plan JSON and its artifact writes to disk, which can
+        # take a while for a large plan
+        await asyncio.to_thread(
+            _store_plan_results, new_state, tf_code, output_dir, init_result, plan_result, show_result
+        )
+        if not cached and new_state["terraform_built"] and show_result.returncode == 0:
+            await asyncio.to_thread(plan_cache.store, output_dir, plan_result.stdout)
 
     except Exception as e:
         new_state["error"] = f"Error in generate_terraform: {str(e)}"
         new_state["terraform_built"] = False
 
-    return new_state
\ No newline at end of file
+    return new_state
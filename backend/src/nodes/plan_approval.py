@@ -7,20 +7,23 @@ from src.constants import ACTION_EXECUTE, ACTION_GENERATE, ACTION_USER_INTERACTI
 
 def plan_approval(state: CloudPilotState) -> Command[Literal["execute_terraform", "generate_terraform"]]:
     print(state)
-    is_approved = interrupt(
+    response = interrupt(
         {
             "question": "Is this correct?",
             "plan_output": state["result"],
             "terraform_json": state["terraform_json"],
         }
     )
+    # The API resumes with {"approved": bool}; a bare bool is accepted too
+    is_approved = response.get("approved") if isinstance(response, dict) else bool(response)
     print(is_approved)
     if is_approved:
         print("yes")
-        return Command(goto="execute_terraform")
+        return Command(goto="execute_terraform", update={"plan_rejected": False})
     else:
         print("no")
-        return Command(goto="generate_terraform")
+        # Regenerate rather than get the rejected code back from the cache
+        return Command(goto="generate_terraform", update={"plan_rejected": True})
 
 def plan_approval2(state: CloudPilotState) -> CloudPilotState:
     """
@@ -1,11 +1,19 @@
 """Node for handling Terraform plan operations."""
 
 import os
+import asyncio
 import subprocess
-from typing import Dict
+from typing import Dict, Optional
+
+from langchain_core.runnables import RunnableConfig
 
 from src.state import CloudPilotState
-from src.constants import ACTION_USER_INTERACTION, ACTION_APPROVE_PLAN
+from src.constants import ACTION_USER_INTERACTION, ACTION_APPROVE_PLAN, TERRAFORM_BINARY
+from src.terraform.runner import terraform_runner
+from src.terraform.init_cache import ensure_init, aensure_init
+from src.terraform.log_stream import terraform_log_writer
+from src.terraform.plan_cache import plan_cache
+from src.scheduler import POOL_PLAN, scheduler
 
 def terraform_plan(state: CloudPilotState) -> CloudPilotState:
     """
@@ -27,33 +35,35 @@ def terraform_plan(state: CloudPilotState) -> CloudPilotState:
             new_state["next_action"] = ACTION_USER_INTERACTION
             return new_state
 
-        # Change to the directory containing the Terraform file
+        # Run Terraform in the directory containing the Terraform file. The
+        # process-wide working directory is shared by all flows, so it is
+        # passed to each command instead of changed with os.chdir.
         terraform_dir = os.path.dirname(new_state["terraform_file_path"])
         if not terraform_dir:
             terraform_dir = "."
 
-        try:
-            os.chdir(terraform_dir)
-        except Exception as e:
-            new_state["error"] = f"Failed to change to directory {terraform_dir}: {str(e)}"
+        # Initialize Terraform unless providers and lock file are unchanged
+        init_result = ensure_init(terraform_dir)
+        if init_result.returncode != 0:
+            new_state["error"] = f"Terraform init failed: {init_result.stderr}"
             new_state["next_action"] = ACTION_USER_INTERACTION
             return new_state
 
-        # Initialize Terraform if needed
-        try:
-            subprocess.run(["terraform", "init"], check=True, capture_output=True)
-        except subprocess.CalledProcessError as e:
-            new_state["error"] = f"Terraform init failed: {e.stderr.decode()}"
-            new_state["next_action"] = ACTION_USER_INTERACTION
+        # An identical configuration was planned already, show that plan
+        cached = plan_cache.lookup(terraform_dir)
+        if cached:
+            new_state["result"] = cached.summary
+            new_state["next_action"] = ACTION_APPROVE_PLAN
             return new_state
 
         # Create the plan
         try:
             result = subprocess.run(
-                ["terraform", "plan", "-no-color"],
+                [TERRAFORM_BINARY, "plan", "-no-color"],
                 check=True,
                 capture_output=True,
-                text=True
+                text=True,
+                cwd=terraform_dir
             )
             new_state["result"] = result.stdout
             new_state["next_action"] = ACTION_APPROVE_PLAN
@@ -67,4 +77,66 @@ def terraform_plan(state: CloudPilotState) -> CloudPilotState:
         new_state["error"] = f"Error in terraform_plan: {str(e)}"
         new_state["next_action"] = ACTION_USER_INTERACTION
 
-    return new_state
\ No newline at end of file
+    return new_state
+
+async def aterraform_plan(state: CloudPilotState, config: Optional[RunnableConfig] = None) -> CloudPilotState:
+    """
+    Async version of terraform_plan.
+
+    Runs Terraform in the plan directory through the shared async runner
+    instead of changing the process-wide working directory, once the
+    scheduler's plan pool has a free slot. The plan output is streamed to
+    the client line by line while it runs.
+
+    Args:
+        state: The current state of the application
+        config: The run config, which carries the stream writer
+
+    Returns:
+        Updated state with the plan result
+    """
+    # Create a copy of the state to modify
+    new_state = state.copy()
+
+    try:
+        # Check if we have a terraform file path
+        if not new_state.get("terraform_file_path"):
+            new_state["error"] = "No Terraform file path provided"
+            new_state["next_action"] = ACTION_USER_INTERACTION
+            return new_state
+
+        terraform_dir = os.path.dirname(new_state["terraform_file_path"]) or "."
+
+        async with scheduler.job_slot(POOL_PLAN, config):
+            # Initialize Terraform if needed
+            init_result = await aensure_init(terraform_dir)
+            if init_result.returncode != 0:
+                new_state["error"] = f"Terraform init failed: {init_result.stderr}"
+                new_state["next_action"] = ACTION_USER_INTERACTION
+                return new_state
+
+            # An identical configuration was planned already, show that plan
+            cached = await asyncio.to_thread(plan_cache.lookup, terraform_dir)
+            if cached:
+                new_state["result"] = cached.summary
+                new_state["next_action"] = ACTION_APPROVE_PLAN
+                return new_state
+
+            # Create the plan
+            plan_result = await terraform_runner.stream(
+                "plan", "-no-color", cwd=terraform_dir,
+                on_line=terraform_log_writer(config, "plan")
+            )
+        if plan_result.returncode != 0:
+            new_state["error"] = f"Terraform plan failed: {plan_result.stderr}"
+            new_state["next_action"] = ACTION_USER_INTERACTION
+            return new_state
+
+        new_state["result"] = plan_result.stdout
+        new_state["next_action"] = ACTION_APPROVE_PLAN
+
+    except Exception as e:
+        new_state["error"] = f"Error in terraform_plan: {str(e)}"
+        new_state["next_action"] = ACTION_USER_INTERACTION
+
+    return new_state
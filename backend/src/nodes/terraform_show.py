@@ -2,17 +2,62 @@
 
 import os
 import json
+import asyncio
 import subprocess
-from typing import Dict
+from typing import Dict, Optional
+
+from langchain_core.runnables import RunnableConfig
 
 from src.state import CloudPilotState
+from src.constants import TERRAFORM_BINARY
+from src.terraform.runner import terraform_runner
+from src.terraform.workspace import resolve_workspace
+from src.terraform.plan_summary import summarize_state
+from src.artifacts import artifact_store
+from src.scheduler import POOL_PLAN, scheduler
+
+
+def _output_dir(state: CloudPilotState, config: Optional[RunnableConfig]) -> str:
+    """Return the directory the flow's Terraform files were written to."""
+    if state.get("terraform_file_path"):
+        return os.path.dirname(state["terraform_file_path"])
+    return resolve_workspace(config)
+
+
+def _store_show_result(new_state: CloudPilotState, output_dir: str, show_result) -> None:
+    """Save the show output to show.json and record it in the state."""
+    if show_result.returncode != 0:
+        new_state["error"] = f"Terraform show failed: {show_result.stderr}"
+        return
+
+    # Save the show output to file
+    show_json_path = os.path.join(output_dir, "show.json")
+    try:
+        with open(show_json_path, "w") as f:
+            f.write(show_result.stdout)
+    except Exception as e:
+        new_state["error"] = f"Error saving show JSON: {str(e)}"
+        return
 
-def terraform_show(state: CloudPilotState) -> CloudPilotState:
+    # Keep the full document in the artifact store; the state only carries
+    # a summary and a reference to it
+    try:
+        show_data = json.loads(show_result.stdout)
+        summary = summarize_state(show_data)
+        summary["artifact"] = artifact_store.put(show_result.stdout)
+        new_state["terraform_json"] = summary
+        new_state["result"] = "Terraform show completed and saved to show.json"
+    except json.JSONDecodeError as e:
+        new_state["error"] = f"Error parsing show output: {str(e)}"
+
+
+def terraform_show(state: CloudPilotState, config: Optional[RunnableConfig] = None) -> CloudPilotState:
     """
     Capture the current state of Terraform resources after execution.
 
     Args:
         state: The current state of the application
+        config: The run config, whose flow id selects the workspace
 
     Returns:
         Updated state with the show result
@@ -21,39 +66,47 @@ def terraform_show(state: CloudPilotState) -> CloudPilotState:
     new_state = state.copy()
 
     try:
-        # Get absolute paths
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        output_dir = os.path.join(project_root, "terraform_prod")
+        # Get the flow's workspace
+        output_dir = _output_dir(state, config)
 
         # Run terraform show with -json flag
         show_result = subprocess.run(
-            ["terraform", "-chdir=" + output_dir, "show", "-json"],
+            [TERRAFORM_BINARY, "-chdir=" + output_dir, "show", "-json"],
             capture_output=True,
             text=True
         )
 
-        if show_result.returncode != 0:
-            new_state["error"] = f"Terraform show failed: {show_result.stderr}"
-            return new_state
-
-        # Save the show output to file
-        show_json_path = os.path.join(output_dir, "show.json")
-        try:
-            with open(show_json_path, "w") as f:
-                f.write(show_result.stdout)
-        except Exception as e:
-            new_state["error"] = f"Error saving show JSON: {str(e)}"
-            return new_state
-
-        # Parse and store the show result in state
-        try:
-            show_data = json.loads(show_result.stdout)
-            new_state["terraform_json"] = show_data
-            new_state["result"] = "Terraform show completed and saved to show.json"
-        except json.JSONDecodeError as e:
-            new_state["error"] = f"Error parsing show output: {str(e)}"
+        _store_show_result(new_state, output_dir, show_result)
+
+    except Exception as e:
+        new_state["error"] = f"Error in terraform_show: {str(e)}"
+
+    return new_state
+
+
+async def aterraform_show(state: CloudPilotState, config: Optional[RunnableConfig] = None) -> CloudPilotState:
+    """
+    Async version of terraform_show using the shared async runner and a
+    slot of the scheduler's plan pool.
+
+    Args:
+        state: The current state of the application
+        config: The run config, whose flow id selects the workspace
+
+    Returns:
+        Updated state with the show result
+    """
+    # Create a copy of the state to modify
+    new_state = state.copy()
+
+    try:
+        output_dir = _output_dir(state, config)
+        async with scheduler.job_slot(POOL_PLAN, config):
+            show_result = await terraform_runner.run("show", "-json", cwd=output_dir)
+        # The state document can be large; write it out off the event loop
+        await asyncio.to_thread(_store_show_result, new_state, output_dir, show_result)
 
     except Exception as e:
         new_state["error"] = f"Error in terraform_show: {str(e)}"
 
-    return new_state
\ No newline at end of file
+    return new_state
@@ -0,0 +1,97 @@
+"""Delta encoding of the node updates sent as progress events."""
+
+import hashlib
+import json
+from typing import Any, Dict, Tuple
+
+from src.constants import PROGRESS_BLOB_MIN_BYTES
+
+# Marks a value the client received before, e.g. {"$ref": "sha256:3b4c..."}
+REF_KEY = "$ref"
+
+
+def _encoded(value: Any) -> str:
+    """Return the text whose digest identifies a value."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class ProgressEncoder:
+    """Send each client only the parts of a flow's state it does not have.
+
+    Nodes return the whole flow state, so most of every update repeats
+    what the client was already sent. For each flow the encoder remembers
+    the last value sent under every state key and drops unchanged keys from
+    the next update. Large values are sent once under ``blobs`` keyed by
+    their digest and referenced as ``{"$ref": "sha256:<hex>"}`` wherever
+    they appear, so a large ``terraform_code`` or plan summary crosses the
+    connection once no matter how many nodes carry it.
+
+    The client merges each delta into its copy of the flow state, so an
+    encoder's output must reach a client in order and in full, as the
+    events of one flow do.
+    """
+
+    def __init__(self, blob_min_bytes: int = PROGRESS_BLOB_MIN_BYTES):
+        """
+        Initialize the encoder.
+
+        Args:
+            blob_min_bytes: Size from which values are sent as blobs
+        """
+        self.blob_min_bytes = blob_min_bytes
+        # Per flow: state key -> (last value sent, its digest)
+        self._sent: Dict[str, Dict[str, Tuple[Any, str]]] = {}
+        # Blob refs the client has received
+        self._blobs: set = set()
+
+    def encode(self, flow_id: str, update: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Encode a node update against what the client already has.
+
+        Args:
+            flow_id: The flow the update belongs to
+            update: A ``{node: state}`` update from astream
+
+        Returns:
+            The delta, shaped like the update but with only changed keys,
+            and the new blobs it references
+        """
+        sent = self._sent.setdefault(flow_id, {})
+        delta: Dict[str, Any] = {}
+        blobs: Dict[str, Any] = {}
+        for node, state in update.items():
+            if not isinstance(state, dict):
+                delta[node] = state
+                continue
+            changes = {}
+            for key, value in state.items():
+                previous = sent.get(key)
+                # Unchanged keys are usually the very same object
+                if previous is not None and previous[0] is value:
+                    continue
+                text = _encoded(value)
+                digest = hashlib.sha256(text.encode()).hexdigest()
+                if previous is not None and previous[1] == digest:
+                    sent[key] = (value, digest)
+                    continue
+                sent[key] = (value, digest)
+                if len(text) < self.blob_min_bytes:
+                    changes[key] = value
+                    continue
+                ref = f"sha256:{digest}"
+                if ref not in self._blobs:
+                    self._blobs.add(ref)
+                    blobs[ref] = value
+                changes[key] = {REF_KEY: ref}
+            delta[node] = changes
+        return delta, blobs
+
+    def snapshot(self, flow_id: str) -> Dict[str, Any]:
+        """Return the flow state as the client last saw it, with values in full."""
+        return {key: value for key, (value, _) in self._sent.get(flow_id, {}).items()}
+
+    def forget(self, flow_id: str) -> None:
+        """Drop what was sent for a finished flow."""
+        self._sent.pop(flow_id, None)
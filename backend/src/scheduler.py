@@ -0,0 +1,216 @@
+"""Admission control for LLM calls and Terraform plans and applies."""
+
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import CONF, CONFIG_KEY_STREAM_WRITER
+
+from src.constants import (
+    APPLY_MAX_CONCURRENCY, EVENT_QUEUED, LLM_MAX_CONCURRENCY, PLAN_MAX_CONCURRENCY,
+    SCHEDULER_MAX_QUEUED
+)
+
+# Kinds of work, each with its own pool of slots
+POOL_LLM = "llm"
+POOL_PLAN = "plan"
+POOL_APPLY = "apply"
+
+# Called with a ``queued`` event whenever a waiting job's position changes
+QueueCallback = Callable[[Dict[str, Any]], None]
+
+
+class AdmissionRejected(Exception):
+    """Raised when a pool's queue is full and a job is turned away."""
+
+
+@dataclass
+class _Waiter:
+    """A job waiting for a slot."""
+
+    owner: str
+    notify: Optional[QueueCallback]
+    admitted: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+    position: int = 0
+
+
+class FairPool:
+    """A bounded number of slots handed out fairly among owners.
+
+    Waiting jobs are grouped by owner and admitted round-robin, so a
+    client with many queued flows cannot starve one with a single flow;
+    each owner's own jobs run in the order they arrived.
+    """
+
+    def __init__(self, name: str, capacity: int, max_queued: int = SCHEDULER_MAX_QUEUED):
+        """
+        Initialize the pool.
+
+        Args:
+            name: The pool name reported in queued events
+            capacity: Number of jobs that may run at once
+            max_queued: Number of jobs that may wait before more are rejected
+        """
+        self.name = name
+        self.capacity = capacity
+        self.max_queued = max_queued
+        self.running = 0
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for a slot."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, owner: str, notify: Optional[QueueCallback] = None) -> None:
+        """
+        Wait for a slot.
+
+        Args:
+            owner: Who the job is for; slots are shared fairly among owners
+            notify: Called with ``queued`` events while the job waits
+
+        Raises:
+            AdmissionRejected: If the queue is full
+        """
+        if self.running < self.capacity and not self._queues:
+            self.running += 1
+            return
+        if self.queued >= self.max_queued:
+            raise AdmissionRejected(f"Too many queued {self.name} jobs, try again later")
+
+        waiter = _Waiter(owner=owner, notify=notify)
+        self._queues.setdefault(owner, deque()).append(waiter)
+        self._report_positions()
+        try:
+            await waiter.admitted
+        except asyncio.CancelledError:
+            if waiter.admitted.done() and not waiter.admitted.cancelled():
+                # Admitted just as it was cancelled, pass the slot on
+                self.release()
+            else:
+                self._remove(waiter)
+                self._report_positions()
+            raise
+
+    def release(self) -> None:
+        """Free a slot and admit the next waiting job."""
+        self.running -= 1
+        while self._queues and self.running < self.capacity:
+            owner, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            # The owner goes to the back of the line
+            del self._queues[owner]
+            if queue:
+                self._queues[owner] = queue
+            if waiter.admitted.done():
+                continue
+            self.running += 1
+            waiter.admitted.set_result(None)
+        self._report_positions()
+
+    def _order(self) -> List[_Waiter]:
+        """Return the waiting jobs in the order they will be admitted."""
+        queues = [list(queue) for queue in self._queues.values()]
+        order = []
+        for depth in range(max((len(queue) for queue in queues), default=0)):
+            order.extend(queue[depth] for queue in queues if depth < len(queue))
+        return order
+
+    def _remove(self, waiter: _Waiter) -> None:
+        """Take a job out of the queue."""
+        queue = self._queues.get(waiter.owner)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+        if not queue:
+            del self._queues[waiter.owner]
+
+    def _report_positions(self) -> None:
+        """Tell every waiting job whose position changed where it stands."""
+        for position, waiter in enumerate(self._order(), start=1):
+            if waiter.position == position:
+                continue
+            waiter.position = position
+            if waiter.notify is not None:
+                try:
+                    waiter.notify({"type": EVENT_QUEUED, "pool": self.name, "position": position})
+                except Exception as e:
+                    print(f"Error reporting queue position: {str(e)}")
+
+
+class Scheduler:
+    """Separate bounded pools for LLM calls, plans and applies.
+
+    Work that overloads the host, such as forking Terraform processes or
+    holding LLM connections, goes through ``slot``. Jobs past a pool's
+    capacity wait their turn and are sent ``queued`` events with their
+    position, so a burst of users slows down instead of exhausting memory.
+    """
+
+    def __init__(self, capacities: Optional[Dict[str, int]] = None, max_queued: int = SCHEDULER_MAX_QUEUED):
+        """
+        Initialize the scheduler.
+
+        Args:
+            capacities: Slots per pool, defaults to the configured limits
+            max_queued: Jobs that may wait per pool
+        """
+        capacities = capacities or {
+            POOL_LLM: LLM_MAX_CONCURRENCY,
+            POOL_PLAN: PLAN_MAX_CONCURRENCY,
+            POOL_APPLY: APPLY_MAX_CONCURRENCY,
+        }
+        self.pools = {name: FairPool(name, capacity, max_queued) for name, capacity in capacities.items()}
+
+    @asynccontextmanager
+    async def slot(self, pool: str, owner: str, notify: Optional[QueueCallback] = None) -> AsyncIterator[None]:
+        """
+        Hold a slot of a pool for the duration of a job.
+
+        Args:
+            pool: POOL_LLM, POOL_PLAN or POOL_APPLY
+            owner: Who the job is for
+            notify: Called with ``queued`` events while the job waits
+
+        Raises:
+            AdmissionRejected: If the pool's queue is full
+        """
+        fair_pool = self.pools[pool]
+        await fair_pool.acquire(owner, notify)
+        try:
+            yield
+        finally:
+            fair_pool.release()
+
+    def job_slot(self, pool: str, config: Optional[RunnableConfig]):
+        """
+        Hold a slot for a graph node's job.
+
+        The owner is the config's ``client_id``, or the flow id when there is
+        none, and queued events go to the graph's custom stream.
+
+        Args:
+            pool: POOL_LLM, POOL_PLAN or POOL_APPLY
+            config: The run config passed to the node
+        """
+        configurable = (config or {}).get(CONF, {})
+        owner = configurable.get("client_id") or configurable.get("flow_id") or ""
+        return self.slot(pool, owner, configurable.get(CONFIG_KEY_STREAM_WRITER))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return the running and queued jobs and capacity of each pool."""
+        return {
+            name: {"running": pool.running, "queued": pool.queued, "capacity": pool.capacity}
+            for name, pool in self.pools.items()
+        }
+
+
+# Shared scheduler so limits hold across all flows and connections
+scheduler = Scheduler()
@@ -0,0 +1,125 @@
+"""Build structured document sections from markdown as it streams in."""
+
+from typing import Any, Dict, List
+
+
+class SectionStream:
+    """Split streamed markdown into heading and text sections.
+
+    ``feed`` takes chunks of any size and returns the changes they make to
+    the section list, so a client can build the same document without
+    being sent the whole of it again. A change either starts a section,
+    ``{"index", "type", "content", "metadata"?}``, or appends text to one,
+    ``{"index", "append"}``. Text is passed on as soon as it arrives; only
+    a line that may still turn out to be a heading is held back until its
+    end. Lines inside fenced code blocks are never headings, so shell and
+    Terraform comments stay in their text section.
+    """
+
+    def __init__(self, sections: List[Dict[str, Any]] = ()):
+        """
+        Initialize the stream.
+
+        Args:
+            sections: Sections placed before the streamed ones, e.g. a title
+        """
+        self.sections: List[Dict[str, Any]] = [dict(section) for section in sections]
+        self._pending = ""
+        self._line = ""
+        self._in_text_line = False
+        self._in_fence = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Add streamed text.
+
+        Args:
+            chunk: The next piece of the markdown
+
+        Returns:
+            The changes to the sections
+        """
+        changes: List[Dict[str, Any]] = []
+        lines = chunk.split("\n")
+        for i, part in enumerate(lines):
+            self._consume(part, i < len(lines) - 1, changes)
+        return changes
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Flush a last line held back because it had no line break."""
+        changes: List[Dict[str, Any]] = []
+        if self._pending:
+            self._consume("", True, changes)
+        return changes
+
+    def document(self) -> List[Dict[str, Any]]:
+        """Return the finished sections, with text trimmed and empty text dropped."""
+        sections = []
+        for section in self.sections:
+            if section["type"] == "text":
+                content = section["content"].strip()
+                if not content:
+                    continue
+                section = {**section, "content": content}
+            sections.append(section)
+        return sections
+
+    def _consume(self, part: str, line_ends: bool, changes: List[Dict[str, Any]]) -> None:
+        """Take the text up to a line break, or to the end of the chunk."""
+        ending = "\n" if line_ends else ""
+        if self._in_text_line:
+            self._line += part
+            self._append_text(part + ending, changes)
+            if line_ends:
+                self._end_line()
+            return
+
+        self._pending += part
+        if self._pending.startswith("#") and not self._in_fence:
+            # Could be a heading; wait for the end of the line to know
+            if line_ends:
+                self._add_heading(self._pending, changes)
+                self._pending = ""
+            return
+        if self._pending or line_ends:
+            self._line = self._pending
+            self._append_text(self._pending + ending, changes)
+            self._pending = ""
+            if line_ends:
+                self._end_line()
+            else:
+                self._in_text_line = True
+
+    def _end_line(self) -> None:
+        """Note a finished text line, entering or leaving a code block on a fence."""
+        if self._line.lstrip().startswith(("```", "~~~")):
+            self._in_fence = not self._in_fence
+        self._line = ""
+        self._in_text_line = False
+
+    def _add_heading(self, line: str, changes: List[Dict[str, Any]]) -> None:
+        """Start a heading section, or treat the line as text if it is not one."""
+        level = len(line) - len(line.lstrip("#"))
+        title = line[level:]
+        if level > 6 or (title and not title.startswith(" ")):
+            self._append_text(line + "\n", changes)
+            return
+        section = {"type": "heading", "content": title.strip(), "metadata": {"level": level}}
+        self.sections.append(section)
+        changes.append({"index": len(self.sections) - 1, **section})
+
+    def _append_text(self, text: str, changes: List[Dict[str, Any]]) -> None:
+        """Add text to the last section, starting a text section after a heading."""
+        if self.sections and self.sections[-1]["type"] == "text":
+            index = len(self.sections) - 1
+            self.sections[index]["content"] += text
+            if changes and changes[-1]["index"] == index:
+                # Fold into the change already made in this call
+                key = "append" if "append" in changes[-1] else "content"
+                changes[-1][key] += text
+            else:
+                changes.append({"index": index, "append": text})
+            return
+        section = {"type": "text", "content": text}
+        self.sections.append(section)
+        changes.append({"index": len(self.sections) - 1, **section})
@@ -15,7 +15,8 @@ class CloudPilotState(TypedDict):
     # The current Terraform code
     terraform_code: str
 
-    # The current Terraform json
+    # Compact summary of the current Terraform plan; the full JSON stays
+    # in the workspace's plan.json
     terraform_json: str
 
     # The path to the Terraform file
@@ -24,6 +25,9 @@ class CloudPilotState(TypedDict):
     # Sentinel to track if Terraform was built successfully
     terraform_built: NotRequired[bool]
 
+    # Set when the user rejected the plan, so the code is generated anew
+    plan_rejected: NotRequired[bool]
+
     # The result of the last operation
     result: str
 
@@ -0,0 +1 @@
+"""Terraform execution helpers shared by the graph nodes and agents."""
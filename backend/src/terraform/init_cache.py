@@ -0,0 +1,195 @@
+"""Shared provider plugin cache and skipping of redundant ``terraform init`` runs."""
+
+import asyncio
+import glob
+import hashlib
+import os
+import re
+import subprocess
+import threading
+from typing import Dict, List, Optional, Union
+
+from src.constants import TERRAFORM_BINARY, TERRAFORM_PLUGIN_CACHE_DIR
+from src.terraform.runner import TerraformResult, TerraformRunner, terraform_runner
+
+# Written into .terraform/ after a successful init
+FINGERPRINT_FILE = "cloudpilot-init.sha256"
+
+_REQUIRED_PROVIDERS = re.compile(r"\brequired_providers\s*\{")
+_MODULE_OR_BACKEND = re.compile(r"^\s*(?:module|backend)\s+\"[^\"]*\"\s*\{", re.MULTILINE)
+_PROVIDER_BLOCK = re.compile(r"^\s*provider\s+\"([^\"]+)\"", re.MULTILINE)
+_RESOURCE_TYPE = re.compile(r"^\s*(?:resource|data)\s+\"([a-z0-9]+)_", re.MULTILINE)
+
+# Serializes inits that have to download providers into a cold cache, since
+# Terraform does not guarantee concurrent writes to the cache are safe
+_cold_cache_lock = threading.Lock()
+_cold_cache_alock = asyncio.Lock()
+
+
+def terraform_env() -> Dict[str, str]:
+    """
+    Return the environment Terraform commands should run with.
+
+    Points every workspace at the shared plugin cache. Terraform only uses
+    the cache for providers already recorded in a lock file unless
+    ``TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE`` is set; fresh
+    workspaces have no lock file, so it is set here. The lock files then
+    only hold checksums for this platform, which is all a server-side
+    workspace needs.
+    """
+    os.makedirs(TERRAFORM_PLUGIN_CACHE_DIR, exist_ok=True)
+    env = dict(os.environ)
+    env["TF_PLUGIN_CACHE_DIR"] = TERRAFORM_PLUGIN_CACHE_DIR
+    env["TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE"] = "true"
+    env["TF_IN_AUTOMATION"] = "1"
+    return env
+
+
+def _braced_blocks(text: str, pattern: "re.Pattern") -> List[str]:
+    """Return every ``{...}`` block whose opening matches the pattern."""
+    blocks = []
+    for match in pattern.finditer(text):
+        depth = 0
+        for index in range(match.end() - 1, len(text)):
+            if text[index] == "{":
+                depth += 1
+            elif text[index] == "}":
+                depth -= 1
+                if depth == 0:
+                    blocks.append(text[match.start():index + 1])
+                    break
+    return blocks
+
+
+def init_inputs(workdir: str) -> str:
+    """
+    Return the parts of a workspace that decide what ``terraform init`` does.
+
+    These are the ``required_providers``, ``module`` and ``backend`` blocks,
+    the providers implied by provider blocks and resource types, and the
+    dependency lock file. Changes anywhere else in the configuration do not
+    need a new init.
+
+    Args:
+        workdir: The Terraform working directory
+
+    Returns:
+        A canonical text representation of the init inputs
+    """
+    parts = []
+    providers = set()
+    for path in sorted(glob.glob(os.path.join(workdir, "*.tf"))):
+        with open(path, "r") as f:
+            text = f.read()
+        for block in _braced_blocks(text, _REQUIRED_PROVIDERS):
+            parts.append(" ".join(block.split()))
+        for block in _braced_blocks(text, _MODULE_OR_BACKEND):
+            parts.append(" ".join(block.split()))
+        providers.update(_PROVIDER_BLOCK.findall(text))
+        providers.update(_RESOURCE_TYPE.findall(text))
+    parts.append("providers=" + ",".join(sorted(providers)))
+
+    lock_path = os.path.join(workdir, ".terraform.lock.hcl")
+    if os.path.exists(lock_path):
+        with open(lock_path, "r") as f:
+            parts.append(f.read())
+    return "\n".join(parts)
+
+
+def init_fingerprint(workdir: str) -> str:
+    """Return a hash of the workspace's init inputs."""
+    return hashlib.sha256(init_inputs(workdir).encode()).hexdigest()
+
+
+def _fingerprint_path(workdir: str) -> str:
+    return os.path.join(workdir, ".terraform", FINGERPRINT_FILE)
+
+
+def needs_init(workdir: str) -> bool:
+    """
+    Return whether ``terraform init`` has to run in a workspace.
+
+    Args:
+        workdir: The Terraform working directory
+
+    Returns:
+        False only if the workspace was initialized with the same init inputs
+    """
+    try:
+        with open(_fingerprint_path(workdir), "r") as f:
+            return f.read().strip() != init_fingerprint(workdir)
+    except OSError:
+        return True
+
+
+def record_init(workdir: str) -> None:
+    """Remember the init inputs after a successful ``terraform init``."""
+    if not os.path.isdir(os.path.join(workdir, ".terraform")):
+        return
+    with open(_fingerprint_path(workdir), "w") as f:
+        f.write(init_fingerprint(workdir))
+
+
+def _cache_is_warm() -> bool:
+    """Return whether the plugin cache holds any provider yet."""
+    return bool(glob.glob(os.path.join(TERRAFORM_PLUGIN_CACHE_DIR, "*", "*", "*")))
+
+
+def _skipped_result() -> TerraformResult:
+    return TerraformResult(
+        args=[TERRAFORM_BINARY, "init"],
+        returncode=0,
+        stdout="Terraform init skipped: providers and lock file unchanged.",
+        stderr="",
+        duration=0.0,
+    )
+
+
+def ensure_init(workdir: str) -> Union[subprocess.CompletedProcess, TerraformResult]:
+    """
+    Run ``terraform init`` in a workspace unless it is already up to date.
+
+    Args:
+        workdir: The Terraform working directory
+
+    Returns:
+        The init result, or a successful placeholder if init was skipped
+    """
+    if not needs_init(workdir):
+        return _skipped_result()
+
+    cmd = [TERRAFORM_BINARY, "init", "-input=false", "-no-color"]
+    if _cache_is_warm():
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=workdir, env=terraform_env())
+    else:
+        with _cold_cache_lock:
+            result = subprocess.run(cmd, capture_output=True, text=True, cwd=workdir, env=terraform_env())
+    if result.returncode == 0:
+        record_init(workdir)
+    return result
+
+
+async def aensure_init(workdir: str, runner: Optional[TerraformRunner] = None) -> TerraformResult:
+    """
+    Async version of ensure_init using the shared Terraform runner.
+
+    Args:
+        workdir: The Terraform working directory
+        runner: The runner to use, defaults to the shared one
+
+    Returns:
+        The init result, or a successful placeholder if init was skipped
+    """
+    runner = runner or terraform_runner
+    if not needs_init(workdir):
+        return _skipped_result()
+
+    args = ("init", "-input=false", "-no-color")
+    if _cache_is_warm():
+        result = await runner.run(*args, cwd=workdir, env=terraform_env())
+    else:
+        async with _cold_cache_alock:
+            result = await runner.run(*args, cwd=workdir, env=terraform_env())
+    if result.returncode == 0:
+        record_init(workdir)
+    return result
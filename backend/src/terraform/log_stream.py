@@ -0,0 +1,34 @@
+"""Forwarding of live Terraform output to the graph's custom stream."""
+
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import CONF, CONFIG_KEY_STREAM_WRITER
+
+from src.constants import EVENT_LOG
+from src.terraform.runner import LineCallback
+
+
+def terraform_log_writer(config: Optional[RunnableConfig], command: str) -> Optional[LineCallback]:
+    """
+    Return a callback that streams Terraform output lines to the client.
+
+    Each line is written to the graph's ``custom`` stream as a ``log`` event.
+    The graph only provides a writer when it is streamed with the
+    ``custom`` mode; otherwise there is nothing to forward to.
+
+    Args:
+        config: The run config passed to the node
+        command: The Terraform subcommand producing the output
+
+    Returns:
+        A callback for ``TerraformRunner.stream``, or None
+    """
+    writer = (config or {}).get(CONF, {}).get(CONFIG_KEY_STREAM_WRITER)
+    if writer is None:
+        return None
+
+    def on_line(stream: str, line: str) -> None:
+        writer({"type": EVENT_LOG, "command": command, "stream": stream, "line": line})
+
+    return on_line
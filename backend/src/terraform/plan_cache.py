@@ -0,0 +1,162 @@
+"""Content-addressed cache of saved Terraform plans."""
+
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from src.constants import PLAN_CACHE_DIR, PLAN_CACHE_MAX_BYTES, TERRAFORM_BINARY
+from src.terraform.plan_files import PLAN_FILE, PLAN_JSON_FILE, plan_digest
+from src.terraform.runner import TerraformResult
+
+SUMMARY_FILE = "summary.txt"
+
+
+@dataclass
+class CachedPlan:
+    """A saved plan found in the cache."""
+
+    key: str
+    plan_json: str
+    summary: str
+
+    def results(self) -> Tuple[TerraformResult, TerraformResult]:
+        """Return stand-ins for the plan and ``show -json`` results."""
+        plan_result = TerraformResult(
+            args=[TERRAFORM_BINARY, "plan"], returncode=0,
+            stdout=self.summary, stderr="", duration=0.0,
+        )
+        show_result = TerraformResult(
+            args=[TERRAFORM_BINARY, "show", "-json", PLAN_FILE], returncode=0,
+            stdout=self.plan_json, stderr="", duration=0.0,
+        )
+        return plan_result, show_result
+
+
+class PlanCache:
+    """Reuse saved plans across flows and re-plans of the same configuration.
+
+    Entries are keyed by a hash of the configuration and variable files,
+    the dependency lock file and the state lineage and serial, so a plan is
+    only reused where Terraform would have produced the same one. Each entry
+    is a directory holding the saved plan, its JSON rendering and the plan
+    output. The least recently used entries are evicted once the cache
+    grows past its size limit.
+    """
+
+    def __init__(self, root: str = PLAN_CACHE_DIR, max_bytes: int = PLAN_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            root: Directory holding the cache entries
+            max_bytes: Total size the entries may take up
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, workdir: str) -> str:
+        """
+        Return the cache key of a workspace's current inputs.
+
+        Args:
+            workdir: The Terraform working directory
+
+        Returns:
+            A hex digest of the files and state a plan depends on, the
+            same one plan_files uses without the plan itself
+        """
+        return plan_digest(workdir, include_plan=False)
+
+    def lookup(self, workdir: str) -> Optional[CachedPlan]:
+        """
+        Find a saved plan for a workspace and copy it in on a hit.
+
+        Args:
+            workdir: The Terraform working directory
+
+        Returns:
+            The cached plan, or None on a miss
+        """
+        key = self.key_for(workdir)
+        entry = os.path.join(self.root, key)
+        with self._lock:
+            try:
+                shutil.copyfile(os.path.join(entry, PLAN_FILE), os.path.join(workdir, PLAN_FILE))
+                with open(os.path.join(entry, PLAN_JSON_FILE), "r") as f:
+                    plan_json = f.read()
+                with open(os.path.join(entry, SUMMARY_FILE), "r") as f:
+                    summary = f.read()
+            except OSError:
+                self.misses += 1
+                return None
+            # Mark the entry as recently used
+            os.utime(entry)
+            self.hits += 1
+        return CachedPlan(key=key, plan_json=plan_json, summary=summary)
+
+    def store(self, workdir: str, summary: str) -> None:
+        """
+        Add a workspace's freshly saved plan to the cache.
+
+        Args:
+            workdir: The Terraform working directory holding tfplan and plan.json
+            summary: The plan output shown to the user
+        """
+        key = self.key_for(workdir)
+        entry = os.path.join(self.root, key)
+        # Assemble the entry next to its final place and move it in whole,
+        # so a concurrent lookup never sees a partial entry
+        staging = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(staging, exist_ok=True)
+            shutil.copyfile(os.path.join(workdir, PLAN_FILE), os.path.join(staging, PLAN_FILE))
+            shutil.copyfile(os.path.join(workdir, PLAN_JSON_FILE), os.path.join(staging, PLAN_JSON_FILE))
+            with open(os.path.join(staging, SUMMARY_FILE), "w") as f:
+                f.write(summary)
+            with self._lock:
+                if os.path.exists(entry):
+                    shutil.rmtree(staging)
+                else:
+                    os.rename(staging, entry)
+                self._evict()
+        except OSError as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"Error caching plan: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit and miss counts and the total size of the cache."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": sum(self._entries().values())}
+
+    def _entries(self) -> Dict[str, int]:
+        """Return the size of each complete entry."""
+        if not os.path.isdir(self.root):
+            return {}
+        sizes = {}
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            sizes[path] = sum(
+                os.path.getsize(os.path.join(path, file_name)) for file_name in os.listdir(path)
+            )
+        return sizes
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits its limit."""
+        sizes = self._entries()
+        total = sum(sizes.values())
+        for path in sorted(sizes, key=os.path.getmtime):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+
+# Shared cache so flows reuse each other's plans
+plan_cache = PlanCache()
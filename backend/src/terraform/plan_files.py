@@ -0,0 +1,100 @@
+"""Tracking of saved plan files so an approved plan can be applied as-is."""
+
+import glob
+import hashlib
+import json
+import os
+
+# Saved plan written by ``terraform plan -out``
+PLAN_FILE = "tfplan"
+
+# JSON rendering of the saved plan from ``terraform show -json``
+PLAN_JSON_FILE = "plan.json"
+
+# Digest of the inputs the saved plan was made from
+PLAN_DIGEST_FILE = "tfplan.sha256"
+
+# Terraform refuses to apply a saved plan when the state moved on since
+STALE_PLAN_MARKER = "Saved plan is stale"
+
+
+def state_marker(workdir: str) -> str:
+    """Return the lineage and serial of the local state, if there is one."""
+    state_path = os.path.join(workdir, "terraform.tfstate")
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+        return f"{state.get('lineage', '')}:{state.get('serial', '')}"
+    except (OSError, ValueError):
+        return ""
+
+
+def plan_digest(workdir: str, include_plan: bool = True) -> str:
+    """
+    Return a hash of everything a saved plan depends on.
+
+    Covers the configuration and variable files, the dependency lock file,
+    the state lineage and serial, and the plan file itself.
+
+    Args:
+        workdir: The Terraform working directory
+        include_plan: Hash the saved plan too; without it the digest only
+            covers the inputs a plan would be made from
+
+    Returns:
+        A hex digest, or an empty string if the plan is included and there
+        is no saved plan
+    """
+    digest = hashlib.sha256()
+    paths = glob.glob(os.path.join(workdir, "*.tf")) + glob.glob(os.path.join(workdir, "*.tfvars"))
+    paths.append(os.path.join(workdir, ".terraform.lock.hcl"))
+    if include_plan:
+        plan_path = os.path.join(workdir, PLAN_FILE)
+        if not os.path.exists(plan_path):
+            return ""
+        paths.append(plan_path)
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            continue
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(state_marker(workdir).encode())
+    return digest.hexdigest()
+
+
+def record_plan(workdir: str) -> None:
+    """Remember the inputs of a freshly saved plan."""
+    digest = plan_digest(workdir)
+    if not digest:
+        return
+    with open(os.path.join(workdir, PLAN_DIGEST_FILE), "w") as f:
+        f.write(digest)
+
+
+def is_plan_stale(workdir: str) -> bool:
+    """
+    Return whether the saved plan no longer matches the workspace.
+
+    Args:
+        workdir: The Terraform working directory
+
+    Returns:
+        True if there is no saved plan, it was never recorded, or the
+        configuration, lock file or state changed since it was made
+    """
+    try:
+        with open(os.path.join(workdir, PLAN_DIGEST_FILE), "r") as f:
+            recorded = f.read().strip()
+    except OSError:
+        return True
+    return not recorded or recorded != plan_digest(workdir)
+
+
+def discard_plan(workdir: str) -> None:
+    """Remove a saved plan once it has been applied."""
+    for name in (PLAN_FILE, PLAN_DIGEST_FILE):
+        try:
+            os.remove(os.path.join(workdir, name))
+        except OSError:
+            pass
@@ -0,0 +1,120 @@
+"""Compact summaries of Terraform plan and state JSON."""
+
+from typing import Any, Dict, List, Optional
+
+# Plan metadata kept next to the resource records
+PLAN_METADATA_KEYS = (
+    "format_version", "terraform_version", "errored", "complete", "applyable", "timestamp",
+)
+
+# Resource lines listed in the text summary before the rest are elided
+MAX_SUMMARY_LINES = 50
+
+
+def change_action(actions: List[str]) -> str:
+    """
+    Reduce a resource's plan actions to a single action.
+
+    Args:
+        actions: The ``change.actions`` list from the plan JSON
+
+    Returns:
+        One of create, update, delete, replace, read or no-op
+    """
+    if "create" in actions and "delete" in actions:
+        return "replace"
+    if actions:
+        return actions[0]
+    return "no-op"
+
+
+def summarize_plan(plan_data: Dict[str, Any], plan_json_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build a compact summary of a plan from its ``resource_changes``.
+
+    Each changing resource becomes a small record with its address, type
+    and action. ``change.actions`` is kept on each record so clients that
+    read the raw plan format still work. Attribute values, ``planned_values``
+    and the configuration are left out; the full JSON stays on disk.
+
+    Args:
+        plan_data: The output of ``terraform show -json`` for a saved plan
+        plan_json_path: Where the full plan JSON is stored
+
+    Returns:
+        The summary, with per-action counts under ``summary``
+    """
+    counts = {"create": 0, "update": 0, "delete": 0, "replace": 0}
+    records = []
+    for change in plan_data.get("resource_changes") or []:
+        actions = (change.get("change") or {}).get("actions") or []
+        action = change_action(actions)
+        if action in ("no-op", "read"):
+            continue
+        counts[action] = counts.get(action, 0) + 1
+        records.append({
+            "address": change.get("address"),
+            "type": change.get("type"),
+            "action": action,
+            "change": {"actions": actions},
+        })
+
+    summary = {key: plan_data[key] for key in PLAN_METADATA_KEYS if key in plan_data}
+    summary["resource_changes"] = records
+    summary["summary"] = counts
+    if plan_json_path:
+        summary["plan_json_path"] = plan_json_path
+    return summary
+
+
+def format_plan_summary(summary: Dict[str, Any]) -> str:
+    """
+    Render a plan summary as text for the result shown to the user.
+
+    Args:
+        summary: A summary returned by summarize_plan
+
+    Returns:
+        One line per changing resource followed by the totals
+    """
+    records = summary.get("resource_changes", [])
+    lines = [f"{record['action']}: {record['address']}" for record in records[:MAX_SUMMARY_LINES]]
+    if len(records) > MAX_SUMMARY_LINES:
+        lines.append(f"... and {len(records) - MAX_SUMMARY_LINES} more")
+
+    counts = summary.get("summary", {})
+    lines.append(
+        f"Plan: {counts.get('create', 0)} to add, {counts.get('update', 0)} to change, "
+        f"{counts.get('delete', 0)} to destroy, {counts.get('replace', 0)} to replace."
+    )
+    return "\n".join(lines)
+
+
+def _module_resources(module: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the resources of a module and its child modules."""
+    resources = list(module.get("resources") or [])
+    for child in module.get("child_modules") or []:
+        resources.extend(_module_resources(child))
+    return resources
+
+
+def summarize_state(show_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a compact summary of the state from ``terraform show -json``.
+
+    Args:
+        show_data: The output of ``terraform show -json`` without a plan file
+
+    Returns:
+        The managed resources' addresses and types, and their count
+    """
+    root_module = (show_data.get("values") or {}).get("root_module") or {}
+    resources = [
+        {"address": resource.get("address"), "type": resource.get("type")}
+        for resource in _module_resources(root_module)
+        if resource.get("mode", "managed") == "managed"
+    ]
+    summary = {key: show_data[key] for key in PLAN_METADATA_KEYS if key in show_data}
+    summary["resources"] = resources
+    summary["resource_count"] = len(resources)
+    return summary
@@ -0,0 +1,359 @@
+"""Error-guided repair of generated Terraform."""
+
+import re
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from src.constants import GENERATION_TOKEN_BUDGET, REPAIR_MAX_ATTEMPTS
+from src.metrics import TERRAFORM_REPAIRS, timed_completion, token_usage
+
+# A problem found in generated code: the 1-based line it is on, or 0 when
+# the error names no line, and what is wrong
+Problem = Tuple[int, str]
+
+# Error output sent back with a fragment, after the noise is stripped
+MAX_ERROR_CHARS = 2000
+
+# A string literal; quotes inside ${...} and %{...} templates do not end it.
+# Plain characters are matched in runs, which keeps the pattern fast on
+# long files
+_STRING = re.compile(r'"[^"\\\n$%]*(?:(?:\\.|[$%]\{(?:[^{}"\n]|"(?:[^"\\\n]|\\.)*")*\}|[$%])[^"\\\n$%]*)*"')
+_COMMENT = re.compile(r"(#|//).*$", re.MULTILINE)
+_HEREDOC = re.compile(r'<<-?\s*"?([A-Za-z_]\w*)"?\s*$')
+_BLOCK_HEADER = re.compile(r'^[A-Za-z_][\w-]*(\s+("[^"]*"|[A-Za-z_][\w-]*))*\s*\{')
+_FENCE = re.compile(r"^\s*(```|~~~)")
+# Terraform points at configuration errors with "on main.tf line 12"
+_ERROR_LOCATION = r"on\s+(?:\S*/)?{file}\s+line\s+(\d+)"
+
+REPAIR_PROMPT = """You are fixing part of a Terraform configuration. Lines {start}-{end} of main.tf, shown below, fail with these errors:
+
+ERRORS:
+{errors}
+
+FRAGMENT:
+{fragment}
+
+The rest of the file declares:
+{context}
+
+Return ONLY the corrected Terraform code that replaces the fragment, with no explanations or markdown.
+Keep the names of blocks the rest of the file may reference. Do not repeat blocks from the rest of the file.
+"""
+
+
+class Block(NamedTuple):
+    """A top-level block of a Terraform file."""
+
+    start: int
+    end: int
+    header: str
+    # Braces left open at the end of the block, negative for extra closing ones
+    depth: int
+    # Square brackets and parentheses left open, or closed without opening
+    brackets: int
+
+
+def split_blocks(code: str) -> List[Block]:
+    """
+    Split Terraform code into its top-level blocks.
+
+    Braces are counted outside strings, comments and heredocs. A block that
+    is never closed runs to the end of the code, and a line at the top level
+    without braces is a block of its own, so prose and truncated output
+    show up as blocks too.
+
+    Args:
+        code: The Terraform code
+
+    Returns:
+        The blocks in order, with 1-based line numbers
+    """
+    lines = code.split("\n")
+    # Blank out string literals and comments in one pass; neither spans lines
+    code_parts = _COMMENT.sub("", _STRING.sub('""', code)).split("\n")
+    blocks = []
+    start = None
+    depth = brackets = 0
+    heredoc = None
+    for number, text in enumerate(code_parts, 1):
+        if heredoc is not None:
+            if text.strip() == heredoc:
+                heredoc = None
+            continue
+        if "<<" in text:
+            match = _HEREDOC.search(text)
+            if match:
+                heredoc = match.group(1)
+        if start is None:
+            if not text.strip():
+                continue
+            start = number
+        depth += text.count("{") - text.count("}")
+        brackets += text.count("[") + text.count("(") - text.count("]") - text.count(")")
+        if depth <= 0:
+            blocks.append(Block(start, number, lines[start - 1].strip(), depth, brackets))
+            start = None
+            depth = brackets = 0
+    if start is not None:
+        blocks.append(Block(start, len(lines), lines[start - 1].strip(), depth, brackets))
+    return blocks
+
+
+def syntax_problems(code: str) -> List[Problem]:
+    """
+    Find the structural problems generated code most often has.
+
+    These are blocks cut off before their closing brace, stray closing
+    braces, unbalanced brackets and text that is not Terraform, such as an
+    introduction or a markdown fence.
+
+    Args:
+        code: The Terraform code
+
+    Returns:
+        The problems, each on the first line of its block
+    """
+    problems = []
+    for block in split_blocks(code):
+        if block.depth > 0:
+            problems.append((block.start, f"Block '{block.header}' is not closed"))
+        elif block.depth < 0:
+            problems.append((block.end, "Unexpected closing brace"))
+        elif not _BLOCK_HEADER.match(block.header):
+            problems.append((block.start, f"Not a Terraform block: '{block.header}'"))
+        elif block.brackets:
+            problems.append((block.start, f"Unbalanced brackets in block '{block.header}'"))
+    return problems
+
+
+def error_lines(output: str, file_name: str = "main.tf") -> List[int]:
+    """Return the lines of a file that Terraform error output points at."""
+    pattern = re.compile(_ERROR_LOCATION.format(file=re.escape(file_name)))
+    return sorted({int(line) for line in pattern.findall(output)})
+
+
+def error_text(output: str) -> str:
+    """Return Terraform error output without its box drawing and blank lines, shortened."""
+    lines = [line.strip("│╷╵ \t") for line in output.splitlines()]
+    text = "\n".join(line for line in lines if line)
+    return text[:MAX_ERROR_CHARS]
+
+
+def output_problems(output: str) -> List[Problem]:
+    """
+    Turn the error output of ``terraform validate`` or ``plan`` into problems.
+
+    Args:
+        output: The command's stderr
+
+    Returns:
+        One problem per line the errors point at, or a single problem
+        without a line when they point at none
+    """
+    text = error_text(output)
+    return [(line, text) for line in error_lines(output)] or [(0, text)]
+
+
+def failing_span(code: str, problems: List[Problem]) -> Optional[Tuple[int, int]]:
+    """
+    Return the first and last line of the blocks that have problems.
+
+    Args:
+        code: The Terraform code
+        problems: Problems found in it
+
+    Returns:
+        The span covering every failing block, or None when no problem is
+        inside a block
+    """
+    lines = {line for line, _ in problems}
+    failing = [block for block in split_blocks(code)
+               if any(block.start <= line <= block.end for line in lines)]
+    if not failing:
+        return None
+    return failing[0].start, failing[-1].end
+
+
+def strip_fences(text: str) -> str:
+    """Return LLM output without markdown code fences."""
+    return "\n".join(line for line in text.strip().split("\n") if not _FENCE.match(line)).strip()
+
+
+def apply_patch(code: str, start: int, end: int, replacement: str) -> str:
+    """Replace lines ``start`` to ``end`` (1-based, inclusive) of the code."""
+    lines = code.split("\n")
+    patch = [replacement] if replacement else []
+    return "\n".join(lines[:start - 1] + patch + lines[end:])
+
+
+class TokenBudget:
+    """Tokens each flow may spend on generating Terraform.
+
+    Every generation and repair call of a flow is charged here. Once a flow
+    has spent its budget, failing code is no longer repaired or regenerated
+    and the flow goes on with what it has, so a model that keeps producing
+    bad code cannot run up unbounded latency and cost.
+    """
+
+    def __init__(self, limit: int = GENERATION_TOKEN_BUDGET):
+        """
+        Initialize the budget.
+
+        Args:
+            limit: Tokens each flow may spend
+        """
+        self.limit = limit
+        self._spent: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def charge(self, flow_id: str, tokens: int) -> None:
+        """Add tokens to what a flow has spent."""
+        with self._lock:
+            self._spent[flow_id] = self._spent.get(flow_id, 0) + tokens
+
+    def spent(self, flow_id: str) -> int:
+        """Return the tokens a flow has spent."""
+        with self._lock:
+            return self._spent.get(flow_id, 0)
+
+    def remaining(self, flow_id: str) -> int:
+        """Return the tokens a flow may still spend."""
+        return self.limit - self.spent(flow_id)
+
+    def discard(self, flow_id: str) -> None:
+        """Forget a flow that is gone."""
+        with self._lock:
+            self._spent.pop(flow_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of flows tracked and the tokens they spent."""
+        with self._lock:
+            return {"flows": len(self._spent), "tokens": sum(self._spent.values())}
+
+
+class CodeRepairer:
+    """Fix generated Terraform by sending only its failing part back to the LLM.
+
+    Regenerating a whole file because one block is wrong costs a full
+    completion and may break something else, and the model is never told
+    what was wrong. The repairer finds the blocks a validator or plan error
+    points at, asks for a corrected version of just those lines together
+    with the error, and patches the answer into the file. Calls are charged
+    to the flow's token budget.
+    """
+
+    def __init__(self, agent: str, llm: Any, flow_id: Optional[str] = None,
+                 budget: Optional[TokenBudget] = None, max_attempts: int = REPAIR_MAX_ATTEMPTS):
+        """
+        Initialize the repairer.
+
+        Args:
+            agent: The agent whose code is repaired, used as the metric label
+            llm: The LLM client
+            flow_id: The flow the calls are charged to; without one, only
+                this repairer's own calls count against the budget
+            budget: The token budget, the shared one by default
+            max_attempts: Repairs tried per ``fix`` before giving up
+        """
+        self.agent = agent
+        self.llm = llm
+        self.flow_id = flow_id
+        self.budget = budget or token_budget
+        self.max_attempts = max_attempts
+        self.spent = 0
+        self._stopped: Optional[str] = None
+
+    def charge(self, prompt: str, response: Any) -> None:
+        """
+        Charge an LLM call to the budget.
+
+        Responses that report no usage are estimated at four characters per
+        token, except ones answered from the response cache, which cost
+        nothing.
+
+        Args:
+            prompt: The prompt sent
+            response: The completion response
+        """
+        raw = getattr(response, "raw", None)
+        if isinstance(raw, dict) and raw.get("cached"):
+            return
+        tokens = sum(token_usage(response))
+        if not tokens:
+            tokens = (len(prompt) + len(getattr(response, "text", "") or "")) // 4
+        self.spent += tokens
+        if self.flow_id is not None:
+            self.budget.charge(self.flow_id, tokens)
+
+    def remaining(self) -> int:
+        """Return the tokens that may still be spent."""
+        if self.flow_id is None:
+            return self.budget.limit - self.spent
+        return self.budget.remaining(self.flow_id)
+
+    def repair(self, code: str, problems: List[Problem]) -> Optional[str]:
+        """
+        Ask the LLM to fix the blocks that have problems.
+
+        Args:
+            code: The Terraform code
+            problems: What is wrong with it
+
+        Returns:
+            The patched code, or None when the budget is spent or the
+            problems are not inside any block
+        """
+        if self.remaining() <= 0:
+            self._stopped = "budget"
+            return None
+        span = failing_span(code, problems)
+        if span is None:
+            self._stopped = "unlocated"
+            return None
+
+        start, end = span
+        lines = code.split("\n")
+        context = [block.header for block in split_blocks(code) if block.end < start or block.start > end]
+        prompt = REPAIR_PROMPT.format(
+            start=start, end=end,
+            errors="\n".join(dict.fromkeys(message for _, message in problems)),
+            fragment="\n".join(lines[start - 1:end]),
+            context="\n".join(context) or "(nothing else)",
+        )
+        response = timed_completion(self.agent, self.llm, prompt)
+        self.charge(prompt, response)
+        return apply_patch(code, start, end, strip_fences(response.text))
+
+    def fix(self, code: str, check: Callable[[str], List[Problem]]) -> Tuple[str, List[Problem]]:
+        """
+        Repair code until a check passes or the attempts or budget run out.
+
+        Args:
+            code: The Terraform code
+            check: Returns the problems of a version of the code, e.g.
+                syntax_problems or the errors of a plan
+
+        Returns:
+            The last version of the code and its remaining problems, empty
+            when it passes the check
+        """
+        problems = check(code)
+        if not problems:
+            return code, problems
+
+        self._stopped = None
+        attempts = 0
+        while problems and attempts < self.max_attempts:
+            patched = self.repair(code, problems)
+            if patched is None:
+                break
+            attempts += 1
+            print(f"\nRepaired lines for: {problems[0][1][:200]}")
+            code, problems = patched, check(patched)
+        result = "fixed" if not problems else self._stopped or "failed"
+        TERRAFORM_REPAIRS.inc(agent=self.agent, result=result)
+        return code, problems
+
+
+# Shared budget so all of a flow's generations draw on the same tokens
+token_budget = TokenBudget()
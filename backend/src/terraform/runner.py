@@ -0,0 +1,262 @@
+"""Async runner for Terraform subprocesses."""
+
+import asyncio
+import signal
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+from src.constants import (
+    TERRAFORM_BINARY, TERRAFORM_LOG_TAIL_LINES, TERRAFORM_MAX_CONCURRENCY,
+    TERRAFORM_TIMEOUT_SECONDS
+)
+from src.metrics import TERRAFORM_COMMAND_DURATION
+from src.tracing import tracer
+
+# How long Terraform gets to exit cleanly after SIGINT before it is killed
+TERMINATE_GRACE_SECONDS = 10.0
+
+# Bytes read from a pipe at a time when streaming output
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Called with the stream name ("stdout" or "stderr") and one line of output
+LineCallback = Callable[[str, str], None]
+
+
+class TerraformTimeoutError(Exception):
+    """Raised when a Terraform command exceeds its timeout."""
+
+
+@dataclass
+class TerraformResult:
+    """Outcome of a Terraform command.
+
+    Mirrors the attributes of ``subprocess.CompletedProcess`` that the nodes
+    read, so sync and async code paths can share result handling.
+    """
+
+    args: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    # Set when stdout/stderr only hold the tail of a streamed command
+    truncated: bool = False
+
+
+class TerraformRunner:
+    """Run Terraform commands without blocking the event loop.
+
+    Commands run through ``asyncio.create_subprocess_exec`` and a semaphore
+    caps how many Terraform processes run at once.
+    """
+
+    def __init__(
+        self,
+        binary: str = TERRAFORM_BINARY,
+        max_concurrency: int = TERRAFORM_MAX_CONCURRENCY,
+        timeout: float = TERRAFORM_TIMEOUT_SECONDS,
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            binary: The Terraform executable to run
+            max_concurrency: Maximum number of concurrent Terraform processes
+            timeout: Default timeout in seconds for a single command
+        """
+        self.binary = binary
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(
+        self,
+        *args: str,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> TerraformResult:
+        """
+        Run a Terraform command and capture its output.
+
+        Args:
+            args: Arguments passed to the Terraform binary
+            cwd: Working directory for the command
+            env: Environment for the command, defaults to the current one
+            timeout: Timeout in seconds, defaults to the runner's timeout
+
+        Returns:
+            The command result; a non-zero exit code is not an error
+
+        Raises:
+            TerraformTimeoutError: If the command does not finish in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        cmd = [self.binary, *args]
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=cwd,
+                env=env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await self._terminate(process)
+                _record(args, "timeout", started)
+                raise TerraformTimeoutError(
+                    f"terraform {' '.join(args)} timed out after {timeout:.0f}s"
+                )
+            except asyncio.CancelledError:
+                await self._terminate(process)
+                raise
+
+        result = TerraformResult(
+            args=cmd,
+            returncode=process.returncode,
+            stdout=stdout.decode(errors="replace"),
+            stderr=stderr.decode(errors="replace"),
+            duration=time.perf_counter() - started,
+        )
+        _record(args, "ok" if result.returncode == 0 else "error", started)
+        return result
+
+    async def stream(
+        self,
+        *args: str,
+        on_line: Optional[LineCallback] = None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        tail_lines: int = TERRAFORM_LOG_TAIL_LINES,
+    ) -> TerraformResult:
+        """
+        Run a Terraform command, handing each output line over as it arrives.
+
+        Only the last ``tail_lines`` lines of each stream are kept, so memory
+        use stays flat however much a long apply prints.
+
+        Args:
+            args: Arguments passed to the Terraform binary
+            on_line: Called with the stream name and each line, without
+                the trailing newline
+            cwd: Working directory for the command
+            env: Environment for the command, defaults to the current one
+            timeout: Timeout in seconds, defaults to the runner's timeout
+            tail_lines: Number of lines of each stream kept in the result
+
+        Returns:
+            The command result with the tail of its output
+
+        Raises:
+            TerraformTimeoutError: If the command does not finish in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        cmd = [self.binary, *args]
+        tails = {
+            "stdout": deque(maxlen=tail_lines),
+            "stderr": deque(maxlen=tail_lines),
+        }
+        counts = {"stdout": 0, "stderr": 0}
+
+        async def pump(name: str, reader: asyncio.StreamReader) -> None:
+            pending = b""
+            while True:
+                chunk = await reader.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                *lines, pending = (pending + chunk).split(b"\n")
+                for line in lines:
+                    emit(name, line)
+            if pending:
+                emit(name, pending)
+
+        def emit(name: str, raw: bytes) -> None:
+            line = raw.decode(errors="replace").rstrip("\r")
+            tails[name].append(line)
+            counts[name] += 1
+            if on_line is not None:
+                on_line(name, line)
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=cwd,
+                env=env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        pump("stdout", process.stdout),
+                        pump("stderr", process.stderr),
+                        process.wait(),
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                await self._terminate(process)
+                _record(args, "timeout", started)
+                raise TerraformTimeoutError(
+                    f"terraform {' '.join(args)} timed out after {timeout:.0f}s"
+                )
+            except BaseException:
+                # Cancelled, or on_line failed; don't leave Terraform running
+                await self._terminate(process)
+                raise
+
+        result = TerraformResult(
+            args=cmd,
+            returncode=process.returncode,
+            stdout=_join_tail(tails["stdout"]),
+            stderr=_join_tail(tails["stderr"]),
+            duration=time.perf_counter() - started,
+            truncated=any(counts[name] > len(tails[name]) for name in tails),
+        )
+        _record(args, "ok" if result.returncode == 0 else "error", started)
+        return result
+
+    async def _terminate(self, process: asyncio.subprocess.Process) -> None:
+        """Stop a running process, letting Terraform release its state lock first."""
+        if process.returncode is not None:
+            return
+        try:
+            # SIGINT makes Terraform stop gracefully and persist any state
+            process.send_signal(signal.SIGINT)
+            await asyncio.wait_for(
+                asyncio.shield(process.wait()), TERMINATE_GRACE_SECONDS
+            )
+        except (asyncio.TimeoutError, ProcessLookupError):
+            pass
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+
+def _record(args: tuple, status: str, started: float) -> None:
+    """Record how long a Terraform subcommand took, and trace it for the current flow."""
+    ended = time.perf_counter()
+    command = args[0] if args else ""
+    TERRAFORM_COMMAND_DURATION.observe(ended - started, command=command, status=status)
+    flow_id = tracer.current_flow()
+    if flow_id is not None:
+        tracer.record(flow_id, f"terraform {command}", "terraform", started, ended, status=status)
+
+
+def _join_tail(lines: Deque[str]) -> str:
+    """Join kept output lines back into text."""
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+# Shared runner so the concurrency limit applies across all flows
+terraform_runner = TerraformRunner()
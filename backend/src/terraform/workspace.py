@@ -0,0 +1,215 @@
+"""Per-flow Terraform working directories backed by a pool of spare ones."""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from src.constants import (
+    PROJECT_ROOT, WORKSPACE_ROOT, WORKSPACE_POOL_SIZE, WORKSPACE_IDLE_TTL_SECONDS
+)
+
+# Directory used when a node runs outside a flow (CLI, tests)
+DEFAULT_WORKSPACE = os.path.join(PROJECT_ROOT, "terraform_prod")
+
+_FLOW_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+class WorkspaceManager:
+    """Give every flow its own Terraform directory.
+
+    Two flows sharing a directory overwrite each other's ``main.tf``, saved
+    plan and state. Each flow therefore gets ``<root>/flows/<flow_id>``,
+    taken from a pool of pre-created directories so acquiring one is a
+    single rename. Workspaces idle for longer than ``idle_ttl`` are
+    collected: empty ones go back to the pool, while ones holding Terraform
+    state are moved to ``<root>/retired`` so deployed resources are never
+    orphaned.
+    """
+
+    def __init__(
+        self,
+        root: str = WORKSPACE_ROOT,
+        pool_size: int = WORKSPACE_POOL_SIZE,
+        idle_ttl: float = WORKSPACE_IDLE_TTL_SECONDS,
+    ):
+        """
+        Initialize the manager and adopt workspaces left by a previous run.
+
+        Args:
+            root: Directory holding the pool, flow and retired workspaces
+            pool_size: Number of spare directories to keep ready
+            idle_ttl: Seconds a workspace may stay unused before collection
+        """
+        self.root = root
+        self.pool_size = pool_size
+        self.idle_ttl = idle_ttl
+        self._pool_dir = os.path.join(root, "pool")
+        self._flows_dir = os.path.join(root, "flows")
+        self._retired_dir = os.path.join(root, "retired")
+        self._lock = threading.Lock()
+        self._pool: List[str] = []
+        self._last_used: Dict[str, float] = {}
+
+        for directory in (self._pool_dir, self._flows_dir, self._retired_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        # Flows from before a restart keep their workspace until they go idle
+        for flow_id in os.listdir(self._flows_dir):
+            path = os.path.join(self._flows_dir, flow_id)
+            self._last_used[flow_id] = os.path.getmtime(path)
+        for name in os.listdir(self._pool_dir):
+            self._pool.append(os.path.join(self._pool_dir, name))
+        self._refill_pool()
+
+    def acquire(self, flow_id: str) -> str:
+        """
+        Return the workspace for a flow, assigning one from the pool if needed.
+
+        Args:
+            flow_id: The flow to get a workspace for
+
+        Returns:
+            Absolute path of the flow's workspace
+
+        Raises:
+            ValueError: If the flow id is not safe to use as a directory name
+        """
+        if not _FLOW_ID_PATTERN.match(flow_id):
+            raise ValueError(f"Invalid flow id: {flow_id!r}")
+
+        path = os.path.join(self._flows_dir, flow_id)
+        with self._lock:
+            if not os.path.isdir(path):
+                spare = self._pool.pop() if self._pool else None
+                if spare and os.path.isdir(spare):
+                    os.rename(spare, path)
+                else:
+                    os.makedirs(path, exist_ok=True)
+                self._refill_pool()
+            self._last_used[flow_id] = time.time()
+        return path
+
+    def path_for(self, flow_id: str) -> Optional[str]:
+        """Return the flow's workspace path, or None if it has none."""
+        with self._lock:
+            if flow_id not in self._last_used:
+                return None
+        return os.path.join(self._flows_dir, flow_id)
+
+    def touch(self, flow_id: str) -> None:
+        """Mark a flow's workspace as recently used."""
+        with self._lock:
+            if flow_id in self._last_used:
+                self._last_used[flow_id] = time.time()
+
+    def release(self, flow_id: str) -> None:
+        """
+        Give up a flow's workspace.
+
+        Workspaces holding Terraform state are retired rather than recycled,
+        so the state of applied infrastructure is preserved.
+
+        Args:
+            flow_id: The flow whose workspace to release
+        """
+        with self._lock:
+            if self._last_used.pop(flow_id, None) is None:
+                return
+            path = os.path.join(self._flows_dir, flow_id)
+            if not os.path.isdir(path):
+                return
+
+            if _has_state(path):
+                retired = os.path.join(self._retired_dir, f"{flow_id}-{int(time.time())}")
+                os.rename(path, retired)
+            elif len(self._pool) < self.pool_size:
+                spare = os.path.join(self._pool_dir, uuid.uuid4().hex)
+                os.rename(path, spare)
+                _clear_directory(spare)
+                self._pool.append(spare)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def collect_garbage(self, now: Optional[float] = None,
+                        keep: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        Release every workspace that has been idle for longer than the TTL.
+
+        Args:
+            now: Current time, defaults to time.time()
+            keep: Returns True for flows whose workspace must stay however
+                long it has been idle, e.g. ones waiting for an approval
+
+        Returns:
+            The flow ids whose workspaces were released
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [
+                flow_id for flow_id, last_used in self._last_used.items()
+                if now - last_used > self.idle_ttl and not (keep and keep(flow_id))
+            ]
+        for flow_id in idle:
+            self.release(flow_id)
+        return idle
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of active and spare workspaces."""
+        with self._lock:
+            return {"active": len(self._last_used), "pooled": len(self._pool)}
+
+    def _refill_pool(self) -> None:
+        """Top the pool up to its target size. Caller holds the lock."""
+        while len(self._pool) < self.pool_size:
+            spare = os.path.join(self._pool_dir, uuid.uuid4().hex)
+            os.makedirs(spare)
+            self._pool.append(spare)
+
+
+def _has_state(path: str) -> bool:
+    """Return whether a workspace holds Terraform state with resources."""
+    state_path = os.path.join(path, "terraform.tfstate")
+    if not os.path.exists(state_path):
+        return False
+    try:
+        with open(state_path, "r") as f:
+            return bool(json.load(f).get("resources"))
+    except (OSError, ValueError):
+        # Unreadable state is kept, better safe than sorry
+        return True
+
+
+def _clear_directory(path: str) -> None:
+    """Remove everything inside a directory but keep the directory."""
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        if os.path.isdir(entry) and not os.path.islink(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            os.remove(entry)
+
+
+def resolve_workspace(config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Return the Terraform directory for the flow a node is running in.
+
+    Args:
+        config: The node's RunnableConfig, carrying the flow id
+
+    Returns:
+        The flow's workspace, or the shared default directory outside a flow
+    """
+    configurable = (config or {}).get("configurable", {})
+    flow_id = configurable.get("flow_id") or configurable.get("thread_id")
+    if not flow_id:
+        os.makedirs(DEFAULT_WORKSPACE, exist_ok=True)
+        return DEFAULT_WORKSPACE
+    return workspace_manager.acquire(flow_id)
+
+
+workspace_manager = WorkspaceManager()
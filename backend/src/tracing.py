@@ -0,0 +1,160 @@
+"""Per-flow trace spans in the Chrome trace-event format."""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from src.constants import TRACE_MAX_EVENTS
+
+# The flow whose work is running, set around each graph node so the
+# subprocess and LLM spans inside it are filed under the right flow
+_current_flow: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_flow", default=None)
+
+
+def _micros(seconds: float) -> float:
+    return round(seconds * 1_000_000, 1)
+
+
+class Tracer:
+    """Record nested spans of each flow's work.
+
+    Spans are complete ("X") events timed with ``time.perf_counter``, so
+    nesting follows from their start and end times, which is how trace
+    viewers such as chrome://tracing or Perfetto lay them out. Each flow
+    keeps its most recent spans in a bounded buffer until it is discarded.
+    """
+
+    def __init__(self, max_events: int = TRACE_MAX_EVENTS):
+        """
+        Initialize the tracer.
+
+        Args:
+            max_events: Number of spans kept per flow
+        """
+        self.max_events = max_events
+        self._events: Dict[str, Deque[Dict[str, Any]]] = {}
+        # Spans started and ended by separate calls, e.g. the approval wait
+        self._open: Dict[Tuple[str, str], Tuple[float, str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def flow(self, flow_id: Optional[str]) -> Iterator[None]:
+        """File the spans recorded inside the block under a flow."""
+        token = _current_flow.set(flow_id)
+        try:
+            yield
+        finally:
+            _current_flow.reset(token)
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[None]:
+        """
+        Record the block as a span of the current flow.
+
+        Nothing is recorded outside a flow.
+
+        Args:
+            name: What the span covers, e.g. a node name
+            category: The kind of work: node, llm, terraform or flow
+            args: Details shown with the span
+        """
+        flow_id = _current_flow.get()
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            if flow_id is not None:
+                self.record(flow_id, name, category, started, time.perf_counter(), **args)
+
+    def current_flow(self) -> Optional[str]:
+        """Return the flow spans are currently filed under."""
+        return _current_flow.get()
+
+    def record(self, flow_id: str, name: str, category: str, started: float, ended: float, **args: Any) -> None:
+        """
+        Record a span that already finished.
+
+        Args:
+            flow_id: The flow the work belongs to
+            name: What the span covers
+            category: The kind of work
+            started: ``time.perf_counter()`` at the start
+            ended: ``time.perf_counter()`` at the end
+            args: Details shown with the span
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": _micros(started),
+            "dur": _micros(ended - started),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            events = self._events.get(flow_id)
+            if events is None:
+                events = self._events[flow_id] = deque(maxlen=self.max_events)
+            events.append(event)
+
+    def begin(self, flow_id: str, name: str, category: str = "flow", **args: Any) -> None:
+        """Start a span that ends in a later call to end, e.g. across a request."""
+        with self._lock:
+            self._open[(flow_id, name)] = (time.perf_counter(), category, args)
+
+    def end(self, flow_id: str, name: str) -> None:
+        """End a span started with begin; does nothing if there is none."""
+        with self._lock:
+            opened = self._open.pop((flow_id, name), None)
+        if opened is not None:
+            started, category, args = opened
+            self.record(flow_id, name, category, started, time.perf_counter(), **args)
+
+    def export(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a flow's spans as a Chrome trace-event document.
+
+        Args:
+            flow_id: The flow to export
+
+        Returns:
+            The trace, or None if nothing was recorded for the flow
+        """
+        with self._lock:
+            events: List[Dict[str, Any]] = list(self._events.get(flow_id, ()))
+            pending = [
+                (name, started, category, args)
+                for (open_flow, name), (started, category, args) in self._open.items()
+                if open_flow == flow_id
+            ]
+        if not events and not pending:
+            return None
+        now = time.perf_counter()
+        for name, started, category, args in pending:
+            # Still open, e.g. a flow waiting for approval; show it so far
+            events.append({
+                "name": name, "cat": category, "ph": "X", "ts": _micros(started),
+                "dur": _micros(now - started), "pid": os.getpid(), "tid": 0,
+                "args": {**args, "open": True},
+            })
+        events.sort(key=lambda event: event["ts"])
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"flow_id": flow_id}}
+
+    def discard(self, flow_id: str) -> None:
+        """Drop the spans of a flow that is no longer tracked."""
+        with self._lock:
+            self._events.pop(flow_id, None)
+            for key in [key for key in self._open if key[0] == flow_id]:
+                del self._open[key]
+
+
+# Shared tracer so spans from nodes, agents and the runner land together
+tracer = Tracer()
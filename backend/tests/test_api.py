@@ -0,0 +1,358 @@
+"""Tests for the WebSocket flow streaming in the API."""
+
+import asyncio
+import os
+
+import pytest
+from langgraph.types import Command, Interrupt
+
+from src.api import stream_flow
+from src.flow_executor import FlowExecutor
+
+
+class FakeWebSocket:
+    """Collect the messages the API sends to a client."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+class FakeGraph:
+    """Replay a fixed list of astream events and record the inputs."""
+
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    async def astream(self, graph_input, config, stream_mode):
+        self.calls.append((graph_input, config))
+        for event in self.events:
+            await asyncio.sleep(0)
+            if isinstance(event, tuple):
+                yield event
+            else:
+                yield "updates", event
+
+
+@pytest.fixture
+def websocket():
+    """Return a fake client connection."""
+    return FakeWebSocket()
+
+
+def test_stream_flow_sends_progress_per_node(websocket):
+    """Test that each node update is forwarded as a progress event."""
+    graph = FakeGraph([
+        {"execute_terraform": {"result": "Apply complete!"}},
+        {"node_terraform_show": {"result": "shown"}},
+    ])
+
+    asyncio.run(stream_flow(websocket, graph, Command(resume={"approved": True}), "flow-1"))
+
+    assert [message["type"] for message in websocket.sent] == ["progress", "progress"]
+    assert websocket.sent[0]["data"] == {"execute_terraform": {"result": "Apply complete!"}}
+    resume, config = graph.calls[0]
+    assert resume.resume == {"approved": True}
+    assert config["configurable"]["thread_id"] == "flow-1"
+
+
+def test_stream_flow_stops_at_interrupt(websocket):
+    """Test that an interrupt is sent as a confirmation and ends the stream."""
+    interrupt = Interrupt(value={"question": "Is this correct?", "plan_output": "plan"})
+    graph = FakeGraph([
+        {"terraform_plan": {"result": "plan"}},
+        {"__interrupt__": (interrupt,)},
+        {"execute_terraform": {"result": "should not be sent"}},
+    ])
+
+    asyncio.run(stream_flow(websocket, graph, {"task": "bucket"}, "flow-2"))
+
+    assert [message["type"] for message in websocket.sent] == ["progress", "confirmation"]
+    assert websocket.sent[1]["question"] == "Is this correct?"
+    assert websocket.sent[1]["flow_id"] == "flow-2"
+
+
+def test_stream_flow_does_not_block_other_flows(websocket):
+    """Test that a slow flow does not hold up another one."""
+    order = []
+
+    class SlowGraph(FakeGraph):
+        async def astream(self, graph_input, config, stream_mode):
+            await asyncio.sleep(0.2)
+            order.append("slow")
+            yield "updates", {"execute_terraform": {}}
+
+    class FastGraph(FakeGraph):
+        async def astream(self, graph_input, config, stream_mode):
+            order.append("fast")
+            yield "updates", {"execute_terraform": {}}
+
+    async def run_both():
+        await asyncio.gather(
+            stream_flow(websocket, SlowGraph([]), {}, "slow"),
+            stream_flow(websocket, FastGraph([]), {}, "fast"),
+        )
+
+    asyncio.run(run_both())
+
+    assert order == ["fast", "slow"]
+
+
+def test_stream_flow_forwards_terraform_logs(websocket):
+    """Test that streamed Terraform output reaches the client as log events."""
+    graph = FakeGraph([
+        ("custom", {"type": "log", "command": "apply", "stream": "stdout", "line": "Creating..."}),
+        {"execute_terraform": {"result": "Apply complete!"}},
+    ])
+
+    asyncio.run(stream_flow(websocket, graph, Command(resume={"approved": True}), "flow-1"))
+
+    assert websocket.sent[0] == {
+        "type": "log",
+        "command": "apply",
+        "stream": "stdout",
+        "line": "Creating...",
+        "flow_id": "flow-1",
+    }
+    assert websocket.sent[1]["type"] == "progress"
+
+
+def test_get_flow_plan_returns_full_json(tmp_path, monkeypatch):
+    """Test that the full plan JSON is served on demand."""
+    from fastapi.testclient import TestClient
+
+    from src import api
+
+    (tmp_path / "plan.json").write_text('{"planned_values": {}}')
+    monkeypatch.setattr(api.workspace_manager, "path_for", lambda flow_id: str(tmp_path) if flow_id == "flow-1" else None)
+    client = TestClient(api.app)
+
+    assert client.get("/flows/flow-1/plan").json() == {"planned_values": {}}
+    assert client.get("/flows/flow-2/plan").status_code == 404
+
+
+def test_get_artifact(tmp_path, monkeypatch):
+    """Test that artifacts are served by reference."""
+    from fastapi.testclient import TestClient
+
+    from src import api
+    from src.artifacts import ArtifactStore
+
+    store = ArtifactStore(root=str(tmp_path))
+    monkeypatch.setattr(api, "artifact_store", store)
+    ref = store.put('{"values": {}}')
+    client = TestClient(api.app)
+
+    assert client.get(f"/artifacts/{ref}").json() == {"values": {}}
+    assert client.get("/artifacts/sha256:" + "0" * 64).status_code == 404
+    assert client.get("/artifacts/not-a-ref").status_code == 400
+
+
+def test_stream_flow_tracks_flow_status(websocket):
+    """Test that flows are registered as waiting at an interrupt and done at the end."""
+    from src.api import flow_registry
+
+    interrupt = Interrupt(value={"question": "Is this correct?"})
+    asyncio.run(stream_flow(websocket, FakeGraph([{"__interrupt__": (interrupt,)}]), {}, "flow-wait"))
+    asyncio.run(stream_flow(websocket, FakeGraph([{"execute_terraform": {}}]), {}, "flow-done"))
+
+    assert flow_registry.get("flow-wait").status == "waiting_for_input"
+    assert flow_registry.get("flow-done").status == "done"
+
+
+def test_pending_approval_outlives_workspace_ttl(tmp_path, monkeypatch):
+    """Test that idle collection keeps the workspace and checkpoint of a flow waiting for approval."""
+    from src import api
+    from src.flow_registry import FLOW_WAITING, FlowRegistry
+    from src.terraform.workspace import WorkspaceManager
+
+    manager = WorkspaceManager(root=str(tmp_path), pool_size=0, idle_ttl=0)
+    deleted = []
+    monkeypatch.setattr(api, "workspace_manager", manager)
+    monkeypatch.setattr(api, "flow_registry", FlowRegistry(on_remove=api.release_flow))
+    monkeypatch.setattr(api.checkpointer, "delete_thread", deleted.append)
+    waiting = manager.acquire("flow-waiting")
+    manager.acquire("flow-unknown")
+    api.flow_registry.register("flow-waiting", FLOW_WAITING)
+
+    asyncio.run(api.release_idle_flows())
+
+    assert os.path.isdir(waiting)
+    assert manager.path_for("flow-unknown") is None
+    assert deleted == ["flow-unknown"]
+
+
+def test_session_runs_flows_concurrently(websocket):
+    """Test that flows on one connection run side by side and keep their flow ids."""
+    from src.api import ConnectionSession
+
+    class SlowGraph(FakeGraph):
+        async def astream(self, graph_input, config, stream_mode):
+            await asyncio.sleep(0.1)
+            yield "updates", {"execute_terraform": {}}
+
+    async def run():
+        session = ConnectionSession(websocket, max_flows=2, executor=FlowExecutor())
+        for flow_id in ("a", "b"):
+            channel = session.executor.channel(flow_id)
+            session.start(flow_id, stream_flow(channel, SlowGraph([]), {}, flow_id, channel.encoder))
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*session.tasks.values())
+        return asyncio.get_running_loop().time() - started
+
+    elapsed = asyncio.run(run())
+
+    assert elapsed < 0.19
+    assert sorted(message["flow_id"] for message in websocket.sent) == ["a", "b"]
+
+
+def test_session_limits_concurrent_flows(websocket):
+    """Test that flows past the limit wait for a slot."""
+    from src.api import ConnectionSession
+
+    running = []
+    peak = []
+
+    async def flow():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def run():
+        session = ConnectionSession(websocket, max_flows=2, executor=FlowExecutor())
+        for flow_id in range(5):
+            session.start(str(flow_id), flow())
+        await asyncio.gather(*session.tasks.values())
+
+    asyncio.run(run())
+
+    assert max(peak) == 2
+    assert len(peak) == 5
+
+
+def test_session_rejects_duplicate_flow_and_reports_errors(websocket):
+    """Test that a running flow cannot be started twice and errors reach the client."""
+    from src.api import ConnectionSession
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    async def run():
+        session = ConnectionSession(websocket, executor=FlowExecutor())
+        assert session.start("flow-1", failing())
+        assert not session.start("flow-1", failing())
+        await asyncio.gather(*session.tasks.values())
+        return session
+
+    session = asyncio.run(run())
+
+    assert websocket.sent == [{"type": "error", "flow_id": "flow-1", "error": "boom", "seq": 1}]
+    assert session.tasks == {}
+
+
+def test_session_close_leaves_flows_running(websocket):
+    """Test that a flow keeps running when its client goes away."""
+    from src.api import ConnectionSession
+
+    finished = []
+
+    async def flow(channel):
+        await asyncio.sleep(0.01)
+        await channel.send_json({"type": "progress", "flow_id": "flow-1", "data": {}})
+        finished.append(True)
+
+    async def run():
+        session = ConnectionSession(websocket, executor=FlowExecutor())
+        session.start("flow-1", flow(session.executor.channel("flow-1")))
+        task = session.tasks["flow-1"]
+        session.close()
+        await task
+
+    asyncio.run(run())
+
+    assert finished == [True]
+    assert websocket.sent == []
+
+
+def test_session_attach_replays_missed_events():
+    """Test that a reconnecting client gets the events sent while it was away."""
+    from src.api import ConnectionSession
+
+    executor = FlowExecutor()
+    first, second = FakeWebSocket(), FakeWebSocket()
+    graph = FakeGraph([
+        {"terraform_plan": {"task": "bucket", "result": "plan"}},
+        {"execute_terraform": {"task": "bucket", "result": "applied"}},
+    ])
+
+    async def run():
+        session = ConnectionSession(first, executor=executor)
+        channel = executor.channel("flow-1")
+        session.start("flow-1", stream_flow(channel, graph, {}, "flow-1", channel.encoder))
+        session.close()
+        await asyncio.gather(*session.tasks.values())
+
+        reconnected = ConnectionSession(second, executor=executor)
+        assert await reconnected.attach("flow-1", last_seq=1)
+        assert not await reconnected.attach("flow-2")
+
+    asyncio.run(run())
+
+    assert first.sent == []
+    assert [message["seq"] for message in second.sent] == [2]
+    assert second.sent[0]["data"] == {"execute_terraform": {"result": "applied"}}
+    assert len(graph.calls) == 1
+
+
+def test_stream_flow_sends_only_changed_state(websocket):
+    """Test that progress events after the first carry only changed keys."""
+    graph = FakeGraph([
+        {"terraform_plan": {"task": "bucket", "result": "plan"}},
+        {"execute_terraform": {"task": "bucket", "result": "Apply complete!"}},
+    ])
+
+    asyncio.run(stream_flow(websocket, graph, Command(resume={"approved": True}), "flow-1"))
+
+    assert websocket.sent[0]["delta"] is True
+    assert websocket.sent[1]["data"] == {"execute_terraform": {"result": "Apply complete!"}}
+
+
+def test_architecture_task_streams_sections(monkeypatch):
+    """Test that architect mode answers are sent as they stream, then as results."""
+    from src import api
+    from src.flow_executor import FlowChannel
+
+    class StreamingAgent:
+        async def astream_message(self, message, mode):
+            for chunk in ("Intro\n## Comp", "ute\nUse ECS.", "\n"):
+                await asyncio.sleep(0)
+                yield chunk
+
+    monkeypatch.setattr(api, "architecture_agent", StreamingAgent())
+    monkeypatch.setattr(api, "STREAM_FLUSH_INTERVAL_SECONDS", 0)
+    client = FakeWebSocket()
+    channel = FlowChannel("arch-1")
+    channel.subscribe(client)
+
+    asyncio.run(api.run_architecture_task(channel, "client-1", "Run containers", "architect"))
+    api.flow_registry.discard("arch-1")
+
+    streams = [message["data"]["stream"] for message in client.sent if "stream" in message["data"]]
+    results = client.sent[-1]["data"]["results"]
+    assert "".join(stream["text"] for stream in streams) == "Intro\n## Compute\nUse ECS.\n"
+    assert streams[0]["sections"] == [
+        {"index": 0, "type": "heading", "content": "Architecture Recommendation (Architect Mode)",
+         "metadata": {"level": 1}},
+        {"index": 1, "type": "text", "content": "Intro\n"},
+    ]
+    assert results["message"] == "Intro\n## Compute\nUse ECS.\n"
+    assert results["structuredContent"]["sections"][1:] == [
+        {"type": "text", "content": "Intro"},
+        {"type": "heading", "content": "Compute", "metadata": {"level": 2}},
+        {"type": "text", "content": "Use ECS."},
+    ]
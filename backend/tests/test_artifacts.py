@@ -0,0 +1,75 @@
+"""Tests for the content-addressed artifact store."""
+
+import pytest
+
+from src.artifacts import ArtifactStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create an artifact store with a small memory budget."""
+    return ArtifactStore(root=str(tmp_path / "artifacts"), memory_bytes=100)
+
+
+def test_put_and_get(store):
+    """Test that a blob round-trips through its reference."""
+    ref = store.put('{"planned_values": {}}')
+
+    assert ref.startswith("sha256:")
+    assert store.get(ref) == b'{"planned_values": {}}'
+    assert store.get_json(ref) == {"planned_values": {}}
+
+
+def test_put_deduplicates(store):
+    """Test that identical content gets the same reference."""
+    assert store.put(b"same") == store.put("same")
+
+
+def test_put_json(store):
+    """Test that JSON documents are stored compactly."""
+    ref = store.put_json({"a": [1, 2]})
+
+    assert store.get(ref) == b'{"a":[1,2]}'
+
+
+def test_memory_is_bounded(store):
+    """Test that the in-memory LRU stays within its budget."""
+    refs = [store.put(bytes([index]) * 40) for index in range(5)]
+
+    assert store.stats()["memory_bytes"] <= 100
+    # Evicted blobs are still read back from disk
+    assert store.get(refs[0]) == bytes([0]) * 40
+
+
+def test_large_blobs_skip_memory(store):
+    """Test that blobs larger than the budget only live on disk."""
+    ref = store.put(b"x" * 1000)
+
+    assert store.stats()["memory_items"] == 0
+    assert store.get(ref) == b"x" * 1000
+
+
+def test_invalid_and_missing_refs(store):
+    """Test that bad references are rejected and unknown ones are missing."""
+    with pytest.raises(ValueError):
+        store.get("../../etc/passwd")
+    with pytest.raises(KeyError):
+        store.get("sha256:" + "0" * 64)
+
+
+def test_disk_is_bounded(tmp_path):
+    """Test that the least recently used blobs are removed once the disk limit is passed."""
+    import os
+
+    store = ArtifactStore(root=str(tmp_path / "artifacts"), memory_bytes=100, max_bytes=100)
+    first = store.put(b"a" * 40)
+    second = store.put(b"b" * 40)
+    os.utime(store.path_for(first), (1, 1))
+    os.utime(store.path_for(second), (2, 2))
+    third = store.put(b"c" * 40)
+
+    assert store.stats()["disk_bytes"] == 80
+    with pytest.raises(KeyError):
+        store.get(first)
+    assert store.get(second) == b"b" * 40
+    assert store.get(third) == b"c" * 40
@@ -0,0 +1,155 @@
+"""Tests for the SQLite checkpointer."""
+
+import sqlite3
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, StateGraph
+from langgraph.types import Command, interrupt
+
+from src.checkpointer import SQLiteCheckpointSaver
+
+
+class CounterState(TypedDict):
+    count: int
+    approved: bool
+
+
+def _build(checkpointer):
+    def increment(state):
+        return {"count": state["count"] + 1}
+
+    def approve(state):
+        return {"approved": interrupt({"question": "Is this correct?"})}
+
+    builder = StateGraph(CounterState)
+    builder.add_node("increment", increment)
+    builder.add_node("approve", approve)
+    builder.set_entry_point("increment")
+    builder.add_edge("increment", "approve")
+    builder.add_edge("approve", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _count(path, table):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Return the path of a fresh checkpoint database."""
+    return str(tmp_path / "checkpoints.sqlite")
+
+
+def test_pending_approval_survives_restart(db_path):
+    """Test that an interrupted flow can be resumed by a new process."""
+    config = {"configurable": {"thread_id": "flow-1"}}
+    first = SQLiteCheckpointSaver(db_path)
+    _build(first).invoke({"count": 0, "approved": False}, config)
+    first.close()
+
+    second = SQLiteCheckpointSaver(db_path)
+    graph = _build(second)
+    assert graph.get_state(config).next == ("approve",)
+
+    result = graph.invoke(Command(resume=True), config)
+
+    assert result == {"count": 1, "approved": True}
+
+
+def test_writes_are_batched(db_path):
+    """Test that checkpoints are queued until a flush."""
+    saver = SQLiteCheckpointSaver(db_path, batch_size=1000, flush_interval=60)
+    config = {"configurable": {"thread_id": "flow-1"}}
+
+    _build(saver).invoke({"count": 0, "approved": False}, config)
+    saver._connection()
+    queued = _count(db_path, "checkpoints")
+    saver.flush()
+
+    assert queued == 0
+    assert _count(db_path, "checkpoints") > 0
+
+
+def test_reads_see_queued_writes(db_path):
+    """Test that a read flushes queued checkpoints first."""
+    saver = SQLiteCheckpointSaver(db_path, batch_size=1000, flush_interval=60)
+    config = {"configurable": {"thread_id": "flow-1"}}
+
+    _build(saver).invoke({"count": 0, "approved": False}, config)
+
+    assert saver.get_tuple(config).checkpoint["channel_values"]["count"] == 1
+
+
+def test_retention_keeps_last_checkpoints(db_path):
+    """Test that each thread is compacted to its newest checkpoints."""
+    saver = SQLiteCheckpointSaver(db_path, retention=3)
+    graph = _build(saver)
+    config = {"configurable": {"thread_id": "flow-1"}}
+
+    for _ in range(5):
+        graph.invoke({"count": 0, "approved": False}, config)
+        graph.invoke(Command(resume=True), config)
+    saver.flush()
+
+    assert _count(db_path, "checkpoints") == 3
+    assert len(list(saver.list(config))) == 3
+    assert graph.get_state(config).values["approved"] is True
+
+
+def test_list_filters_and_limits(db_path):
+    """Test listing across threads with a limit."""
+    saver = SQLiteCheckpointSaver(db_path)
+    graph = _build(saver)
+    for thread_id in ("flow-1", "flow-2"):
+        graph.invoke({"count": 0, "approved": False}, {"configurable": {"thread_id": thread_id}})
+
+    assert {item.config["configurable"]["thread_id"] for item in saver.list(None)} == {"flow-1", "flow-2"}
+    assert len(list(saver.list(None, limit=2))) == 2
+    assert all(
+        item.metadata["source"] == "input"
+        for item in saver.list({"configurable": {"thread_id": "flow-1"}}, filter={"source": "input"})
+    )
+
+
+def test_delete_thread(db_path):
+    """Test that a finished flow's checkpoints can be removed."""
+    saver = SQLiteCheckpointSaver(db_path)
+    config = {"configurable": {"thread_id": "flow-1"}}
+    _build(saver).invoke({"count": 0, "approved": False}, config)
+
+    saver.delete_thread("flow-1")
+
+    assert saver.get_tuple(config) is None
+    assert _count(db_path, "writes") == 0
+
+
+def test_async_methods_run_off_the_event_loop(db_path):
+    """Test that the async graph API works and SQLite is used from worker threads."""
+    import asyncio
+    import threading
+
+    checkpointer = SQLiteCheckpointSaver(db_path)
+    threads = set()
+    query = checkpointer._query
+
+    def recording_query(sql, params):
+        threads.add(threading.get_ident())
+        return query(sql, params)
+
+    checkpointer._query = recording_query
+    config = {"configurable": {"thread_id": "flow-1"}}
+
+    async def run():
+        graph = _build(checkpointer)
+        await graph.ainvoke({"count": 0, "approved": False}, config)
+        result = await graph.ainvoke(Command(resume=True), config)
+        listed = [item async for item in checkpointer.alist(config, limit=1)]
+        return result, listed, threading.get_ident()
+
+    result, listed, loop_thread = asyncio.run(run())
+
+    assert result == {"count": 1, "approved": True}
+    assert len(listed) == 1
+    assert threads and loop_thread not in threads
@@ -1,11 +1,14 @@
 """Tests for the execute_terraform node."""
 
 import os
+import json
 import pytest
 from unittest.mock import patch, MagicMock
 
 from src.nodes.execute_terraform import execute_terraform
-from src.constants import ACTION_USER_INTERACTION
+from src.constants import ACTION_APPROVE_PLAN, ACTION_USER_INTERACTION
+from src.terraform.plan_files import PLAN_FILE, PLAN_JSON_FILE, record_plan
+from src.terraform.plan_summary import summarize_plan
 
 @pytest.fixture
 def mock_terraform_config():
@@ -223,4 +226,71 @@ def test_execute_terraform_no_file_path():
 
     # Verify error handling
     assert "No Terraform file path specified" in result["error"]
-    assert result["next_action"] == ACTION_USER_INTERACTION
\ No newline at end of file
+    assert result["next_action"] == ACTION_USER_INTERACTION
+def _completed(stdout=""):
+    result = MagicMock()
+    result.stdout = stdout
+    result.stderr = ""
+    result.returncode = 0
+    return result
+
+@patch('subprocess.run')
+def test_execute_terraform_applies_saved_plan(mock_run, mock_state):
+    """Test that a fresh saved plan is applied without re-planning."""
+    tf_dir = os.path.dirname(mock_state["terraform_file_path"])
+    with open(os.path.join(tf_dir, PLAN_FILE), "wb") as f:
+        f.write(b"plan")
+    record_plan(tf_dir)
+    mock_run.return_value = _completed("Apply complete! Resources: 6 added, 0 changed, 0 destroyed.")
+
+    result = execute_terraform(mock_state)
+
+    assert mock_run.call_count == 1
+    assert mock_run.call_args[0][0][1:] == ["apply", "-input=false", PLAN_FILE]
+    assert "Apply complete!" in result["result"]
+    assert result["error"] == ""
+    assert not os.path.exists(os.path.join(tf_dir, PLAN_FILE))
+
+def _plan_json(*addresses):
+    changes = [{"address": address, "type": address.split(".")[0], "change": {"actions": ["create"]}}
+               for address in addresses]
+    return json.dumps({"format_version": "1.2", "resource_changes": changes})
+
+@patch('subprocess.run')
+def test_execute_terraform_replans_stale_plan(mock_run, mock_state):
+    """Test that a stale saved plan is replaced before applying when its changes are the same."""
+    mock_state["terraform_json"] = summarize_plan(json.loads(_plan_json("aws_s3_bucket.cdn_bucket")))
+    mock_run.side_effect = [
+        _completed("Plan: 1 to add"),
+        _completed(_plan_json("aws_s3_bucket.cdn_bucket")),
+        _completed("Apply complete!"),
+    ]
+
+    result = execute_terraform(mock_state)
+
+    plan_call, show_call, apply_call = mock_run.call_args_list
+    assert plan_call[0][0][1] == "plan"
+    assert show_call[0][0][1:] == ["show", "-json", PLAN_FILE]
+    assert apply_call[0][0][1:] == ["apply", "-input=false", PLAN_FILE]
+    assert "re-planned" in result["result"]
+    assert result["error"] == ""
+
+@patch('subprocess.run')
+def test_execute_terraform_changed_plan_goes_back_to_approval(mock_run, mock_state):
+    """Test that a re-plan with other changes than the approved plan is not applied."""
+    mock_state["terraform_json"] = summarize_plan(json.loads(_plan_json("aws_s3_bucket.cdn_bucket")))
+    mock_run.side_effect = [
+        _completed("Plan: 2 to add"),
+        _completed(_plan_json("aws_s3_bucket.cdn_bucket", "aws_cloudfront_distribution.s3_distribution")),
+    ]
+
+    result = execute_terraform(mock_state)
+
+    assert mock_run.call_count == 2
+    assert result["next_action"] == ACTION_APPROVE_PLAN
+    assert "changed since it was approved" in result["error"]
+    assert "create: aws_cloudfront_distribution.s3_distribution" in result["result"]
+    assert len(result["terraform_json"]["resource_changes"]) == 2
+    # The new plan is recorded, so applying it after approval does not re-plan
+    tf_dir = os.path.dirname(mock_state["terraform_file_path"])
+    assert os.path.exists(os.path.join(tf_dir, PLAN_JSON_FILE))
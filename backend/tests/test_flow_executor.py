@@ -0,0 +1,104 @@
+"""Tests for background flow execution and event replay."""
+
+import asyncio
+
+from src.flow_executor import FlowChannel, FlowExecutor
+
+
+class FakeWebSocket:
+    """Collect the messages sent to a client."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def test_channel_numbers_and_fans_out_events():
+    """Test that events get increasing seqs and reach every attached client."""
+    channel = FlowChannel("flow-1")
+    first, second = FakeWebSocket(), FakeWebSocket()
+    channel.subscribe(first)
+    channel.subscribe(second)
+
+    async def run():
+        await channel.send_json({"type": "log", "line": "a"})
+        await channel.send_json({"type": "log", "line": "b"})
+
+    asyncio.run(run())
+
+    assert [message["seq"] for message in first.sent] == [1, 2]
+    assert second.sent == first.sent
+
+
+def test_attach_replays_after_last_seq():
+    """Test that attaching replays only the events after the client's last one."""
+    channel = FlowChannel("flow-1")
+    client = FakeWebSocket()
+
+    async def run():
+        for line in "abc":
+            await channel.send_json({"type": "log", "line": line})
+        await channel.attach(client, last_seq=1)
+        await channel.send_json({"type": "log", "line": "d"})
+
+    asyncio.run(run())
+
+    assert [message["line"] for message in client.sent] == ["b", "c", "d"]
+
+
+def test_attach_sends_snapshot_when_events_were_dropped():
+    """Test that a client that missed dropped events gets the flow state first."""
+    channel = FlowChannel("flow-1", buffer_size=2)
+    client = FakeWebSocket()
+    channel.encoder.encode("flow-1", {"terraform_plan": {"task": "bucket", "result": "plan"}})
+
+    async def run():
+        for line in "abc":
+            await channel.send_json({"type": "log", "line": line})
+        await channel.attach(client, last_seq=0)
+
+    asyncio.run(run())
+
+    assert client.sent[0] == {
+        "type": "snapshot",
+        "flow_id": "flow-1",
+        "seq": 1,
+        "data": {"task": "bucket", "result": "plan"},
+    }
+    assert [message["seq"] for message in client.sent[1:]] == [2, 3]
+
+
+def test_gone_client_is_dropped():
+    """Test that a client whose connection fails stops getting events."""
+    channel = FlowChannel("flow-1")
+
+    class ClosedWebSocket:
+        async def send_json(self, message):
+            raise RuntimeError("closed")
+
+    channel.subscribe(ClosedWebSocket())
+    asyncio.run(channel.send_json({"type": "log"}))
+
+    assert channel._subscribers == set()
+
+
+def test_executor_runs_flow_once_and_keeps_channel_while_running():
+    """Test that a flow cannot run twice and its channel outlives discard while running."""
+    executor = FlowExecutor()
+
+    async def run():
+        gate = asyncio.Event()
+        channel = executor.channel("flow-1")
+        task = executor.start("flow-1", gate.wait())
+        assert executor.start("flow-1", gate.wait()) is None
+        executor.discard("flow-1")
+        assert executor.get("flow-1") is channel
+        gate.set()
+        await task
+        await asyncio.sleep(0)
+        executor.discard("flow-1")
+        assert executor.get("flow-1") is None
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+"""Tests for the bounded flow registry."""
+
+import asyncio
+
+import pytest
+
+from src.flow_registry import FLOW_DONE, FLOW_RUNNING, FLOW_WAITING, FlowRegistry
+
+
+@pytest.fixture
+def removed():
+    """Collect the flows handed to the cleanup callback."""
+    return []
+
+
+@pytest.fixture
+def registry(removed):
+    """Create a small registry recording removals."""
+    return FlowRegistry(max_flows=2, idle_ttl=60, on_remove=lambda flow_id, reason: removed.append((flow_id, reason)))
+
+
+def test_register_and_get(registry):
+    """Test that registered flows can be looked up and updated."""
+    registry.register("flow-a", FLOW_WAITING, state={"task": "bucket"})
+
+    record = registry.get("flow-a")
+
+    assert record.status == FLOW_WAITING
+    assert record.state == {"task": "bucket"}
+    assert "flow-a" in registry
+    assert registry.get("flow-b") is None
+
+
+def test_idle_flows_expire(registry, removed):
+    """Test that flows idle past the TTL are removed and cleaned up."""
+    registry.register("flow-a", FLOW_WAITING)
+    registry.register("flow-b", FLOW_RUNNING)
+
+    expired = registry.collect_expired(now=10 ** 12)
+
+    assert expired == ["flow-a"]
+    assert removed == [("flow-a", "expired")]
+    assert "flow-b" in registry
+    assert registry.metrics() == {"live": 1, "expired": 1, "evicted": 0}
+
+
+def test_least_recently_used_idle_flow_is_evicted(registry, removed):
+    """Test that going over the cap evicts the oldest idle flow."""
+    from src.metrics import FLOWS_REMOVED
+
+    evicted_before = FLOWS_REMOVED.value(reason="evicted")
+    registry.register("flow-a", FLOW_DONE)
+    registry.register("flow-b", FLOW_WAITING)
+    registry.get("flow-a")
+
+    registry.register("flow-c", FLOW_RUNNING)
+
+    assert removed == [("flow-b", "evicted")]
+    assert "flow-a" in registry
+    assert registry.metrics()["evicted"] == 1
+    assert FLOWS_REMOVED.value(reason="evicted") == evicted_before + 1
+
+
+def test_running_flows_are_not_evicted(registry, removed):
+    """Test that running flows stay even over the cap."""
+    for flow_id in ("flow-a", "flow-b", "flow-c"):
+        registry.register(flow_id, FLOW_RUNNING)
+
+    assert removed == []
+    assert registry.metrics()["live"] == 3
+
+
+def test_removal_cancels_pending_future(registry):
+    """Test that an abandoned approval does not leave its future pending."""
+    async def expire():
+        future = asyncio.get_running_loop().create_future()
+        registry.register("flow-a", FLOW_WAITING, future=future)
+        registry.collect_expired(now=10 ** 12)
+        return future
+
+    assert asyncio.run(expire()).cancelled()
+
+
+def test_discard_skips_cleanup(registry, removed):
+    """Test that discarding a flow does not run the cleanup callback."""
+    registry.register("flow-a", FLOW_DONE)
+
+    registry.discard("flow-a")
+
+    assert "flow-a" not in registry
+    assert removed == []
@@ -0,0 +1,64 @@
+"""Tests for the compressed WebSocket framing."""
+
+import asyncio
+
+from src.api import ConnectionSession
+from src.framing import (
+    SUBPROTOCOL_JSON_DEFLATE,
+    SUBPROTOCOL_MSGPACK_ZSTD,
+    FrameCodec,
+    negotiate,
+)
+
+MESSAGE = {
+    "type": "confirmation",
+    "flow_id": "flow-1",
+    "terraform_json": {"resource_changes": [{"address": "aws_s3_bucket.b", "change": {"actions": ["create"]}}]},
+}
+
+
+def test_codecs_round_trip():
+    """Test that each subprotocol decodes what it encodes."""
+    for subprotocol in (SUBPROTOCOL_MSGPACK_ZSTD, SUBPROTOCOL_JSON_DEFLATE):
+        codec = FrameCodec(subprotocol)
+        assert codec.decode(codec.encode(MESSAGE)) == MESSAGE
+
+
+def test_negotiate_prefers_msgpack():
+    """Test that the best subprotocol offered is picked."""
+    assert negotiate([SUBPROTOCOL_JSON_DEFLATE, SUBPROTOCOL_MSGPACK_ZSTD]).subprotocol == SUBPROTOCOL_MSGPACK_ZSTD
+    assert negotiate([SUBPROTOCOL_JSON_DEFLATE]).subprotocol == SUBPROTOCOL_JSON_DEFLATE
+
+
+def test_negotiate_falls_back_to_json():
+    """Test that clients offering no known subprotocol keep JSON."""
+    assert negotiate([]) is None
+    assert negotiate(["graphql-ws"]) is None
+
+
+def test_session_compresses_large_message_types():
+    """Test that progress and confirmations go binary while other messages stay text."""
+
+    class Recorder:
+        def __init__(self):
+            self.text = []
+            self.binary = []
+
+        async def send_json(self, message):
+            self.text.append(message)
+
+        async def send_bytes(self, payload):
+            self.binary.append(payload)
+
+    websocket = Recorder()
+    codec = FrameCodec(SUBPROTOCOL_JSON_DEFLATE)
+    session = ConnectionSession(websocket, codec=codec)
+
+    async def run():
+        await session.send_json(MESSAGE)
+        await session.send_json({"type": "log", "flow_id": "flow-1", "line": "Creating..."})
+
+    asyncio.run(run())
+
+    assert [codec.decode(payload) for payload in websocket.binary] == [MESSAGE]
+    assert websocket.text == [{"type": "log", "flow_id": "flow-1", "line": "Creating..."}]
@@ -0,0 +1,79 @@
+"""Tests for the compiled graph registry."""
+
+import threading
+
+import pytest
+
+from src.graph_registry import GraphRegistry, graph_registry
+from src.constants import GRAPH_MODE_NORMAL
+
+
+@pytest.fixture
+def counting_builder():
+    """Return a builder that counts how often it is called."""
+    calls = []
+
+    def builder():
+        calls.append(1)
+        return object()
+
+    builder.calls = calls
+    return builder
+
+
+def test_get_compiles_once(counting_builder):
+    """Test that repeated lookups share one compiled graph."""
+    registry = GraphRegistry()
+    registry.register("test", counting_builder)
+
+    first = registry.get("test")
+    second = registry.get("test")
+
+    assert first is second
+    assert len(counting_builder.calls) == 1
+
+
+def test_get_unknown_mode():
+    """Test that looking up an unregistered mode fails."""
+    registry = GraphRegistry()
+
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_warm_up_reports_timings(counting_builder):
+    """Test that warm-up compiles every mode and reports its time."""
+    registry = GraphRegistry()
+    registry.register("a", counting_builder)
+    registry.register("b", counting_builder)
+
+    timings = registry.warm_up()
+
+    assert set(timings) == {"a", "b"}
+    assert all(seconds >= 0 for seconds in timings.values())
+    assert len(counting_builder.calls) == 2
+
+
+def test_concurrent_get_compiles_once(counting_builder):
+    """Test that concurrent first lookups still compile only once."""
+    registry = GraphRegistry()
+    registry.register("test", counting_builder)
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get("test")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(counting_builder.calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_default_registry_has_normal_mode():
+    """Test that the process-wide registry serves the normal workflow."""
+    assert GRAPH_MODE_NORMAL in graph_registry.modes()
+    assert graph_registry.get(GRAPH_MODE_NORMAL) is graph_registry.get()
@@ -0,0 +1,121 @@
+"""Tests for init fingerprinting and the shared plugin cache."""
+
+import asyncio
+import sys
+
+import pytest
+
+from src.terraform import init_cache
+from src.terraform.init_cache import aensure_init, ensure_init, needs_init, record_init
+from src.terraform.runner import TerraformRunner
+
+MAIN_TF = """
+terraform {
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+  }
+}
+
+resource "aws_s3_bucket" "cloudpilot_bucket" {
+  bucket = "cloudpilot-bucket"
+}
+"""
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """Create a workspace holding a simple configuration."""
+    workdir = tmp_path / "workspace"
+    workdir.mkdir()
+    (workdir / "main.tf").write_text(MAIN_TF)
+    return workdir
+
+
+@pytest.fixture
+def fake_terraform(tmp_path, monkeypatch):
+    """Install a fake terraform that counts its init runs."""
+    script = tmp_path / "terraform"
+    script.write_text(f"""#!{sys.executable}
+import os
+os.makedirs(".terraform", exist_ok=True)
+with open("init-count", "a") as f:
+    f.write("init\\n")
+print("Terraform has been successfully initialized!")
+""")
+    script.chmod(0o755)
+    monkeypatch.setattr(init_cache, "TERRAFORM_BINARY", str(script))
+    monkeypatch.setattr(init_cache, "TERRAFORM_PLUGIN_CACHE_DIR", str(tmp_path / "plugins"))
+    return str(script)
+
+
+def _initialize(workspace):
+    (workspace / ".terraform").mkdir()
+    record_init(str(workspace))
+
+
+def test_needs_init_without_previous_init(workspace):
+    """Test that a fresh workspace needs an init."""
+    assert needs_init(str(workspace))
+
+
+def test_unrelated_change_skips_init(workspace):
+    """Test that editing resource arguments does not need a new init."""
+    _initialize(workspace)
+
+    (workspace / "main.tf").write_text(MAIN_TF.replace("cloudpilot-bucket", "renamed-bucket"))
+
+    assert not needs_init(str(workspace))
+
+
+def test_new_provider_needs_init(workspace):
+    """Test that using another provider needs a new init."""
+    _initialize(workspace)
+
+    (workspace / "main.tf").write_text(MAIN_TF + '\nresource "random_id" "suffix" {\n  byte_length = 4\n}\n')
+
+    assert needs_init(str(workspace))
+
+
+def test_provider_version_change_needs_init(workspace):
+    """Test that changing required_providers needs a new init."""
+    _initialize(workspace)
+
+    (workspace / "main.tf").write_text(MAIN_TF.replace("~> 5.0", "~> 4.0"))
+
+    assert needs_init(str(workspace))
+
+
+def test_lock_file_change_needs_init(workspace):
+    """Test that changing the dependency lock file needs a new init."""
+    _initialize(workspace)
+
+    (workspace / ".terraform.lock.hcl").write_text('provider "registry.terraform.io/hashicorp/aws" {}')
+
+    assert needs_init(str(workspace))
+
+
+def test_ensure_init_runs_once(workspace, fake_terraform):
+    """Test that a second ensure_init is skipped."""
+    first = ensure_init(str(workspace))
+    second = ensure_init(str(workspace))
+
+    assert first.returncode == 0
+    assert "skipped" in second.stdout
+    assert (workspace / "init-count").read_text().count("init") == 1
+
+
+def test_aensure_init_runs_once(workspace, fake_terraform):
+    """Test that the async ensure_init also skips a redundant init."""
+    runner = TerraformRunner(binary=fake_terraform)
+
+    async def init_twice():
+        await aensure_init(str(workspace), runner=runner)
+        return await aensure_init(str(workspace), runner=runner)
+
+    second = asyncio.run(init_twice())
+
+    assert "skipped" in second.stdout
+    assert (workspace / "init-count").read_text().count("init") == 1
@@ -0,0 +1,215 @@
+"""Tests for the LLM response cache."""
+
+import asyncio
+from types import SimpleNamespace
+
+from llama_index.core.llms import ChatMessage
+
+from src import llm_cache
+from src.llm_cache import ResponseCache, cached_completion, cached_stream_chat, parse_ttls
+
+
+def fake_llm(text="resource {}", temperature=0.7):
+    """Return a stand-in LLM that counts its calls."""
+    llm = SimpleNamespace(model="claude-test", temperature=temperature, max_tokens=4096, calls=0)
+
+    def complete(prompt, **kwargs):
+        llm.calls += 1
+        return SimpleNamespace(text=f"{text} #{llm.calls}", raw={})
+
+    llm.complete = complete
+    return llm
+
+
+def test_parse_ttls():
+    """Test that per-agent TTLs are read from agent=seconds pairs."""
+    assert parse_ttls("architecture=86400, terraform=60,,") == {"architecture": 86400.0, "terraform": 60.0}
+    assert parse_ttls("") == {}
+
+
+def test_key_covers_model_parameters_and_prompt():
+    """Test that requests differing in parameters or options get different keys."""
+    cache = ResponseCache(ttls={})
+    key = cache.key_for(fake_llm(), ("prompt",), {})
+
+    assert key == cache.key_for(fake_llm(), ("prompt",), {})
+    assert key != cache.key_for(fake_llm(temperature=0), ("prompt",), {})
+    assert key != cache.key_for(fake_llm(), ("other",), {})
+    assert key != cache.key_for(fake_llm(), ("prompt",), {"system_prompt": "be brief"})
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test that a new cache over the same directory answers from disk."""
+    ResponseCache(root=str(tmp_path), ttls={"architecture": 60}).put("ab" * 32, "cached answer")
+
+    restarted = ResponseCache(root=str(tmp_path), ttls={"architecture": 60})
+
+    assert restarted.get("architecture", "ab" * 32) == "cached answer"
+    assert restarted.stats()["memory_items"] == 1
+
+
+def test_ttl_is_per_agent(tmp_path, monkeypatch):
+    """Test that a response expires after the asking agent's TTL."""
+    cache = ResponseCache(root=str(tmp_path), ttls={"architecture": 60, "terraform": 1})
+    cache.put("cd" * 32, "answer")
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 30)
+
+    assert cache.get("architecture", "cd" * 32) == "answer"
+    assert cache.get("terraform", "cd" * 32) is None
+    assert cache.get("interpreter", "cd" * 32) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_expired_disk_entries_are_deleted(tmp_path, monkeypatch):
+    """Test that an entry past every agent's TTL is removed instead of loaded into memory."""
+    import os
+
+    ResponseCache(root=str(tmp_path), ttls={"architecture": 60, "terraform": 1}).put("ef" * 32, "answer")
+    cache = ResponseCache(root=str(tmp_path), ttls={"architecture": 60, "terraform": 1})
+    now = llm_cache.time.time()
+
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 30)
+    assert cache.get("terraform", "ef" * 32) is None
+    # Still valid for another agent, so it stays on disk but is not loaded
+    assert os.path.exists(cache.path_for("ef" * 32))
+    assert cache.stats()["memory_items"] == 0
+
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+    assert cache.get("architecture", "ef" * 32) is None
+    assert not os.path.exists(cache.path_for("ef" * 32))
+    assert cache.stats()["memory_items"] == 0
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    """Test that the least recently used entries are removed once the disk limit is passed."""
+    import os
+
+    cache = ResponseCache(root=str(tmp_path), ttls={"architecture": 60}, max_bytes=200)
+    cache.put("01" * 32, "a" * 40)
+    cache.put("02" * 32, "b" * 40)
+    os.utime(cache.path_for("01" * 32), (1, 1))
+    cache.put("03" * 32, "c" * 40)
+
+    assert not os.path.exists(cache.path_for("01" * 32))
+    assert cache.get("architecture", "01" * 32) is None
+    assert cache.get("architecture", "02" * 32) == "b" * 40
+    assert cache.stats()["disk_bytes"] <= 200
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    """Test that the least recently used responses leave memory first."""
+    cache = ResponseCache(root=str(tmp_path), memory_bytes=10, ttls={})
+    cache.put("01" * 32, "aaaa")
+    cache.put("02" * 32, "bbbb")
+    cache.put("03" * 32, "cccc")
+
+    assert cache.stats()["memory_items"] == 2
+    assert cache.stats()["memory_bytes"] == 8
+
+
+def test_cached_completion(tmp_path, monkeypatch):
+    """Test that repeated prompts skip the LLM, refreshes call it again, and other agents are not cached."""
+    from src.metrics import LLM_CACHE_LOOKUPS
+
+    cache = ResponseCache(root=str(tmp_path), ttls={"architecture": 60})
+    monkeypatch.setattr(llm_cache, "response_cache", cache)
+    llm = fake_llm()
+    hits = LLM_CACHE_LOOKUPS.value(agent="architecture", result="hit")
+
+    first = cached_completion("architecture", llm, "prompt")
+    again = cached_completion("architecture", llm, "prompt")
+    assert (first.text, again.text, llm.calls) == ("resource {} #1", "resource {} #1", 1)
+    assert again.raw == {"cached": True}
+    assert LLM_CACHE_LOOKUPS.value(agent="architecture", result="hit") == hits + 1
+
+    assert cached_completion("architecture", llm, "prompt", refresh=True).text == "resource {} #2"
+    assert cached_completion("architecture", llm, "prompt").text == "resource {} #2"
+
+    cached_completion("file_system", llm, "prompt")
+    cached_completion("file_system", llm, "prompt")
+    assert llm.calls == 4
+
+
+def test_cached_stream_chat(tmp_path, monkeypatch):
+    """Test that a streamed answer is yielded as it arrives and replayed whole from the cache."""
+    cache = ResponseCache(root=str(tmp_path), ttls={"architecture": 60})
+    monkeypatch.setattr(llm_cache, "response_cache", cache)
+    llm = fake_llm()
+
+    async def astream_chat(messages, **kwargs):
+        llm.calls += 1
+
+        async def responses():
+            for delta in ("Use ", None, "S3."):
+                yield SimpleNamespace(delta=delta, raw={})
+
+        return responses()
+
+    llm.astream_chat = astream_chat
+    messages = [ChatMessage(role="user", content="Host a static site")]
+
+    async def collect():
+        return [text async for text in cached_stream_chat("architecture", llm, messages, max_tokens=10)]
+
+    assert asyncio.run(collect()) == ["Use ", "S3."]
+    assert asyncio.run(collect()) == ["Use S3."]
+    assert llm.calls == 1
+
+
+def test_rejected_plan_regenerates_code(tmp_path, monkeypatch):
+    """Test that generating again after a rejected plan asks the LLM instead of the cache."""
+    import subprocess
+
+    from src.agents import tf_generator_agent
+    from src.nodes import generate_terraform, plan_approval
+
+    cache = ResponseCache(root=str(tmp_path / "cache"), ttls={"tf_generator": 3600})
+    monkeypatch.setattr(llm_cache, "response_cache", cache)
+    monkeypatch.setattr(tf_generator_agent.subprocess, "run",
+                        lambda *args, **kwargs: subprocess.CompletedProcess(args, 1, "", ""))
+    llm = fake_llm()
+
+    def complete(prompt, **kwargs):
+        llm.calls += 1
+        return SimpleNamespace(text=f'resource "aws_s3_bucket" "cloudpilot_bucket_{llm.calls}" {{\n}}\n', raw={})
+
+    llm.complete = complete
+    generator = object.__new__(tf_generator_agent.TerraformGeneratorAgent)
+    generator.llm = llm
+    monkeypatch.setattr(generate_terraform, "TerraformGeneratorAgent", lambda: generator)
+    monkeypatch.setattr(generate_terraform, "InterpreterAgent", lambda: None)
+    monkeypatch.setattr(generate_terraform, "resolve_workspace", lambda config: str(tmp_path))
+
+    def no_terraform(output_dir):
+        raise RuntimeError("terraform is not run here")
+
+    monkeypatch.setattr(generate_terraform, "ensure_init", no_terraform)
+    main_tf = tmp_path / "main.tf"
+    state = {"messages": [SimpleNamespace(content="An S3 bucket")]}
+
+    state = generate_terraform.generate_terraform(state)
+    state = generate_terraform.generate_terraform(state)
+    assert llm.calls == 1
+
+    monkeypatch.setattr(plan_approval, "interrupt", lambda value: {"approved": False})
+    command = plan_approval.plan_approval({"result": "", "terraform_json": None})
+    assert command.goto == "generate_terraform"
+    state = generate_terraform.generate_terraform({**state, **command.update})
+
+    assert llm.calls == 2
+    assert "cloudpilot_bucket_2" in main_tf.read_text()
+    assert state["plan_rejected"] is False
+
+
+def test_rejected_responses_are_not_cached(tmp_path, monkeypatch):
+    """Test that a response failing the accept check is asked for again next time."""
+    cache = ResponseCache(root=str(tmp_path), ttls={"tf_generator_vars": 60})
+    monkeypatch.setattr(llm_cache, "response_cache", cache)
+    llm = fake_llm(text="not json")
+
+    cached_completion("tf_generator_vars", llm, "prompt", accept=lambda text: text.startswith("{"))
+    cached_completion("tf_generator_vars", llm, "prompt", accept=lambda text: text.startswith("{"))
+
+    assert llm.calls == 2
+    assert cache.stats()["memory_items"] == 0
@@ -0,0 +1,27 @@
+"""Tests for the shared LLM client registry."""
+
+from src.llm_clients import LLMClientRegistry, llm_clients
+
+
+def test_same_settings_share_a_client():
+    """Test that clients are created once per model and settings."""
+    registry = LLMClientRegistry()
+
+    first = registry.get("claude-test", max_tokens=4096, temperature=0.7)
+    again = registry.get("claude-test", temperature=0.7, max_tokens=4096)
+    other = registry.get("claude-test")
+
+    assert first is again
+    assert other is not first
+    assert registry.stats() == {"clients": 2}
+
+
+def test_agents_reuse_the_shared_client():
+    """Test that agents made per node call keep the same client and its connections."""
+    from src.agents.interpreter_agent import InterpreterAgent
+    from src.agents.tf_generator_agent import TerraformGeneratorAgent
+
+    assert InterpreterAgent().llm is InterpreterAgent().llm
+    assert TerraformGeneratorAgent().llm is TerraformGeneratorAgent().llm
+    assert TerraformGeneratorAgent().llm is not InterpreterAgent().llm
+    assert InterpreterAgent().llm is llm_clients.get()
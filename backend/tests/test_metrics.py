@@ -0,0 +1,123 @@
+"""Tests for the Prometheus metrics."""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.metrics import Counter, Histogram, MetricsRegistry, timed_completion, timed_node, timed_stream
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that observations are counted into every bucket they fit."""
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("node_seconds", "Node time.", ["node"], buckets=(1, 5)))
+
+    histogram.observe(0.5, node="terraform_plan")
+    histogram.observe(3, node="terraform_plan")
+
+    assert registry.render().splitlines() == [
+        "# HELP node_seconds Node time.",
+        "# TYPE node_seconds histogram",
+        'node_seconds_bucket{node="terraform_plan",le="1"} 1',
+        'node_seconds_bucket{node="terraform_plan",le="5"} 2',
+        'node_seconds_bucket{node="terraform_plan",le="+Inf"} 2',
+        'node_seconds_sum{node="terraform_plan"} 3.5',
+        'node_seconds_count{node="terraform_plan"} 2',
+    ]
+
+
+def test_counter_escapes_label_values():
+    """Test that label values are escaped in the output."""
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("errors_total", "Errors.", ["agent"]))
+
+    counter.inc(agent='say "hi"')
+
+    assert 'errors_total{agent="say \\"hi\\""} 1' in registry.render()
+
+
+def test_timed_node_records_sync_and_async_nodes():
+    """Test that wrapped nodes are timed and get the config only if they take it."""
+    from src.metrics import NODE_DURATION
+
+    def plain(state):
+        return {"result": state["task"]}
+
+    async def with_config(state, config=None):
+        return {"result": config["configurable"]["flow_id"]}
+
+    before = NODE_DURATION.count(node="test_plain"), NODE_DURATION.count(node="test_async")
+
+    assert timed_node("test_plain", plain)({"task": "bucket"}, {}) == {"result": "bucket"}
+    config = {"configurable": {"flow_id": "flow-1"}}
+    assert asyncio.run(timed_node("test_async", with_config)({}, config)) == {"result": "flow-1"}
+
+    assert NODE_DURATION.count(node="test_plain") == before[0] + 1
+    assert NODE_DURATION.count(node="test_async") == before[1] + 1
+
+
+def test_timed_completion_counts_tokens():
+    """Test that LLM latency and Anthropic-style token usage are recorded."""
+    from src.metrics import LLM_DURATION, LLM_TOKENS
+
+    response = SimpleNamespace(text="ok", raw={"usage": SimpleNamespace(input_tokens=12, output_tokens=5)})
+    llm = SimpleNamespace(complete=lambda prompt: response)
+    before = LLM_TOKENS.value(agent="test", direction="input")
+
+    assert timed_completion("test", llm, "prompt") is response
+
+    assert LLM_TOKENS.value(agent="test", direction="input") == before + 12
+    assert LLM_TOKENS.value(agent="test", direction="output") >= 5
+    assert LLM_DURATION.count(agent="test") >= 1
+
+
+def test_timed_stream_records_first_text_and_tokens():
+    """Test that streamed completions record time to first text and the token usage of their events."""
+    from src.metrics import LLM_FIRST_TOKEN, LLM_TOKENS
+
+    events = [
+        SimpleNamespace(delta=None, raw={"usage": {"input_tokens": 7}}),
+        SimpleNamespace(delta="Use ", raw={}),
+        SimpleNamespace(delta="S3.", raw={"usage": {"output_tokens": 3}}),
+    ]
+
+    async def astream_chat(messages):
+        async def responses():
+            for event in events:
+                yield event
+
+        return responses()
+
+    async def collect():
+        return [text async for text in timed_stream("stream_test", SimpleNamespace(astream_chat=astream_chat), [])]
+
+    assert asyncio.run(collect()) == ["Use ", "S3."]
+    assert LLM_FIRST_TOKEN.count(agent="stream_test") == 1
+    assert LLM_TOKENS.value(agent="stream_test", direction="input") == 7
+    assert LLM_TOKENS.value(agent="stream_test", direction="output") == 3
+
+
+def test_metrics_endpoint():
+    """Test that /metrics serves the text format with scheduler and flow gauges."""
+    from fastapi.testclient import TestClient
+
+    from src import api
+
+    response = TestClient(api.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'cloudpilot_scheduler_queued_jobs{pool="plan"} 0' in response.text
+    assert "# TYPE cloudpilot_node_duration_seconds histogram" in response.text
+
+
+def test_timed_node_keeps_schema_hints():
+    """Test that LangGraph still sees the node's state type and Command targets."""
+    import typing
+
+    from src.nodes.plan_approval import plan_approval
+    from src.state import CloudPilotState
+
+    hints = typing.get_type_hints(timed_node("plan_approval", plan_approval))
+
+    assert hints["state"] is CloudPilotState
+    assert hints["return"] == typing.get_type_hints(plan_approval)["return"]
@@ -0,0 +1,95 @@
+"""Tests for the content-addressed plan cache."""
+
+import json
+import os
+
+import pytest
+
+from src.terraform.plan_cache import PlanCache
+from src.terraform.plan_files import PLAN_FILE, plan_digest
+
+MAIN_TF = 'resource "aws_s3_bucket" "b" {\n  bucket = "b"\n}\n'
+
+
+def _workspace(path, main_tf=MAIN_TF):
+    path.mkdir()
+    (path / "main.tf").write_text(main_tf)
+    return path
+
+
+def _planned(path, plan=b"plan"):
+    (path / PLAN_FILE).write_bytes(plan)
+    (path / "plan.json").write_text(json.dumps({"resource_changes": []}))
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a plan cache in a temporary directory."""
+    return PlanCache(root=str(tmp_path / "cache"), max_bytes=10 ** 6)
+
+
+def test_lookup_miss(cache, tmp_path):
+    """Test that an unknown configuration is a miss."""
+    workspace = _workspace(tmp_path / "a")
+
+    assert cache.lookup(str(workspace)) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_hit_restores_plan_in_other_workspace(cache, tmp_path):
+    """Test that an identical configuration reuses the saved plan."""
+    first = _planned(_workspace(tmp_path / "a"))
+    cache.store(str(first), "Plan: 1 to add")
+    second = _workspace(tmp_path / "b")
+
+    cached = cache.lookup(str(second))
+
+    assert cached.summary == "Plan: 1 to add"
+    assert json.loads(cached.plan_json) == {"resource_changes": []}
+    assert (second / PLAN_FILE).read_bytes() == b"plan"
+    plan_result, show_result = cached.results()
+    assert plan_result.returncode == 0
+    assert show_result.stdout == cached.plan_json
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_covers_variables_and_state(cache, tmp_path):
+    """Test that variables and the state serial change the key."""
+    workspace = _workspace(tmp_path / "a")
+    key = cache.key_for(str(workspace))
+
+    (workspace / "terraform.tfvars").write_text('region = "us-east-1"\n')
+    with_vars = cache.key_for(str(workspace))
+    (workspace / "terraform.tfstate").write_text(json.dumps({"lineage": "l", "serial": 3}))
+    with_state = cache.key_for(str(workspace))
+
+    assert len({key, with_vars, with_state}) == 3
+
+
+
+def test_key_is_the_plan_input_digest(cache, tmp_path):
+    """Test that the key is the plan files' digest of the inputs, whatever plan is saved."""
+    workspace = _workspace(tmp_path / "a")
+    key = cache.key_for(str(workspace))
+
+    _planned(workspace)
+
+    assert cache.key_for(str(workspace)) == key == plan_digest(str(workspace), include_plan=False)
+    assert plan_digest(str(workspace)) != key
+
+
+def test_eviction_keeps_cache_bounded(tmp_path):
+    """Test that least recently used entries are evicted past the size limit."""
+    cache = PlanCache(root=str(tmp_path / "cache"), max_bytes=2500)
+    workspaces = []
+    for index in range(3):
+        workspace = _planned(_workspace(tmp_path / f"w{index}", MAIN_TF + f"# {index}\n"), b"x" * 1000)
+        cache.store(str(workspace), "")
+        os.utime(os.path.join(cache.root, cache.key_for(str(workspace))), (index, index))
+        workspaces.append(workspace)
+
+    cache.store(str(workspaces[2]), "")
+
+    assert cache.stats()["bytes"] <= 2500
+    assert cache.lookup(str(workspaces[0])) is None
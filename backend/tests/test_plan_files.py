@@ -0,0 +1,60 @@
+"""Tests for saved plan tracking."""
+
+import json
+
+import pytest
+
+from src.terraform.plan_files import (
+    PLAN_FILE,
+    discard_plan,
+    is_plan_stale,
+    record_plan,
+)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """Create a workspace with a configuration and a recorded saved plan."""
+    (tmp_path / "main.tf").write_text('resource "aws_s3_bucket" "b" {\n  bucket = "b"\n}\n')
+    (tmp_path / PLAN_FILE).write_bytes(b"plan")
+    record_plan(str(tmp_path))
+    return tmp_path
+
+
+def test_missing_plan_is_stale(tmp_path):
+    """Test that a workspace without a saved plan needs a plan."""
+    assert is_plan_stale(str(tmp_path))
+
+
+def test_recorded_plan_is_fresh(workspace):
+    """Test that an untouched saved plan can be applied."""
+    assert not is_plan_stale(str(workspace))
+
+
+def test_config_change_makes_plan_stale(workspace):
+    """Test that editing the configuration invalidates the plan."""
+    (workspace / "main.tf").write_text('resource "aws_s3_bucket" "b" {\n  bucket = "c"\n}\n')
+
+    assert is_plan_stale(str(workspace))
+
+
+def test_tfvars_change_makes_plan_stale(workspace):
+    """Test that adding variable values invalidates the plan."""
+    (workspace / "terraform.tfvars").write_text('region = "us-east-1"\n')
+
+    assert is_plan_stale(str(workspace))
+
+
+def test_state_change_makes_plan_stale(workspace):
+    """Test that a new state serial invalidates the plan."""
+    (workspace / "terraform.tfstate").write_text(json.dumps({"lineage": "l", "serial": 2}))
+
+    assert is_plan_stale(str(workspace))
+
+
+def test_discard_plan(workspace):
+    """Test that an applied plan is removed."""
+    discard_plan(str(workspace))
+
+    assert not (workspace / PLAN_FILE).exists()
+    assert is_plan_stale(str(workspace))
@@ -0,0 +1,99 @@
+"""Tests for the compact plan summary."""
+
+from src.terraform.plan_summary import change_action, format_plan_summary, summarize_plan, summarize_state
+
+
+def _change(address, actions):
+    return {
+        "address": address,
+        "type": address.split(".")[0],
+        "change": {"actions": actions, "before": None, "after": {"bucket": "x" * 1000}},
+    }
+
+
+PLAN = {
+    "format_version": "1.2",
+    "terraform_version": "1.7.0",
+    "complete": True,
+    "errored": False,
+    "planned_values": {"root_module": {"resources": [{"values": {"bucket": "x" * 1000}}]}},
+    "configuration": {"root_module": {}},
+    "resource_changes": [
+        _change("aws_s3_bucket.a", ["create"]),
+        _change("aws_s3_bucket.b", ["update"]),
+        _change("aws_s3_bucket.c", ["delete", "create"]),
+        _change("aws_s3_bucket.d", ["delete"]),
+        _change("aws_s3_bucket.e", ["no-op"]),
+    ],
+}
+
+
+def test_change_action():
+    """Test that plan actions reduce to a single action."""
+    assert change_action(["create"]) == "create"
+    assert change_action(["create", "delete"]) == "replace"
+    assert change_action(["delete", "create"]) == "replace"
+    assert change_action([]) == "no-op"
+
+
+def test_summarize_plan_records_and_counts():
+    """Test that changes become compact records with per-action counts."""
+    summary = summarize_plan(PLAN, "/tmp/plan.json")
+
+    assert summary["summary"] == {"create": 1, "update": 1, "delete": 1, "replace": 1}
+    assert summary["resource_changes"][2] == {
+        "address": "aws_s3_bucket.c",
+        "type": "aws_s3_bucket",
+        "action": "replace",
+        "change": {"actions": ["delete", "create"]},
+    }
+    assert len(summary["resource_changes"]) == 4
+    assert summary["terraform_version"] == "1.7.0"
+    assert summary["plan_json_path"] == "/tmp/plan.json"
+    assert "planned_values" not in summary
+    assert len(str(summary)) < len(str(PLAN)) / 4
+
+
+def test_format_plan_summary():
+    """Test the text rendering of a summary."""
+    text = format_plan_summary(summarize_plan(PLAN))
+
+    assert "create: aws_s3_bucket.a" in text
+    assert text.endswith("Plan: 1 to add, 1 to change, 1 to destroy, 1 to replace.")
+
+
+def test_format_plan_summary_elides_long_lists():
+    """Test that very large plans list only the first resources."""
+    plan = {"resource_changes": [_change(f"aws_s3_bucket.b{i}", ["create"]) for i in range(120)]}
+
+    text = format_plan_summary(summarize_plan(plan))
+
+    assert "... and 70 more" in text
+    assert len(text.splitlines()) == 52
+
+
+def test_summarize_state():
+    """Test that show output is reduced to managed resources."""
+    show_data = {
+        "format_version": "1.0",
+        "values": {
+            "root_module": {
+                "resources": [
+                    {"address": "aws_s3_bucket.a", "type": "aws_s3_bucket", "mode": "managed", "values": {}},
+                    {"address": "data.aws_region.r", "type": "aws_region", "mode": "data", "values": {}},
+                ],
+                "child_modules": [
+                    {"resources": [{"address": "module.m.aws_sqs_queue.q", "type": "aws_sqs_queue", "mode": "managed"}]},
+                ],
+            }
+        },
+    }
+
+    summary = summarize_state(show_data)
+
+    assert summary["resources"] == [
+        {"address": "aws_s3_bucket.a", "type": "aws_s3_bucket"},
+        {"address": "module.m.aws_sqs_queue.q", "type": "aws_sqs_queue"},
+    ]
+    assert summary["resource_count"] == 2
+    assert summary["format_version"] == "1.0"
@@ -0,0 +1,60 @@
+"""Tests for the delta encoding of progress events."""
+
+from src.progress_delta import ProgressEncoder
+
+
+def test_first_update_is_sent_whole():
+    """Test that nothing is dropped before the client has seen the flow."""
+    encoder = ProgressEncoder()
+
+    delta, blobs = encoder.encode("flow-1", {"terraform_plan": {"result": "plan", "error": ""}})
+
+    assert delta == {"terraform_plan": {"result": "plan", "error": ""}}
+    assert blobs == {}
+
+
+def test_unchanged_keys_are_dropped():
+    """Test that later updates carry only the keys that changed."""
+    encoder = ProgressEncoder()
+    encoder.encode("flow-1", {"terraform_plan": {"task": "bucket", "result": "plan"}})
+
+    # A copy with the same content counts as unchanged too
+    delta, _ = encoder.encode("flow-1", {"execute_terraform": {"task": "".join(["buck", "et"]), "result": "applied"}})
+
+    assert delta == {"execute_terraform": {"result": "applied"}}
+
+
+def test_flows_are_encoded_separately():
+    """Test that one flow's state does not hide another's."""
+    encoder = ProgressEncoder()
+    encoder.encode("flow-1", {"terraform_plan": {"task": "bucket"}})
+
+    delta, _ = encoder.encode("flow-2", {"terraform_plan": {"task": "bucket"}})
+
+    assert delta == {"terraform_plan": {"task": "bucket"}}
+
+
+def test_large_values_are_sent_once_as_blobs():
+    """Test that large values cross the connection once and are referenced after."""
+    encoder = ProgressEncoder(blob_min_bytes=16)
+    code = "resource \"aws_s3_bucket\" \"b\" {}"
+
+    delta, blobs = encoder.encode("flow-1", {"generate_terraform": {"terraform_code": code}})
+    ref = delta["generate_terraform"]["terraform_code"]["$ref"]
+    assert blobs == {ref: code}
+
+    # Another flow with the same code only gets the reference
+    delta, blobs = encoder.encode("flow-2", {"generate_terraform": {"terraform_code": code}})
+    assert delta == {"generate_terraform": {"terraform_code": {"$ref": ref}}}
+    assert blobs == {}
+
+
+def test_forget_resends_state():
+    """Test that a forgotten flow starts over with its whole state."""
+    encoder = ProgressEncoder()
+    encoder.encode("flow-1", {"terraform_plan": {"task": "bucket"}})
+
+    encoder.forget("flow-1")
+    delta, _ = encoder.encode("flow-1", {"terraform_plan": {"task": "bucket"}})
+
+    assert delta == {"terraform_plan": {"task": "bucket"}}
@@ -0,0 +1,162 @@
+"""Tests for the error-guided repair of generated Terraform."""
+
+from types import SimpleNamespace
+
+from src.terraform.repair import (
+    CodeRepairer, TokenBudget, error_lines, output_problems, split_blocks, syntax_problems,
+)
+
+VALID = '''terraform {
+  required_providers {
+    aws = { source = "hashicorp/aws" }
+  }
+}
+
+resource "aws_s3_bucket" "cloudpilot_bucket" {
+  bucket = "cloudpilot-${var.name}"
+  policy = <<EOF
+{ "unbalanced": [
+EOF
+}
+'''
+
+TRUNCATED = VALID + '''
+resource "aws_s3_bucket_versioning" "cloudpilot_versioning" {
+  bucket = aws_s3_bucket.cloudpilot_bucket.id
+  versioning_configuration {
+    status = "Enabled"
+'''
+
+FIXED_BLOCK = '''resource "aws_s3_bucket_versioning" "cloudpilot_versioning" {
+  bucket = aws_s3_bucket.cloudpilot_bucket.id
+  versioning_configuration {
+    status = "Enabled"
+  }
+}'''
+
+
+def fake_llm(*replies, tokens=100):
+    """Return a stand-in LLM that answers with the replies in turn and records the prompts."""
+    llm = SimpleNamespace(prompts=[])
+
+    def complete(prompt, **kwargs):
+        llm.prompts.append(prompt)
+        usage = {"input_tokens": tokens // 2, "output_tokens": tokens // 2}
+        return SimpleNamespace(text=replies[len(llm.prompts) - 1], raw={"usage": usage})
+
+    llm.complete = complete
+    return llm
+
+
+def test_blocks_ignore_braces_in_strings_and_heredocs():
+    """Test that top-level blocks are found by their braces, skipping strings and heredocs."""
+    blocks = split_blocks(VALID)
+
+    assert [(block.start, block.end) for block in blocks] == [(1, 5), (7, 12)]
+    assert blocks[1].header.startswith('resource "aws_s3_bucket"')
+    assert syntax_problems(VALID) == []
+
+
+def test_quotes_inside_interpolations_do_not_end_strings():
+    """Test that braces in strings nested inside ${...} are not counted."""
+    code = 'locals {\n  names = "${join("}", var.x)}"\n  ids = "%{ for i in ["a"] }${i}%{ endfor }"\n}\n'
+
+    assert syntax_problems(code) == []
+    assert [(block.start, block.end) for block in split_blocks(code)] == [(1, 4)]
+
+
+def test_comments_between_blocks_and_misplaced_braces():
+    """Test that comments between blocks pass and misplaced braces and stray text are found."""
+    commented = "# Provider\n" + VALID.replace("}\n\nresource", "}\n\n  // Bucket\nresource")
+    # A block that closes early and reopens on an indented line
+    reopened = 'resource "a" "b" {\n  x = 1 }\n  y = {\n}\n'
+
+    assert syntax_problems(commented) == []
+    assert syntax_problems(reopened) == [(3, "Not a Terraform block: 'y = {'")]
+    assert syntax_problems(VALID.replace("\n}\n\nresource", "\n}\n  stray\nresource")) == [
+        (6, "Not a Terraform block: 'stray'"),
+    ]
+
+
+def test_syntax_problems_point_at_failing_blocks():
+    """Test that truncated blocks, prose and fences are reported on their lines."""
+    assert syntax_problems(TRUNCATED) == [
+        (14, "Block 'resource \"aws_s3_bucket_versioning\" \"cloudpilot_versioning\" {' is not closed"),
+    ]
+    assert [line for line, _ in syntax_problems("Here is the code:\n```hcl\n" + VALID)] == [1, 2]
+    assert syntax_problems(VALID + "}\n")[0] == (13, "Unexpected closing brace")
+
+
+def test_error_lines_are_read_from_terraform_output():
+    """Test that plan errors are mapped to the lines of main.tf they point at."""
+    output = (
+        "╷\n│ Error: Unsupported argument\n│\n│   on main.tf line 8, in resource \"aws_s3_bucket\" \"b\":\n"
+        "│    8:   bucket_name = \"x\"\n╵\n│   on modules/main.tf line 3:\n│   on other.tf line 4:\n"
+    )
+
+    assert error_lines(output) == [3, 8]
+    assert output_problems(output)[0][1].startswith("Error: Unsupported argument")
+    assert output_problems("Error: No valid credential sources found") == [
+        (0, "Error: No valid credential sources found")
+    ]
+
+
+def test_repair_sends_only_the_failing_block():
+    """Test that a truncated block is completed without regenerating the rest of the file."""
+    llm = fake_llm("```hcl\n" + FIXED_BLOCK + "\n```")
+    repairer = CodeRepairer("test", llm, budget=TokenBudget(limit=1000))
+
+    code, problems = repairer.fix(TRUNCATED, syntax_problems)
+
+    assert problems == []
+    assert code == VALID + "\n" + FIXED_BLOCK
+    [prompt] = llm.prompts
+    assert "is not closed" in prompt
+    assert 'status = "Enabled"' in prompt
+    # Other blocks are only named, not sent
+    assert "required_providers" not in prompt and "terraform {" in prompt
+    assert repairer.spent == 100
+
+
+def test_budget_stops_repairs_for_the_flow():
+    """Test that a flow that spent its budget gets no more repair calls."""
+    from src.metrics import TERRAFORM_REPAIRS
+
+    budget = TokenBudget(limit=100)
+    llm = fake_llm(TRUNCATED.split("\n\n")[-1], FIXED_BLOCK)
+    repairer = CodeRepairer("budget_test", llm, flow_id="flow-1", budget=budget)
+
+    code, problems = repairer.fix(TRUNCATED, syntax_problems)
+
+    assert code == TRUNCATED.rstrip("\n")
+    assert problems and len(llm.prompts) == 1
+    assert budget.spent("flow-1") == 100
+    assert TERRAFORM_REPAIRS.value(agent="budget_test", result="failed") == 0
+    assert TERRAFORM_REPAIRS.value(agent="budget_test", result="budget") == 1
+
+    budget.discard("flow-1")
+    assert budget.stats() == {"flows": 0, "tokens": 0}
+
+
+def test_generator_repairs_instead_of_regenerating(monkeypatch):
+    """Test that generate_code patches a truncated response with one repair call."""
+    import subprocess
+
+    from src import llm_cache
+    from src.agents import tf_generator_agent
+    from src.llm_cache import ResponseCache
+    from src.terraform import repair
+
+    llm = fake_llm(TRUNCATED, FIXED_BLOCK)
+    monkeypatch.setattr(llm_cache, "response_cache", ResponseCache(ttls={}))
+    monkeypatch.setattr(repair, "token_budget", TokenBudget(limit=1000))
+    monkeypatch.setattr(tf_generator_agent.subprocess, "run",
+                        lambda *args, **kwargs: subprocess.CompletedProcess(args, 1, "", ""))
+    generator = tf_generator_agent.TerraformGeneratorAgent()
+    generator.llm = llm
+
+    code = generator.generate_code("An S3 bucket with versioning", flow_id="flow-1")
+
+    assert code == VALID + "\n" + FIXED_BLOCK
+    assert len(llm.prompts) == 2
+    assert repair.token_budget.spent("flow-1") == 200
@@ -0,0 +1,169 @@
+"""Tests for admission control of LLM and Terraform jobs."""
+
+import asyncio
+
+import pytest
+
+from src.scheduler import POOL_APPLY, POOL_PLAN, AdmissionRejected, Scheduler
+
+
+def test_pool_caps_running_jobs():
+    """Test that no more jobs run at once than a pool has slots."""
+    scheduler = Scheduler({POOL_PLAN: 2})
+    running = []
+    peak = []
+
+    async def job(owner):
+        async with scheduler.slot(POOL_PLAN, owner):
+            running.append(owner)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(owner)
+
+    async def run():
+        await asyncio.gather(*(job(f"client-{i}") for i in range(6)))
+
+    asyncio.run(run())
+
+    assert max(peak) == 2
+    assert len(peak) == 6
+    assert scheduler.stats()[POOL_PLAN] == {"running": 0, "queued": 0, "capacity": 2}
+
+
+def test_pools_are_separate():
+    """Test that a full plan pool does not hold up applies."""
+    scheduler = Scheduler({POOL_PLAN: 1, POOL_APPLY: 1})
+    order = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def plan():
+            async with scheduler.slot(POOL_PLAN, "a"):
+                await release.wait()
+                order.append("plan")
+
+        async def apply():
+            async with scheduler.slot(POOL_APPLY, "b"):
+                order.append("apply")
+            release.set()
+
+        await asyncio.gather(plan(), apply())
+
+    asyncio.run(run())
+
+    assert order == ["apply", "plan"]
+
+
+def test_waiting_jobs_are_admitted_round_robin():
+    """Test that one client's queued jobs do not starve another's."""
+    scheduler = Scheduler({POOL_PLAN: 1})
+    order = []
+
+    async def job(owner, name):
+        async with scheduler.slot(POOL_PLAN, owner):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def blocker():
+            async with scheduler.slot(POOL_PLAN, "busy"):
+                await gate.wait()
+
+        blocking = asyncio.create_task(blocker())
+        await asyncio.sleep(0)
+        jobs = [asyncio.create_task(job("a", name)) for name in ("a1", "a2", "a3")]
+        jobs.append(asyncio.create_task(job("b", "b1")))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocking, *jobs)
+
+    asyncio.run(run())
+
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_queued_jobs_are_told_their_position():
+    """Test that waiting jobs get queued events as the line moves."""
+    scheduler = Scheduler({POOL_APPLY: 1})
+    events = []
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def blocker():
+            async with scheduler.slot(POOL_APPLY, "a"):
+                await gate.wait()
+
+        async def waiter(owner):
+            async with scheduler.slot(POOL_APPLY, owner, lambda event: events.append((owner, event))):
+                await asyncio.sleep(0)
+
+        blocking = asyncio.create_task(blocker())
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(waiter("b")), asyncio.create_task(waiter("c"))]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocking, *waiting)
+
+    asyncio.run(run())
+
+    assert events == [
+        ("b", {"type": "queued", "pool": "apply", "position": 1}),
+        ("c", {"type": "queued", "pool": "apply", "position": 2}),
+        ("c", {"type": "queued", "pool": "apply", "position": 1}),
+    ]
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    """Test that a cancelled job gives up its place and no slot leaks."""
+    scheduler = Scheduler({POOL_PLAN: 1})
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def blocker():
+            async with scheduler.slot(POOL_PLAN, "a"):
+                await gate.wait()
+
+        async def waiter():
+            async with scheduler.slot(POOL_PLAN, "b"):
+                pass
+
+        blocking = asyncio.create_task(blocker())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.stats()[POOL_PLAN]["queued"] == 0
+        gate.set()
+        await blocking
+
+    asyncio.run(run())
+
+    assert scheduler.stats()[POOL_PLAN]["running"] == 0
+
+
+def test_full_queue_rejects_jobs():
+    """Test that jobs past the queue limit are turned away."""
+    scheduler = Scheduler({POOL_PLAN: 1}, max_queued=1)
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def job():
+            async with scheduler.slot(POOL_PLAN, "a"):
+                await gate.wait()
+
+        tasks = [asyncio.create_task(job()), asyncio.create_task(job())]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            async with scheduler.slot(POOL_PLAN, "b"):
+                pass
+        gate.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+"""Tests for building document sections from streamed markdown."""
+
+from src.section_stream import SectionStream
+
+
+def replay(changes):
+    """Build the sections a client would from a list of changes."""
+    sections = []
+    for change in changes:
+        change = dict(change)
+        index, append = change.pop("index"), change.pop("append", None)
+        if append is not None:
+            sections[index] = {**sections[index], "content": sections[index]["content"] + append}
+        elif index == len(sections):
+            sections.append(change)
+        else:
+            sections[index] = change
+    return sections
+
+
+def test_headings_split_text_sections():
+    """Test that markdown headings start new sections and text accumulates between them."""
+    stream = SectionStream()
+    text = "# Overview\nUse S3.\n\n## Costs\nAbout $5 a month.\n"
+
+    changes = stream.feed(text) + stream.finish()
+
+    assert stream.document() == [
+        {"type": "heading", "content": "Overview", "metadata": {"level": 1}},
+        {"type": "text", "content": "Use S3."},
+        {"type": "heading", "content": "Costs", "metadata": {"level": 2}},
+        {"type": "text", "content": "About $5 a month."},
+    ]
+    assert replay(changes) == stream.sections
+
+
+def test_chunks_of_any_size_build_the_same_sections():
+    """Test that splitting the text at arbitrary points gives the same document."""
+    text = "Intro text\n## Design\nA VPC with\ntwo subnets.\n```hcl\n# not a heading\n```\n### Cost\n$10"
+    whole = SectionStream()
+    whole.feed(text)
+    whole.finish()
+
+    stream = SectionStream()
+    changes = []
+    for i in range(0, len(text), 3):
+        changes += stream.feed(text[i:i + 3])
+    changes += stream.finish()
+
+    assert stream.sections == whole.sections
+    assert replay(changes) == stream.sections
+    assert [section["type"] for section in stream.document()] == ["text", "heading", "text", "heading", "text"]
+    assert "# not a heading" in stream.document()[2]["content"]
+
+
+def test_text_is_sent_before_the_line_ends():
+    """Test that only lines that may be headings are held back."""
+    stream = SectionStream([{"type": "heading", "content": "Title", "metadata": {"level": 1}}])
+
+    assert stream.feed("Start") == [{"index": 1, "type": "text", "content": "Start"}]
+    assert stream.feed("ing\n##") == [{"index": 1, "append": "ing\n"}]
+    assert stream.feed("#hashtag\n") == [{"index": 1, "append": "###hashtag\n"}]
@@ -87,6 +87,7 @@ def test_terraform_plan_no_file_path():
 def test_terraform_plan_success(mock_run, mock_state):
     """Test successful terraform plan execution."""
     mock_run.return_value = MagicMock(
+        returncode=0,
         stdout="Plan: 1 to add, 0 to change, 0 to destroy.",
         stderr=""
     )
@@ -109,11 +110,24 @@ def test_terraform_plan_init_failure(mock_run, mock_state):
     assert result["next_action"] == ACTION_USER_INTERACTION
 
 
+@patch('subprocess.run')
+def test_terraform_plan_init_is_non_interactive(mock_run, mock_state, tmp_path):
+    """Test that init runs through ensure_init, without prompting, and its failure is reported."""
+    mock_state["terraform_file_path"] = str(tmp_path / "main.tf")
+    mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="Provider not found")
+
+    result = terraform_plan(mock_state)
+
+    assert "-input=false" in mock_run.call_args_list[0].args[0]
+    assert result["error"] == "Terraform init failed: Provider not found"
+    assert result["next_action"] == ACTION_USER_INTERACTION
+
+
 @patch('subprocess.run')
 def test_terraform_plan_execution_failure(mock_run, mock_state):
     """Test terraform plan execution failure."""
     mock_run.side_effect = [
-        MagicMock(stdout="", stderr=""),  # init succeeds
+        MagicMock(returncode=0, stdout="", stderr=""),  # init succeeds
         Exception("Plan failed")  # plan fails
     ]
 
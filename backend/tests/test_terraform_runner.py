@@ -0,0 +1,113 @@
+"""Tests for the async Terraform runner."""
+
+import asyncio
+import sys
+
+import pytest
+
+from src.terraform.runner import TerraformRunner, TerraformTimeoutError
+
+
+@pytest.fixture
+def fake_terraform(tmp_path):
+    """Create a fake terraform executable driven by its arguments."""
+    script = tmp_path / "terraform"
+    script.write_text(f"""#!{sys.executable}
+import sys, time
+command = sys.argv[1]
+if command == "sleep":
+    time.sleep(float(sys.argv[2]))
+elif command == "lines":
+    for i in range(int(sys.argv[2])):
+        print("line", i, flush=True)
+    print("warning", file=sys.stderr)
+    sys.exit(0)
+elif command == "fail":
+    print("Error: invalid configuration", file=sys.stderr)
+    sys.exit(1)
+print("ran " + " ".join(sys.argv[1:]))
+""")
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_run_captures_output(fake_terraform, tmp_path):
+    """Test that stdout, exit code and duration are captured."""
+    runner = TerraformRunner(binary=fake_terraform)
+
+    result = asyncio.run(runner.run("plan", "-no-color", cwd=str(tmp_path)))
+
+    assert result.returncode == 0
+    assert result.stdout.strip() == "ran plan -no-color"
+    assert result.args == [fake_terraform, "plan", "-no-color"]
+    assert result.duration > 0
+
+
+def test_run_non_zero_exit(fake_terraform):
+    """Test that a failing command returns its stderr instead of raising."""
+    runner = TerraformRunner(binary=fake_terraform)
+
+    result = asyncio.run(runner.run("fail"))
+
+    assert result.returncode == 1
+    assert "invalid configuration" in result.stderr
+
+
+def test_run_timeout(fake_terraform):
+    """Test that a command exceeding its timeout is stopped."""
+    runner = TerraformRunner(binary=fake_terraform)
+
+    with pytest.raises(TerraformTimeoutError):
+        asyncio.run(runner.run("sleep", "5", timeout=0.2))
+
+
+def test_run_cancellation(fake_terraform):
+    """Test that cancelling a run stops the subprocess."""
+    runner = TerraformRunner(binary=fake_terraform)
+
+    async def cancel_run():
+        task = asyncio.create_task(runner.run("sleep", "5"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(asyncio.wait_for(cancel_run(), 5))
+
+
+def test_run_bounded_concurrency(fake_terraform):
+    """Test that no more than max_concurrency commands run at once."""
+    runner = TerraformRunner(binary=fake_terraform, max_concurrency=2)
+
+    async def run_many():
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(runner.run("sleep", "0.3") for _ in range(4)))
+        return asyncio.get_running_loop().time() - started
+
+    # Four 0.3s commands two at a time need at least two rounds
+    assert asyncio.run(run_many()) >= 0.6
+
+
+def test_stream_forwards_lines(fake_terraform):
+    """Test that each output line is handed over while the command runs."""
+    runner = TerraformRunner(binary=fake_terraform)
+    lines = []
+
+    result = asyncio.run(runner.stream("lines", "3", on_line=lambda stream, line: lines.append((stream, line))))
+
+    assert result.returncode == 0
+    assert [line for stream, line in lines if stream == "stdout"] == ["line 0", "line 1", "line 2"]
+    assert ("stderr", "warning") in lines
+    assert result.stdout == "line 0\nline 1\nline 2\n"
+    assert not result.truncated
+
+
+def test_stream_keeps_bounded_tail(fake_terraform):
+    """Test that only the last lines of a long output are kept."""
+    runner = TerraformRunner(binary=fake_terraform)
+
+    result = asyncio.run(runner.stream("lines", "1000", tail_lines=2))
+
+    assert result.stdout == "line 998\nline 999\n"
+    assert result.stderr == "warning\n"
+    assert result.truncated
@@ -0,0 +1,110 @@
+"""Tests for the per-flow trace spans."""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.metrics import timed_completion, timed_node
+from src.tracing import Tracer, tracer
+
+
+def test_spans_nest_and_are_exported_as_chrome_trace():
+    """Test that nested spans are recorded inside their parent's time range."""
+    local = Tracer()
+
+    with local.flow("flow-1"):
+        with local.span("terraform_plan", "node"):
+            with local.span("terraform plan", "terraform", status="ok"):
+                pass
+
+    trace = local.export("flow-1")
+    outer, inner = trace["traceEvents"]
+
+    assert trace["otherData"] == {"flow_id": "flow-1"}
+    assert (outer["name"], outer["cat"], outer["ph"]) == ("terraform_plan", "node", "X")
+    assert inner["args"] == {"status": "ok"}
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] + 1
+
+
+def test_spans_outside_a_flow_are_not_recorded():
+    """Test that spans without a current flow are dropped."""
+    local = Tracer()
+
+    with local.span("orphan", "node"):
+        pass
+
+    assert local.export("flow-1") is None
+
+
+def test_span_records_errors():
+    """Test that a span ended by an exception names the error."""
+    local = Tracer()
+
+    try:
+        with local.flow("flow-1"), local.span("terraform_apply", "node"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+
+    assert local.export("flow-1")["traceEvents"][0]["args"] == {"error": "ValueError"}
+
+
+def test_open_spans_are_exported_until_ended():
+    """Test that a span begun in one call shows as open until it is ended."""
+    local = Tracer()
+
+    local.begin("flow-1", "approval_wait")
+    [pending] = local.export("flow-1")["traceEvents"]
+    assert pending["args"] == {"open": True}
+
+    local.end("flow-1", "approval_wait")
+    [done] = local.export("flow-1")["traceEvents"]
+    assert done["name"] == "approval_wait" and done["args"] == {}
+
+    local.discard("flow-1")
+    assert local.export("flow-1") is None
+
+
+def test_buffer_keeps_latest_spans():
+    """Test that each flow keeps at most max_events spans."""
+    local = Tracer(max_events=2)
+
+    with local.flow("flow-1"):
+        for name in ("a", "b", "c"):
+            with local.span(name, "node"):
+                pass
+
+    assert [event["name"] for event in local.export("flow-1")["traceEvents"]] == ["b", "c"]
+
+
+def test_timed_node_traces_node_and_llm_calls():
+    """Test that wrapped nodes open a span of the config's flow around their LLM calls."""
+    llm = SimpleNamespace(complete=lambda prompt: SimpleNamespace(text="ok", raw={}))
+
+    async def node(state, config=None):
+        await asyncio.to_thread(timed_completion, "test", llm, "prompt")
+        return {}
+
+    asyncio.run(timed_node("test_traced", node)({}, {"configurable": {"flow_id": "trace-flow"}}))
+
+    names = [event["name"] for event in tracer.export("trace-flow")["traceEvents"]]
+    tracer.discard("trace-flow")
+    assert names == ["test_traced", "llm test"]
+
+
+def test_trace_endpoint():
+    """Test that /flows/{id}/trace serves a flow's trace and 404s for unknown flows."""
+    from fastapi.testclient import TestClient
+
+    from src import api
+
+    with tracer.flow("endpoint-flow"), tracer.span("terraform_plan", "node"):
+        pass
+    client = TestClient(api.app)
+
+    response = client.get("/flows/endpoint-flow/trace")
+    tracer.discard("endpoint-flow")
+
+    assert response.status_code == 200
+    assert response.json()["traceEvents"][0]["name"] == "terraform_plan"
+    assert client.get("/flows/missing-flow/trace").status_code == 404
@@ -0,0 +1,101 @@
+"""Tests for the per-flow Terraform workspace manager."""
+
+import json
+import os
+
+import pytest
+
+from src.terraform.workspace import WorkspaceManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    """Create a workspace manager rooted in a temporary directory."""
+    return WorkspaceManager(root=str(tmp_path / "workspaces"), pool_size=2, idle_ttl=60)
+
+
+def test_acquire_isolates_flows(manager):
+    """Test that each flow gets its own directory."""
+    first = manager.acquire("flow-a")
+    second = manager.acquire("flow-b")
+
+    assert first != second
+    assert os.path.isdir(first)
+    assert os.path.isdir(second)
+    assert manager.acquire("flow-a") == first
+
+
+def test_acquire_uses_and_refills_pool(manager):
+    """Test that acquiring takes a spare directory and tops the pool up."""
+    assert manager.stats() == {"active": 0, "pooled": 2}
+
+    manager.acquire("flow-a")
+
+    assert manager.stats() == {"active": 1, "pooled": 2}
+
+
+def test_acquire_rejects_unsafe_flow_id(manager):
+    """Test that flow ids cannot escape the workspace root."""
+    with pytest.raises(ValueError):
+        manager.acquire("../etc")
+
+
+def test_collect_garbage_recycles_idle_workspace(manager):
+    """Test that an idle workspace without state goes back to the pool."""
+    path = manager.acquire("flow-a")
+    with open(os.path.join(path, "main.tf"), "w") as f:
+        f.write("terraform {}")
+
+    released = manager.collect_garbage(now=10 ** 12)
+
+    assert released == ["flow-a"]
+    assert not os.path.exists(path)
+    assert manager.path_for("flow-a") is None
+    # Recycled directories come back empty
+    pooled = os.listdir(os.path.join(manager.root, "pool"))
+    for name in pooled:
+        assert os.listdir(os.path.join(manager.root, "pool", name)) == []
+
+
+def test_collect_garbage_keeps_recent_workspace(manager):
+    """Test that a recently used workspace is not collected."""
+    path = manager.acquire("flow-a")
+
+    assert manager.collect_garbage() == []
+    assert os.path.isdir(path)
+
+
+def test_collect_garbage_skips_kept_workspace(manager):
+    """Test that an idle workspace the caller still needs is not collected."""
+    kept = manager.acquire("flow-a")
+    manager.acquire("flow-b")
+
+    assert manager.collect_garbage(now=10 ** 12, keep=lambda flow_id: flow_id == "flow-a") == ["flow-b"]
+    assert os.path.isdir(kept)
+
+
+def test_release_retires_workspace_with_state(manager):
+    """Test that a workspace holding deployed state is preserved."""
+    path = manager.acquire("flow-a")
+    with open(os.path.join(path, "terraform.tfstate"), "w") as f:
+        json.dump({"resources": [{"type": "aws_s3_bucket"}]}, f)
+
+    manager.release("flow-a")
+
+    retired = os.listdir(os.path.join(manager.root, "retired"))
+    assert len(retired) == 1
+    assert retired[0].startswith("flow-a-")
+    assert os.path.exists(
+        os.path.join(manager.root, "retired", retired[0], "terraform.tfstate")
+    )
+
+
+def test_existing_workspaces_are_adopted(tmp_path):
+    """Test that workspaces survive a restart of the manager."""
+    root = str(tmp_path / "workspaces")
+    path = WorkspaceManager(root=root, pool_size=1).acquire("flow-a")
+
+    restarted = WorkspaceManager(root=root, pool_size=1)
+
+    assert restarted.path_for("flow-a") == path
+    assert restarted.stats() == {"active": 1, "pooled": 1}
@@ -35,7 +35,7 @@ const Chat: React.FC = () => {
   const inputContainerRef = useRef<HTMLDivElement>(null);
   const [connectionStatus, setConnectionStatus] = useState<string>('UNKNOWN');
 
-  const { isConnected, sendTask, lastResult, confirmationData, sendConfirmation, terraformApplyData } = useWebSocket();
+  const { isConnected, sendTask, lastResult, streamData, confirmationData, sendConfirmation, terraformApplyData } = useWebSocket();
 
   // Auto-scroll to bottom when messages change
   useEffect(() => {
@@ -65,6 +65,16 @@ const Chat: React.FC = () => {
     }
   }, [lastResult]);
 
+  // Show an answer as it is streamed
+  useEffect(() => {
+    if (streamData) {
+      setIsThinking(false);
+      setIsStreaming(true);
+      setStreamingContent(streamData.text);
+      setCurrentDocument(streamData.structuredContent);
+    }
+  }, [streamData]);
+
   // Handle confirmation requests
   useEffect(() => {
     if (confirmationData) {
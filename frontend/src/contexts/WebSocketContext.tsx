@@ -6,6 +6,7 @@ interface WebSocketContextType {
   sendTask: (data: any) => void;
   sendConfirmation: (confirmed: boolean, data?: any) => void;
   lastResult: any | null;
+  streamData: any | null;
   confirmationData: any | null;
   terraformApplyData: any | null;
 }
@@ -15,19 +16,25 @@ const WebSocketContext = createContext<WebSocketContextType | undefined>(undefin
 export const WebSocketProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
   const [isConnected, setIsConnected] = useState(false);
   const [lastResult, setLastResult] = useState<any | null>(null);
+  const [streamData, setStreamData] = useState<any | null>(null);
   const [confirmationData, setConfirmationData] = useState<any | null>(null);
   const [terraformApplyData, setTerraformApplyData] = useState<any | null>(null);
 
   useEffect(() => {
     const handleConnect = () => setIsConnected(true);
     const handleDisconnect = () => setIsConnected(false);
-    const handleResults = (results: any) => setLastResult(results);
+    const handleResults = (results: any) => {
+      setStreamData(null);
+      setLastResult(results);
+    };
+    const handleStream = (data: any) => setStreamData(data);
     const handleConfirmation = (data: any) => setConfirmationData(data);
     const handleTerraformApply = (data: any) => setTerraformApplyData(data);
 
     websocketService.on('connected', handleConnect);
     websocketService.on('disconnected', handleDisconnect);
     websocketService.on('results', handleResults);
+    websocketService.on('stream', handleStream);
     websocketService.on('confirmation', handleConfirmation);
     websocketService.on('terraformApply', handleTerraformApply);
 
@@ -35,6 +42,7 @@ export const WebSocketProvider: React.FC<{ children: React.ReactNode }> = ({ chi
       websocketService.off('connected', handleConnect);
       websocketService.off('disconnected', handleDisconnect);
       websocketService.off('results', handleResults);
+      websocketService.off('stream', handleStream);
       websocketService.off('confirmation', handleConfirmation);
       websocketService.off('terraformApply', handleTerraformApply);
       websocketService.disconnect();
@@ -55,6 +63,7 @@ export const WebSocketProvider: React.FC<{ children: React.ReactNode }> = ({ chi
     sendTask,
     sendConfirmation,
     lastResult,
+    streamData,
     confirmationData,
     terraformApplyData,
   };
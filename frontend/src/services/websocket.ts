@@ -1,5 +1,8 @@
 import { EventEmitter } from 'events';
 
+// Subprotocol for deflate-compressed JSON in binary frames
+const COMPRESSED_SUBPROTOCOL = 'cloudpilot.json+deflate';
+
 interface WebSocketMessage {
   type: string;
   [key: string]: any;
@@ -12,6 +15,14 @@ class WebSocketService extends EventEmitter {
   private reconnectTimeout = 1000; // Start with 1 second
   private url: string;
   private isConnecting = false;
+  private frames: Promise<void> = Promise.resolve();
+  // What the server has sent per flow, for merging delta progress events
+  private flowStates: Record<string, Record<string, any>> = {};
+  private blobs: Record<string, any> = {};
+  // Answers being streamed per flow, built up from stream progress events
+  private streams: Record<string, { text: string; title: string; sections: any[] }> = {};
+  // Last event seen per flow, to pick up where we left off after a reconnect
+  private lastSeq: Record<string, number> = {};
 
   constructor() {
     super();
@@ -79,77 +90,29 @@ class WebSocketService extends EventEmitter {
         }
       }, 5000);
       
-      this.ws = new WebSocket(this.url);
+      // Offer compressed binary frames for large messages; servers that do
+      // not speak the subprotocol keep sending JSON text
+      this.ws = new WebSocket(this.url, [COMPRESSED_SUBPROTOCOL]);
+      this.ws.binaryType = 'arraybuffer';
 
       this.ws.onopen = () => {
         console.log('WebSocket connected successfully');
         clearTimeout(connectionTimeout);
         this.reconnectAttempts = 0;
         this.isConnecting = false;
+        // Flows keep running on the server while we are away; replay what we missed
+        Object.entries(this.lastSeq).forEach(([flowId, seq]) => {
+          this.ws?.send(JSON.stringify({ type: 'attach', flow_id: flowId, last_seq: seq }));
+        });
         this.emit('connected');
       };
 
       this.ws.onmessage = (event) => {
-        try {
-          const data = JSON.parse(event.data);
-          console.log('WebSocket message received:', data);
-
-          if (data.type === 'connection_status') {
-            console.log('Connection status message received:', data);
-            if (data.status === 'connected') {
-              console.log('Backend confirmed WebSocket connection');
-              this.emit('connected');
-            }
-          } else if (data.type === 'confirmation') {
-            // Emit confirmation events for the UI to handle
-            this.emit('confirmation', data);
-          } else if (data.type === 'progress') {
-            // Handle progress messages
-            if (data.data && data.data.execute_terraform) {
-              console.log('Terraform execution data received:', data.data.execute_terraform);
-              // Emit terraform execution data
-              this.emit('terraformApply', data.data.execute_terraform);
-
-              // If there's a result, also emit it as a message
-              if (data.data.execute_terraform.result) {
-                this.emit('results', {
-                  message: 'Terraform execution completed.',
-                  structuredContent: {
-                    title: 'Terraform Apply',
-                    sections: [
-                      {
-                        type: 'heading',
-                        content: 'Terraform Apply Results',
-                        metadata: { level: 1 }
-                      },
-                      {
-                        type: 'text',
-                        content: `Status: ${data.data.execute_terraform.error ? 'Error' : 'Complete'}`
-                      }
-                    ]
-                  }
-                });
-              }
-            }
-
-            // For all other messages, emit the results
-            if (data.data && data.data.results) {
-              console.log('Emitting results:', data.data.results);
-              this.emit('results', data.data.results);
-            }
-          } else if (data.type === 'error') {
-            console.error('WebSocket error message received:', data.error);
-            this.emit('error', new Error(data.error));
-          } else {
-            // For all other messages, emit the results
-            if (data.results) {
-              console.log('Emitting results from non-progress message:', data.results);
-              this.emit('results', data.results);
-            }
-          }
-        } catch (error) {
-          console.error('Error parsing WebSocket message:', error);
-        }
+        // Compressed frames decode asynchronously, so chain them to keep order
+        this.frames = this.frames
+          .then(() => this.decodeFrame(event.data))
+          .then((text) => this.handleMessage(text))
+          .catch((error) => console.error('Error decoding WebSocket frame:', error));
       };
 
       this.ws.onclose = (event) => {
@@ -220,6 +183,140 @@ class WebSocketService extends EventEmitter {
     }
   }
 
+  // Dispatch a decoded server message to the UI
+  private handleMessage(text: string) {
+    try {
+      const data = JSON.parse(text);
+      console.log('WebSocket message received:', data);
+      if (data.flow_id && typeof data.seq === 'number') {
+        this.lastSeq[data.flow_id] = data.seq;
+      }
+
+      if (data.type === 'connection_status') {
+        console.log('Connection status message received:', data);
+        if (data.status === 'connected') {
+          console.log('Backend confirmed WebSocket connection');
+          this.emit('connected');
+        }
+      } else if (data.type === 'confirmation') {
+        // Emit confirmation events for the UI to handle
+        this.emit('confirmation', data);
+      } else if (data.type === 'progress') {
+        // Handle progress messages
+        if (data.delta) {
+          data.data = this.applyDelta(data);
+        }
+        if (data.data && data.data.execute_terraform) {
+          console.log('Terraform execution data received:', data.data.execute_terraform);
+          // Emit terraform execution data
+          this.emit('terraformApply', data.data.execute_terraform);
+
+          // If there's a result, also emit it as a message
+          if (data.data.execute_terraform.result) {
+            this.emit('results', {
+              message: 'Terraform execution completed.',
+              structuredContent: {
+                title: 'Terraform Apply',
+                sections: [
+                  {
+                    type: 'heading',
+                    content: 'Terraform Apply Results',
+                    metadata: { level: 1 }
+                  },
+                  {
+                    type: 'text',
+                    content: `Status: ${data.data.execute_terraform.error ? 'Error' : 'Complete'}`
+                  }
+                ]
+              }
+            });
+          }
+        }
+
+        // Text of an answer as it is generated; the full answer follows as results
+        if (data.data && data.data.stream) {
+          this.emit('stream', this.applyStream(data.flow_id, data.data.stream));
+        }
+
+        // For all other messages, emit the results
+        if (data.data && data.data.results) {
+          delete this.streams[data.flow_id];
+          console.log('Emitting results:', data.data.results);
+          this.emit('results', data.data.results);
+        }
+      } else if (data.type === 'log') {
+        // Live Terraform output while a plan or apply is running
+        this.emit('log', data);
+      } else if (data.type === 'snapshot') {
+        // Events we missed were dropped, start over from the flow's state
+        this.flowStates[data.flow_id] = { ...data.data };
+        this.emit('snapshot', data);
+      } else if (data.type === 'attached') {
+        this.emit('attached', data);
+      } else if (data.type === 'queued') {
+        // The server is busy; data.position is the flow's place in line
+        this.emit('queued', data);
+      } else if (data.type === 'error') {
+        console.error('WebSocket error message received:', data.error);
+        this.emit('error', new Error(data.error));
+      } else {
+        // For all other messages, emit the results
+        if (data.results) {
+          console.log('Emitting results from non-progress message:', data.results);
+          this.emit('results', data.results);
+        }
+      }
+    } catch (error) {
+      console.error('Error parsing WebSocket message:', error);
+    }
+  }
+
+  private async decodeFrame(payload: string | ArrayBuffer): Promise<string> {
+    if (typeof payload === 'string') {
+      return payload;
+    }
+    const stream = new Blob([payload]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return new Response(stream).text();
+  }
+
+  // Merge a delta progress event into the flow's state and return full node updates
+  private applyDelta(message: WebSocketMessage): Record<string, any> {
+    Object.assign(this.blobs, message.blobs || {});
+    const state = this.flowStates[message.flow_id] || (this.flowStates[message.flow_id] = {});
+    const updates: Record<string, any> = {};
+    Object.entries(message.data || {}).forEach(([node, delta]) => {
+      if (!delta || typeof delta !== 'object') {
+        updates[node] = delta;
+        return;
+      }
+      Object.entries(delta as Record<string, any>).forEach(([key, value]) => {
+        const ref = value && typeof value === 'object' ? value['$ref'] : undefined;
+        state[key] = ref !== undefined ? this.blobs[ref] : value;
+      });
+      updates[node] = { ...state };
+    });
+    return updates;
+  }
+
+  // Add streamed text and section changes to the flow's answer so far
+  private applyStream(flowId: string, stream: Record<string, any>) {
+    const answer = this.streams[flowId] || (this.streams[flowId] = { text: '', title: stream.title, sections: [] });
+    answer.text += stream.text || '';
+    (stream.sections || []).forEach((change: Record<string, any>) => {
+      const { index, append, ...section } = change;
+      if (append !== undefined && answer.sections[index]) {
+        answer.sections[index] = { ...answer.sections[index], content: answer.sections[index].content + append };
+      } else {
+        answer.sections[index] = section;
+      }
+    });
+    return {
+      flow_id: flowId,
+      text: answer.text,
+      structuredContent: { title: answer.title, sections: [...answer.sections] },
+    };
+  }
+
   private attemptReconnect() {
     if (this.reconnectAttempts < this.maxReconnectAttempts) {
       this.reconnectAttempts++;
@@ -29,12 +29,15 @@ export interface TerraformPlanJson {
   applyable?: boolean;
   timestamp?: string;
   root_module?: any;
+  summary?: Record<string, number>;
+  plan_json_path?: string;
   resource_changes?: Array<{
     address?: string;
     mode?: string;
     type?: string;
     name?: string;
     provider_name?: string;
+    action?: string;
     change?: {
       actions?: string[];
       before?: any;